@@ -1,21 +1,289 @@
 from abc import ABC, abstractmethod
+import asyncio
+import io
 import logging
+import os
+import threading
+import time
 from config.config import Config
-
-logging.basicConfig(
-    filename = Config.LOG_FILE,
-    level = logging.INFO
-)
+from shared.model_router import default_backend, get_router
+from shared.llm_cache import cache_key, get_response_cache
+from shared.indexer import index_in_background
+from shared.streaming import FenceStripper, strip_code_fences
+from shared.prompts import count_tokens, prompt_budget
+from shared.map_reduce import module_chunks
+from shared.log_utils import get_logger, log_context
+from shared.tracing import current_span, observe, span
 
 class BaseAgent(ABC):
+    # Set by agents that support skip-if-unchanged rebuilds (see shared.incremental)
+    # and batch mode (see shared.batch).
+    template = None
+    model = None
+    temperature = 0.2
+    strip_fences = False
+    merge = None  # combines map-reduce chunk outputs; None for agents that don't map-reduce
+
     def __init__(self, name, vector_store):
         self.name = name
         self.vector_store = vector_store
-    
-    @abstractmethod
+
     def run_task(self, task):
+        # Blocking entry point kept for existing callers; each call gets its own
+        # loop on the calling thread while the HTTP work goes to the shared client.
+        start = time.perf_counter()
+        with log_context(task_id = task.get("id"), agent = self.name), span("task"):
+            try:
+                return asyncio.run(self.run_task_async(task))
+            finally:
+                self.log("Task finished", latency_ms = round((time.perf_counter() - start) * 1000, 1))
+
+    @abstractmethod
+    async def run_task_async(self, task):
         pass
 
-    def log(self, msg):
+    def artifact_paths(self, task):
+        """(input_path, output_path) for fingerprinting; input_path None means the description is the input.
+
+        Returns None for agents whose runs are never skipped.
+        """
+        return None
+
+    def batch_prompts(self, task):
+        """The prompts `run_task_async` would send for a file-based task, for batch submission.
+
+        Returns (prompts, merge): `merge` combines the replies when the module
+        is map-reduced, and is None when they are simply concatenated. Returns
+        None if the task's input file is missing.
+        """
+        paths = self.artifact_paths(task)
+        if paths is None or paths[0] is None or not os.path.exists(paths[0]):
+            return None
+        with open(paths[0], "r") as f:
+            code_content = f.read()
+        values = {"code_content": code_content, "context": self.context_block(task)}
+        if self.merge is not None and self.should_map_reduce(code_content, self.model):
+            prompts = self.map_reduce_prompts(self.template, self.model, values)
+            if prompts is not None:
+                return prompts, self.merge
+        return self.template.build(self.model, chunk_field = "code_content", **values), None
+
+    def use_cache(self, task):
+        return Config.LLM_CACHE_ENABLED and not (task or {}).get("no_cache", False)
+
+    def cached_response(self, model, messages, temperature):
+        key = cache_key(model, messages, temperature = temperature)
+        cached = get_response_cache().get(key)
+        if cached is not None:
+            self.log(f"Cache hit for {model} prompt ({key[:12]})", model = model)
+        return key, cached
+
+    async def stream_output(self, prompt, model, temperature, file_path, task = None, strip_fences = False):
+        """Stream a completion straight into `file_path` and return its timing stats.
+
+        `prompt` is a string or a list of prompt parts (see `PromptTemplate.build`);
+        parts are sent in order and their replies written one after another.
+        Chunks are written to a temp file as they arrive (fences stripped on
+        the fly when `strip_fences` is set) and renamed over `file_path` only
+        once every reply is complete, so readers never see a partial artifact.
+        Prompt tokens, time-to-first-token and tokens/sec are logged and stored
+        on the task under "stream_stats". Falls back to buffered calls when
+        `Config.LLM_STREAMING` is off.
+        """
+        task = task if task is not None else {}
+        task_span = current_span()
+        if task_span is not None:
+            # Everything the agent did before asking for a completion: reading inputs, building the prompt.
+            observe("prompt.build", time.perf_counter() - task_span.start)
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        prompt_tokens = [getattr(p, "tokens", None) or count_tokens(p, model) for p in prompts]
+        self.log(
+            f"Sending {len(prompts)} prompt(s) to {model}: {prompt_tokens} tokens (budget {prompt_budget(model)})",
+            model = model, tokens = sum(prompt_tokens),
+        )
+        task["prompt_tokens"] = sum(prompt_tokens)
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        start = time.perf_counter()
+        results = []
+        try:
+            with open(tmp_path, "w") as f:
+                for i, text in enumerate(prompts):
+                    if i:
+                        f.write("\n\n")
+                    results.append(await self._complete_into(f, text, model, temperature, task, strip_fences))
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        end = time.perf_counter()
+        index_in_background(file_path)
+
+        streamed = [r for r in results if "first_token" in r]
+        if not streamed:
+            return {"cached": all(r.get("cached") for r in results), "prompt_tokens": task["prompt_tokens"]}
+        tokens = sum(r["tokens"] for r in streamed)
+        generation_seconds = sum(r["end"] - r["first_token"] for r in streamed)
+        ttft = streamed[0]["first_token"] - streamed[0]["start"]
+        stats = {
+            "prompt_tokens": task["prompt_tokens"],
+            "parts": len(prompts),
+            "ttft_ms": round(ttft * 1000, 1),
+            "total_ms": round((end - start) * 1000, 1),
+            "completion_tokens": tokens,
+            "tokens_per_sec": round(tokens / generation_seconds, 1) if generation_seconds > 0 else None,
+        }
+        task["stream_stats"] = stats
+        observe("llm.ttft", ttft)
+        self.log(
+            f"Streamed {tokens} tokens to {file_path}: TTFT {stats['ttft_ms']} ms, {stats['tokens_per_sec']} tokens/s",
+            model = model, latency_ms = stats["total_ms"], tokens = tokens, ttft_ms = stats["ttft_ms"],
+        )
+        return stats
+
+    def should_map_reduce(self, code_content, model):
+        return Config.MAP_REDUCE_ENABLED and count_tokens(code_content, model) >= Config.MAP_REDUCE_MIN_TOKENS
+
+    async def map_reduce_output(self, template, model, temperature, file_path, merge, task = None, strip_fences = False, **values):
+        """Generate output for a large module chunk by chunk, concurrently, and merge it.
+
+        `values["code_content"]` is split by top-level function/class; each
+        chunk gets its own prompt from `template`, up to
+        `Config.MAP_REDUCE_CONCURRENCY` run at once, and `merge` combines the
+        replies (in module order) into the text written to `file_path`.
+        Returns False without calling the model if the module is a single chunk.
+        """
+        task = task if task is not None else {}
+        prompts = self.map_reduce_prompts(template, model, values)
+        if prompts is None:
+            return False
+        self.log(
+            f"Map-reduce over {len(prompts)} chunks ({Config.MAP_REDUCE_CONCURRENCY} at a time): {[p.tokens for p in prompts]} prompt tokens",
+            model = model, tokens = sum(p.tokens for p in prompts),
+        )
+        task["prompt_tokens"] = sum(p.tokens for p in prompts)
+        semaphore = asyncio.Semaphore(Config.MAP_REDUCE_CONCURRENCY)
+
+        async def run(prompt):
+            async with semaphore:
+                out = io.StringIO()
+                await self._complete_into(out, prompt, model, temperature, task, strip_fences)
+                return out.getvalue()
+
+        start = time.perf_counter()
+        with span("llm.map_reduce", model = model):
+            replies = await asyncio.gather(*(run(prompt) for prompt in prompts))
+        self.save_output(file_path, merge(replies))
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        task["map_reduce"] = {"chunks": len(prompts), "latency_ms": latency_ms}
+        self.log(f"Merged {len(prompts)} chunk outputs into {file_path} in {latency_ms} ms", model = model, latency_ms = latency_ms)
+        return True
+
+    def map_reduce_prompts(self, template, model, values):
+        """One or more prompts per top-level chunk of `values["code_content"]`, or None if it is a single chunk."""
+        chunks = module_chunks(values["code_content"], Config.MAP_REDUCE_CHUNK_TOKENS, model)
+        if len(chunks) < 2:
+            return None
+        return [
+            prompt
+            for chunk in chunks
+            for prompt in template.build(model, chunk_field = "code_content", **{**values, "code_content": chunk})
+        ]
+
+    async def _complete_into(self, out, prompt, model, temperature, task, strip_fences):
+        """Write one completion for `prompt` to the open file `out`. Returns timing info."""
+        messages = [{"role": "user", "content": prompt}]
+        use_cache = self.use_cache(task)
+        if use_cache:
+            cache_messages = [{"role": "user", "content": getattr(prompt, "cache_text", prompt)}]
+            key, cached = self.cached_response(model, cache_messages, temperature)
+            if cached is not None:
+                out.write(strip_code_fences(cached) if strip_fences else cached)
+                return {"cached": True}
+
+        # The cache is keyed on `model`, so only replies from that model itself
+        # are stored, not ones a route served from a fine-tuned or other backend.
+        served = []
+        if not Config.LLM_STREAMING:
+            with span("llm.request", model = model):
+                response = await get_router().chat_completion(
+                    self.name, on_backend = served.append, model = model, messages = messages, temperature = temperature
+                )
+            content = response.choices[0].message.content or ""
+            if use_cache and served[0].name == default_backend(model).name:
+                get_response_cache().put(key, content)
+            out.write(strip_code_fences(content) if strip_fences else content)
+            return {}
+
+        stripper = FenceStripper(enabled = strip_fences)
+        parts = [] if use_cache else None
+        chunks, usage_tokens = 0, None
+        start = time.perf_counter()
+        first_token = None
+        with span("llm.request", model = model):
+            stream = get_router().stream_chat_completion(
+                self.name,
+                on_backend = served.append,
+                model = model,
+                messages = messages,
+                temperature = temperature,
+                stream_options = {"include_usage": True},
+            )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage_tokens = chunk.usage.completion_tokens
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter()
+                chunks += 1
+                if parts is not None:
+                    parts.append(delta)
+                out.write(stripper.feed(delta))
+            out.write(stripper.finish())
+        end = time.perf_counter()
+        if parts and served[0].name == default_backend(model).name:
+            get_response_cache().put(key, "".join(parts))
+        return {"start": start, "first_token": first_token or end, "end": end, "tokens": usage_tokens or chunks}
+
+    def context_block(self, task):
+        """Prompt section with knowledge base chunks retrieved for this task, if any."""
+        context = task.get("retrieved_context")
+        if not context:
+            return ""
+        self.log(f"Using retrieved context ({task.get('retrieval_ms')} ms retrieval)")
+        return f"""
+**Relevant context retrieved from the project knowledge base:**
+{context}
+"""
+
+    def save_output(self, file_path, content):
+        """Write an artifact and queue it for indexing so later tasks can retrieve it."""
+        with span("file.write"):
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok = True)
+            tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, file_path)
+        index_in_background(file_path)
+
+    def log(self, msg, payload = None, level = logging.INFO, **fields):
+        """Print a progress line and queue a structured record for the log file.
+
+        `fields` may carry task_id, model, latency_ms, tokens or anything else
+        worth filtering on; large `payload` text is summarised by the formatter.
+        """
         print(f"[{self.name}] {msg}")
-        logging.info(f"[{self.name}] {msg}")
\ No newline at end of file
+        fields.setdefault("agent", self.name)
+        if payload is not None:
+            fields["payload"] = payload
+        get_logger().log(level, msg, extra = fields)
@@ -1,18 +1,12 @@
-from openai import OpenAI
 import os
 from agents.base_agent import BaseAgent
+from shared.prompts import PromptTemplate
 from config.config import Config
 from shared.task_manager import TaskManager
 
-class CodeArchitectAgent(BaseAgent):
-    def __init__(self, name, vector_store):
-        super().__init__(name, vector_store)
-        self.task_manager = TaskManager()
-
-    def run_task(self, task):
-        print(f"[CodeArchitectAgent] run_task() called with task: {task}")
+MODEL = "gpt-4o-mini"
 
-        prompt = f"""
+PROMPT_TEMPLATE = PromptTemplate("architect", """
         You are a senior software architect.  
 For the following software feature, produce an architecture plan in this exact format:
 
@@ -60,37 +54,29 @@ Always include **Modules and Files** with at least 3 modules.
 
 Feature:
 
-{task['description']}
-        """
+{description}
+{context}
+        """)
 
-        try:
-            #print(f"[DEBUG] Sending prompt to OpenAI...")
-            client = OpenAI(api_key = Config.OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model = "gpt-4o-mini",
-                messages = [{"role": "user", "content": prompt}],
-                temperature = 0.2,
-            )
-            architecture_plan = response.choices[0].message.content
-            #print(f"[DEBUG] Architecture plan: {architecture_plan}")
-            self.log(f"Generated architecture plan: {architecture_plan}")
+class CodeArchitectAgent(BaseAgent):
+    def __init__(self, name, vector_store):
+        super().__init__(name, vector_store)
+        self.task_manager = TaskManager()
+
+    async def run_task_async(self, task):
+        print(f"[CodeArchitectAgent] run_task() called with task: {task}")
+
+        prompts = PROMPT_TEMPLATE.build(MODEL, description = task['description'], context = self.context_block(task))
 
-        except Exception as e:
-            print(f"[ERROR] Exception during OpenAI API call: {str(e)}")
-            return
-        
-        #Save file
-        os.makedirs(Config.ARCHITECTURE_PATH, exist_ok = True)
         architecture_file_name = f"{task.get('file_name')}.md"
         architecture_file_path = os.path.join(Config.ARCHITECTURE_PATH, architecture_file_name)
 
-        print(f"[DEBUG] Type of plan: {type(architecture_plan)}")
-        if isinstance(architecture_plan, list):
-            print("[WARN] Plan was a list, converting to string.")
-            architecture_plan = "\n".join(architecture_plan)
+        try:
+            await self.stream_output(prompts, model = MODEL, temperature = 0.2, file_path = architecture_file_path, task = task)
 
-        with open(architecture_file_path, "w") as f:
-            f.write(architecture_plan)
+        except Exception as e:
+            print(f"[ERROR] Exception during OpenAI API call: {str(e)}")
+            raise
         
         print("[CodeArchitectAgent] Architecture plan created.")
         
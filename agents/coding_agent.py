@@ -1,37 +1,30 @@
 print(">>> LOADING CodingAgent module...")
 
-from openai import OpenAI
 import os
 from agents.base_agent import BaseAgent
+from shared.prompts import PromptTemplate
 from config.config import Config
 from shared.git_utils import commit_generated_code
 
 
 
-class CodingAgent(BaseAgent):
-    def run_task(self, task):
-        print(f"[CodingAgent] run_task() called with task: {task['description']}")
-        
-        #print(f"[DEBUG] Before building prompt...")
-        
-        prompt = f"""
+MODEL = "gpt-4o-mini"
+
+PROMPT_TEMPLATE = PromptTemplate("coding", """
         You are a senior software engineer and an AI pair programmer. Your task is to implement the following feature, focusing on writing clean, efficient, and well-tested code.
         **Feature Description:**
-        {task['description']}
+        {description}
 
         **Context and Requirements:**
         * **Project Goal:** (Provide a brief overview of the project's current state and immediate goals related to this task. This information would ideally come from the Project Manager Agent or the RAG system.)
-        * **Architectural Guidelines:** (Retrieve relevant architectural patterns or design decisions from the knowledge base using RAG. Example: "Retrieve design documents for [module X] and adhere to its principles.")
+        * **Architectural Guidelines:** Follow any architectural patterns or design decisions in the retrieved context below.
         * **Existing Codebase:** (If applicable, provide context about where this new code should integrate. Example: "Review the 'src/utils' directory for existing helper functions related to this task.")
         * **Output:** Your primary output will be functional Python code that implements the feature. This includes creating new files as necessary, generating appropriate function bodies, and ensuring all code is well-commented and includes docstrings.
         * **Version Control:** After completing the code, you will automatically create a new commit with a clear and concise commit message that reflects the implemented feature and its status. Push your changes to the repository.
 
         **Instructions and Best Practices:**
-        1.  **Knowledge Retrieval (RAG):** Before writing any code, actively query the knowledge base (`knowledge_base.search(query)`) for relevant information. Focus your queries on:
-            * "Similar code examples for [task related keywords]"
-            * "API specifications for [relevant external services/libraries]"
-            * "Project design documents related to [module/feature]"
-            * "Best practices for [programming language/framework]"
+        1.  **Knowledge Retrieval (RAG):** Relevant excerpts from the project knowledge base (architecture plans, previously generated modules, tests and docs) are included below when available.
+            * Reuse names, interfaces and conventions from this context so the new module fits with existing code.
             * Integrate this retrieved context into your coding process to reduce hallucinations and ensure accuracy.
 
         2.  **Code Generation:**
@@ -74,47 +67,40 @@ class CodingAgent(BaseAgent):
             Description of output.
     
             # Your generated code goes here 
-            # Make sure to utilize context from knowledge_base.search() 
+            # Make sure to utilize the retrieved context 
 
             return result
         # Additional functions or classes as needed
-        
-        """
-        
-        #print(f"[DEBUG] After building prompt...")
-        #self.log(f"Sending prompt to OpenAI...")
+        {context}
+        """)
+
+class CodingAgent(BaseAgent):
+    template = PROMPT_TEMPLATE
+    model = MODEL
+
+    def artifact_paths(self, task):
+        # Input is the task description itself.
+        return None, os.path.join(Config.GENERATED_CODE_PATH, task.get("output_file", "generated_code.py"))
+
+    async def run_task_async(self, task):
+        print(f"[CodingAgent] run_task() called with task: {task['description']}")
+
+        prompts = PROMPT_TEMPLATE.build(MODEL, description = task['description'], context = self.context_block(task))
+        _, file_path = self.artifact_paths(task)
+
         try:
-            client = OpenAI(api_key = Config.OPENAI_API_KEY)
-            #print(f"[DEBUG] Client created")
-            response = client.chat.completions.create(
-                model = "gpt-4o-mini",
-                messages = [{"role": "user", "content": prompt}],
-                temperature = 0.2,
-            )
-            #print(f"[DEBUG] API raw response: {response}")
-            code = response.choices[0].message.content
-            #print(f"[DEBUG] Extracted code: {code}")
-            self.log(f"Generated code: {code}")
+            # Streams into file_path, dropping the ```python fence as it goes
+            await self.stream_output(prompts, model = MODEL, temperature = 0.2, file_path = file_path, task = task, strip_fences = True)
+            self.log(f"Generated code saved to: {file_path}")
 
         except Exception as e:
             self.log(f"Exception during OpenAI API call: {str(e)}")
             print(f"[ERROR] Exception during OpenAI API call: {str(e)}")
-            return
-
-        #Save file
-        file_name = task.get("output_file", "generated_code.py")
-        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
+            raise
 
-        print(f"[DEBUG] File path: {file_path}")
-
-        os.makedirs(Config.GENERATED_CODE_PATH, exist_ok = True)
-        
-        with open(file_path, "w") as f:
-            clean_code = code.strip("`").replace("python", "", 1).strip()
-            f.write(clean_code)
         #Commit to Git
         try:
-            commit_generated_code(file_path, f"Add generated code for task: {task['description']}")
+            commit_generated_code(file_path, task['description'])
         except Exception as e:
             print(f"[WARN] Git commit failed: {str(e)}")
         
\ No newline at end of file
@@ -1,26 +1,12 @@
-from openai import OpenAI
 import os
 from agents.base_agent import BaseAgent
+from shared.prompts import PromptTemplate
+from shared.map_reduce import merge_markdown
 from config.config import Config
 
-class DocumentationAgent(BaseAgent):
-    def run_task(self, task):
-        print(f"[DocumentationAgent] run_task() called with task: {task}")
+MODEL = "gpt-3.5-turbo"
 
-        file_name = task.get("input_file")
-        if not file_name:
-            print("[ERROR] No input_file specified in task.")
-            return
-        
-        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
-        if not os.path.exists(file_path):
-            print(f"[ERROR] File {file_path} does not exist.")
-            return
-        
-        with open(file_path, "r") as f:
-            code_content = f.read()
-        
-        prompt = f"""
+PROMPT_TEMPLATE = PromptTemplate("documentation", """
             You are a senior technical writer with extensive experience in documenting Python projects for open-source platforms like GitHub. 
             Your goal is to generate a high-quality `README.md` file that provides a clear, concise, and comprehensive overview of the project.
 
@@ -28,6 +14,7 @@ class DocumentationAgent(BaseAgent):
 
             **Code:**
             {code_content}
+            {context}
 
             **Instructions:**
             1.  **Analyze the Code:** Thoroughly analyze the provided `code_content` to understand its primary functionality, dependencies, and how it's intended to be used.
@@ -77,27 +64,51 @@ class DocumentationAgent(BaseAgent):
             ## Example Usage
             ```python
             # [Code example]
-    """
-        try:
-            #print(f"[DEBUG] Sending prompt to OpenAI...")
-            client = OpenAI(api_key = Config.OPENAI_API_KEY)
+    """)
+
+class DocumentationAgent(BaseAgent):
+    template = PROMPT_TEMPLATE
+    model = MODEL
+    temperature = 0.2
+    merge = staticmethod(merge_markdown)
+
+    def artifact_paths(self, task):
+        file_name = task.get("input_file")
+        if not file_name:
+            return None
+        return os.path.join(Config.GENERATED_CODE_PATH, file_name), os.path.join(Config.README_PATH, f"{os.path.splitext(file_name)[0]}_README.md")
+
+    async def run_task_async(self, task):
+        print(f"[DocumentationAgent] run_task() called with task: {task}")
+
+        file_name = task.get("input_file")
+        if not file_name:
+            print("[ERROR] No input_file specified in task.")
+            return
+        
+        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
+        if not os.path.exists(file_path):
+            print(f"[ERROR] File {file_path} does not exist.")
+            return
+        
+        with open(file_path, "r") as f:
+            code_content = f.read()
+        
+        _, readme_file_path = self.artifact_paths(task)
+        context = self.context_block(task)
 
-            response = client.chat.completions.create(
-                model = "gpt-3.5-turbo",
-                messages = [{"role": "user", "content": prompt}],
-                temperature = 0.2,
+        try:
+            # Large modules: docs per top-level function/class, generated concurrently and merged.
+            merged = self.should_map_reduce(code_content, MODEL) and await self.map_reduce_output(
+                PROMPT_TEMPLATE, MODEL, self.temperature, readme_file_path, self.merge, task = task,
+                code_content = code_content, context = context,
             )
-            readme_content = response.choices[0].message.content
-            #print(f"[DEBUG] Extracted README content: {readme_content}")
-            self.log(f"Generated README content: {readme_content}")
+            if not merged:
+                prompts = PROMPT_TEMPLATE.build(MODEL, chunk_field = "code_content", code_content = code_content, context = context)
+                await self.stream_output(prompts, model = MODEL, temperature = self.temperature, file_path = readme_file_path, task = task)
         
         except Exception as e:
             print(f"[ERROR] Exception during OpenAI API call: {str(e)}")
-            return
-        
-        #Save file
-        readme_file_path = os.path.join(Config.README_PATH, f"{os.path.splitext(file_name)[0]}_README.md")
-        with open(readme_file_path, "w") as f:
-            f.write(readme_content)
+            raise
         
         print(f"[DocumentationAgent] README file created: {readme_file_path}")
\ No newline at end of file
@@ -1,37 +1,19 @@
-from openai import OpenAI
 import os
 from agents.base_agent import BaseAgent
+from shared.prompts import PromptTemplate
 from config.config import Config
 from shared.task_manager import TaskManager
 
-class QAAgent(BaseAgent):
-    def __init__(self, name, vector_store):
-        super().__init__(name, vector_store)
-        self.task_manager = TaskManager()
-
-    def run_task(self, task):
-        print(f"[QAAgent] run_task() called with task: {task}")
+MODEL = "gpt-3.5-turbo"
 
-        file_name = task.get("input_file")
-        if not file_name:
-            print("[ERROR] No input_file specified in task.")
-            return
-        
-        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
-        if not os.path.exists(file_path):
-            print(f"[ERROR] File {file_path} does not exist.")
-            return
-        
-        with open(file_path, "r") as f:
-            code_content = f.read()
-        
-        prompt = f"""
+PROMPT_TEMPLATE = PromptTemplate("qa", """
             You are an expert software quality engineer with a strong focus on Python development. 
             You are tasked with performing a thorough review of the provided Python code for quality, correctness, style, maintainability, and security. 
             You will leverage static analysis tools and your expertise to identify areas for improvement.
 
             **Code to review:**
             {code_content}
+            {context}
 
             **QA Report Sections:**
             ## 1. Summary
@@ -76,33 +58,49 @@ class QAAgent(BaseAgent):
             * **Note any automated fixes that could be applied** (e.g., by `autopep8` ).
             * **Suggest creating remediation tasks** if the issues are complex or require significant effort.
             
-"""
+""")
+
+class QAAgent(BaseAgent):
+    template = PROMPT_TEMPLATE
+    model = MODEL
+    temperature = 0.3
+
+    def artifact_paths(self, task):
+        file_name = task.get("input_file")
+        if not file_name:
+            return None
+        return os.path.join(Config.GENERATED_CODE_PATH, file_name), os.path.join(Config.QA_REPORT_PATH, f"{os.path.splitext(file_name)[0]}_qa_report.md")
+
+    def __init__(self, name, vector_store):
+        super().__init__(name, vector_store)
+        self.task_manager = TaskManager()
+
+    async def run_task_async(self, task):
+        print(f"[QAAgent] run_task() called with task: {task}")
+
+        file_name = task.get("input_file")
+        if not file_name:
+            print("[ERROR] No input_file specified in task.")
+            return
+        
+        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
+        if not os.path.exists(file_path):
+            print(f"[ERROR] File {file_path} does not exist.")
+            return
+        
+        with open(file_path, "r") as f:
+            code_content = f.read()
+        
+        prompts = PROMPT_TEMPLATE.build(MODEL, chunk_field = "code_content", code_content = code_content, context = self.context_block(task))
         
+        _, qa_file_path = self.artifact_paths(task)
+
         try:
-            #print(f"[DEBUG] Sending prompt to OpenAI...")
-            client = OpenAI(api_key = Config.OPENAI_API_KEY)
-
-            response = client.chat.completions.create(
-                model = "gpt-3.5-turbo",
-                messages = [{"role": "user", "content": prompt}],
-                temperature = 0.3,
-            )
-            #print(f"[DEBUG] API raw response: {response}")
-            self.log(f"Generated QA report: {response}")
-
-            qa_report = response.choices[0].message.content
-            #print(f"[DEBUG] Extracted QA report: {qa_report}")
+            await self.stream_output(prompts, model = MODEL, temperature = self.temperature, file_path = qa_file_path, task = task)
         
         except Exception as e:
             print(f"[ERROR] Exception during QAAgent API call: {str(e)}")
-            return
-        
-        os.makedirs(Config.QA_REPORT_PATH, exist_ok = True)
-        qa_file_name = f"{os.path.splitext(file_name)[0]}_qa_report.md"
-        qa_file_path = os.path.join(Config.QA_REPORT_PATH, qa_file_name)
-        
-        with open(qa_file_path, "w") as f:
-            f.write(qa_report)
+            raise
         
         new_refactor_task = {
             "agent": "RefactoringAgent",
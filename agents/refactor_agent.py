@@ -1,26 +1,11 @@
-from openai import OpenAI
 import os
 from agents.base_agent import BaseAgent
+from shared.prompts import PromptTemplate
 from config.config import Config
 
-class RefactorAgent(BaseAgent):
-    def run_task(self, task):
-        print(f"[RefactorAgent] run_task() called with task: {task}")
+MODEL = "gpt-4o-mini"
 
-        file_name = task.get("input_file")
-        if not file_name:
-            print("[ERROR] No input_file specified in task.")
-            return
-        
-        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
-        if not os.path.exists(file_path):
-            print(f"[ERROR] File {file_path} does not exist.")
-            return
-        
-        with open(file_path, "r") as f:
-            code_content = f.read()
-        
-        prompt = f"""
+PROMPT_TEMPLATE = PromptTemplate("refactoring", """
             You are a senior Python engineer with a deep understanding of code quality, performance optimization, and idiomatic Python. Your task is to refactor the provided Python code.
 
             **Please refactor the following Python code for improved readability, maintainability, and performance:**
@@ -47,31 +32,47 @@ class RefactorAgent(BaseAgent):
             
             **Code:**
             {code_content}
+            {context}
 
             **Output:** Provide ONLY the improved Python code (no explanations, no prose, no markdown formatting outside of the code block).
-        """
+        """)
+
+class RefactorAgent(BaseAgent):
+    template = PROMPT_TEMPLATE
+    model = MODEL
+    temperature = 0.2
+
+    def artifact_paths(self, task):
+        file_name = task.get("input_file")
+        if not file_name:
+            return None
+        return os.path.join(Config.GENERATED_CODE_PATH, file_name), os.path.join(Config.REFACTOR_PATH, f"{os.path.splitext(file_name)[0]}_refactored.py")
+
+    async def run_task_async(self, task):
+        print(f"[RefactorAgent] run_task() called with task: {task}")
+
+        file_name = task.get("input_file")
+        if not file_name:
+            print("[ERROR] No input_file specified in task.")
+            return
+        
+        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
+        if not os.path.exists(file_path):
+            print(f"[ERROR] File {file_path} does not exist.")
+            return
+        
+        with open(file_path, "r") as f:
+            code_content = f.read()
         
+        prompts = PROMPT_TEMPLATE.build(MODEL, chunk_field = "code_content", code_content = code_content, context = self.context_block(task))
+        
+        _, refactored_file_path = self.artifact_paths(task)
+
         try:
-            client = OpenAI(api_key = Config.OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model = "gpt-4o-mini",
-                messages = [{"role": "user", "content": prompt}],
-                temperature = 0.2,
-            )
-            refactored_code = response.choices[0].message.content
-            #print(f"[DEBUG] Refactored code: {refactored_code}")
-            self.log(f"Generated refactored code: {refactored_code}")
+            await self.stream_output(prompts, model = MODEL, temperature = self.temperature, file_path = refactored_file_path, task = task)
         
         except Exception as e:
             print(f"[ERROR] Exception during OpenAI API call: {str(e)}")
-            return
-        
-        #Save file
-        os.makedirs(Config.REFACTOR_PATH, exist_ok = True)
-        refactored_file_name = f"{os.path.splitext(file_name)[0]}_refactored.py"
-        refactored_file_path = os.path.join(Config.REFACTOR_PATH, refactored_file_name)
-        
-        with open(refactored_file_path, "w") as f:
-            f.write(refactored_code)
+            raise
         
         print(f"[RefactorAgent] Refactored code saved to: {refactored_file_path}")
\ No newline at end of file
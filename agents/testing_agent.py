@@ -1,31 +1,17 @@
-from openai import OpenAI
 import os
 from agents.base_agent import BaseAgent
+from shared.prompts import PromptTemplate
+from shared.map_reduce import merge_test_files
 from config.config import Config
 
-class TestingAgent(BaseAgent):
-    def run_task(self, task):
-        print(f"[TestingAgent] run_task() called with task: {task}")
+MODEL = "gpt-3.5-turbo"
 
-        file_name = task.get("input_file")
-        if not file_name:
-            print("[ERROR] No input_file specified in task.")
-            return
-        
-        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
-        
-        if not os.path.exists(file_path):
-            print(f"[ERROR] File {file_path} does not exist.")
-            return
-        
-        with open(file_path, "r") as f:
-            code_content = f.read()
-        
-        prompt = f"""
+PROMPT_TEMPLATE = PromptTemplate("testing", """
         You are a senior Python testing engineer. Your primary responsibility is to ensure the robustness and correctness of the codebase by creating comprehensive unit tests. You will use `pytest` for all test generation.
 
         **Given the following Python code, generate a comprehensive unit test file:**
         {code_content}
+        {context}
 
         **Instructions:**
 1.  **Scope:** Focus on generating unit tests for all functions within the provided `code_content`.
@@ -48,36 +34,53 @@ class TestingAgent(BaseAgent):
 
 **Output:** Provide ONLY valid Python test code.
         
-"""
-        
-        try:
-            client = OpenAI(api_key = Config.OPENAI_API_KEY)
+""")
 
-            #print(f"[DEBUG] Sending prompt to OpenAI...")
-            response = client.chat.completions.create(
-                model = "gpt-3.5-turbo",
-                messages = [{"role": "user", "content": prompt}],
-                temperature = 0.2,
-            )
-            test_code = response.choices[0].message.content.strip()
-            #print(f"[DEBUG] Extracted test code: {test_code}")
-            if test_code.startswith("```python"):
-                test_code = test_code[len("```python"):].strip()
-            if test_code.endswith("```"):
-                test_code = test_code[:-3].strip()
+class TestingAgent(BaseAgent):
+    template = PROMPT_TEMPLATE
+    model = MODEL
+    temperature = 0.2
+    strip_fences = True
+    merge = staticmethod(merge_test_files)
 
-            self.log(f"Generated test code: {test_code}")
+    def artifact_paths(self, task):
+        file_name = task.get("input_file")
+        if not file_name:
+            return None
+        return os.path.join(Config.GENERATED_CODE_PATH, file_name), os.path.join(Config.TEST_CODE_PATH, f"test_{file_name}")
 
-        except Exception as e:
-            print(f"[ERROR] Exception during OpenAI API call: {str(e)}")
+    async def run_task_async(self, task):
+        print(f"[TestingAgent] run_task() called with task: {task}")
+
+        file_name = task.get("input_file")
+        if not file_name:
+            print("[ERROR] No input_file specified in task.")
             return
         
-        #Save file
-        os.makedirs(Config.TEST_CODE_PATH, exist_ok = True)
-        test_file_name = f"test_{file_name}"
-        test_file_path = os.path.join(Config.TEST_CODE_PATH, test_file_name)
+        file_path = os.path.join(Config.GENERATED_CODE_PATH, file_name)
+        
+        if not os.path.exists(file_path):
+            print(f"[ERROR] File {file_path} does not exist.")
+            return
+        
+        with open(file_path, "r") as f:
+            code_content = f.read()
+        
+        _, test_file_path = self.artifact_paths(task)
+        context = self.context_block(task)
 
-        with open(test_file_path, "w") as f:
-            f.write(test_code)
+        try:
+            # Large modules: tests per top-level function/class, generated concurrently and merged.
+            merged = self.should_map_reduce(code_content, MODEL) and await self.map_reduce_output(
+                PROMPT_TEMPLATE, MODEL, self.temperature, test_file_path, self.merge, task = task, strip_fences = self.strip_fences,
+                code_content = code_content, context = context,
+            )
+            if not merged:
+                prompts = PROMPT_TEMPLATE.build(MODEL, chunk_field = "code_content", code_content = code_content, context = context)
+                await self.stream_output(prompts, model = MODEL, temperature = self.temperature, file_path = test_file_path, task = task, strip_fences = self.strip_fences)
+
+        except Exception as e:
+            print(f"[ERROR] Exception during OpenAI API call: {str(e)}")
+            raise
         
         print(f"[TestingAgent] Test file created: {test_file_path}")
\ No newline at end of file
@@ -1,12 +1,17 @@
-import os, json, shutil
-from git import Repo
+import os, hashlib
 import openai
 from dotenv import load_dotenv
 import time
+import asyncio
 
 load_dotenv()
 
-client = openai.OpenAI(api_key = os.getenv("OPENAI_API_KEY"))
+from config.config import Config
+from shared.code_extract import extract_functions
+from shared.dataset import JsonlWriter, dataset_stats, read_jsonl, repair_jsonl, split_train_val
+from shared.dedup import MinHashDeduper
+from shared.llm_client import chat_completion
+from shared.repo_cache import fetch_repos
 
 GITHUB_REPOS = [
     "https://github.com/DSM2499/AI_Software_Developer",
@@ -18,30 +23,20 @@ GITHUB_REPOS = [
     "https://github.com/DSM2499/Virus_Simulator",
     "https://github.com/DSM2499/Conway-s_Game_of_Life"
 ]
-WORKDIR = "repos"
 RAW_FILE = "training_data_raw.jsonl"
 CHAT_FILE = "training_data_chat.jsonl"
+TRAIN_FILE = "training_data_train.jsonl"
+VAL_FILE = "training_data_val.jsonl"
 MODEL = "gpt-3.5-turbo"
+PROGRESS_EVERY = 25
 
-def extract_features(file_path):
-    with open(file_path, "r", errors = "ignore") as f:
-        lines = f.readlines()
-    funcs, func = [], []
-    inside = False
-    for line in lines:
-        if line.strip().startswith("def ") or line.strip().startswith("class "):
-            if func: funcs.append("\n".join(func))
-            func = [line]
-            inside = True
-        elif inside:
-            if line.strip().startswith("#") or line.strip() == "":
-                func.append(line)
-            elif line.startswith(" ") or line.startswith("\t"):
-                func.append(line)
-            else:
-                inside = False
-    if func: funcs.append("\n".join(func))
-    return funcs
+def python_files(repo_paths):
+    for repo_path in repo_paths:
+        for root, dirs, files in os.walk(repo_path):
+            dirs[:] = sorted(d for d in dirs if d != ".git")
+            for file in sorted(files):
+                if file.endswith(".py"):
+                    yield os.path.join(root, file)
 
 def generate_instruction_pairs(code_snippet):
     return [
@@ -57,9 +52,38 @@ def generate_instruction_pairs(code_snippet):
         }
     ]
 
-def autofill_output(item, model = "gpt-3.5-turbo"):
+def iter_pairs(functions_by_file):
+    """Instruction pairs for every extracted function, tagged with the file and
+    qualified name they came from (the key used to resume an interrupted run)."""
+    for path, functions in functions_by_file.items():
+        rel_path = os.path.relpath(path, Config.REPO_CACHE_DIR)
+        seen = {}
+        for name, snippet in functions:
+            # A name defined in more than one branch (if/else, try/except) gets a suffix
+            seen[name] = seen.get(name, 0) + 1
+            function = name if seen[name] == 1 else f"{name}#{seen[name]}"
+            for pair in generate_instruction_pairs(snippet):
+                pair["file"] = rel_path
+                pair["function"] = function
+                yield pair
+
+def pair_key(item):
+    return (item.get("file"), item.get("function"), item.get("instruction"))
+
+def load_done_keys(raw_file):
+    """Keys of the pairs already saved in `raw_file`.
+
+    A last line left half-written by a crash is cut off so new pairs can be
+    appended after it.
+    """
+    if not os.path.exists(raw_file):
+        return set()
+    repair_jsonl(raw_file)
+    return {pair_key(item) for item in read_jsonl(raw_file)}
+
+async def autofill_output(item, model = "gpt-3.5-turbo"):
     try:
-        response = client.chat.completions.create(
+        response = await chat_completion(
             model=model,
             messages=[
                 {"role": "system", "content": "You are an expert AI software developer."},
@@ -72,6 +96,34 @@ def autofill_output(item, model = "gpt-3.5-turbo"):
         print(f"Error autofill_output: {e}")
     return item
 
+async def autofill_outputs(pairs, raw_file, concurrency = None):
+    """Fill in `pairs` with up to `concurrency` requests in flight, appending each
+    finished pair to `raw_file` as soon as it's done.
+
+    Pairs whose request failed are not saved, so the next run retries them.
+    Returns (pairs saved, pairs failed, seconds).
+    """
+    concurrency = concurrency or Config.GENERATION_CONCURRENCY
+    pairs = iter(pairs)
+    saved, failed = 0, 0
+    start = time.perf_counter()
+    # Unbuffered: the file is also the checkpoint an interrupted run resumes from
+    with JsonlWriter(raw_file, append = True, buffer_bytes = 0) as out:
+        async def worker():
+            nonlocal saved, failed
+            for pair in pairs:
+                pair = await autofill_output(pair)
+                if not pair["output"]:
+                    failed += 1
+                    continue
+                out.write(pair)
+                saved += 1
+                if saved % PROGRESS_EVERY == 0:
+                    print(f"Generated {saved} pairs ({saved / (time.perf_counter() - start):.1f} pairs/sec)")
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return saved, failed, time.perf_counter() - start
+
 def convert_to_chat_format(old_item):
     return {
         "messages": [
@@ -81,7 +133,7 @@ def convert_to_chat_format(old_item):
         ]
     }
 
-def fine_tune(jsonl_file, model = MODEL):
+def fine_tune(jsonl_file, model = MODEL, validation_file = None):
     print(f"Fine-tuning model with {jsonl_file}...")
 
     with open(jsonl_file, "rb") as f:
@@ -89,10 +141,17 @@ def fine_tune(jsonl_file, model = MODEL):
     file_id = file_response.id
     print(f"File ID: {file_id}")
 
+    validation_file_id = None
+    if validation_file:
+        with open(validation_file, "rb") as f:
+            validation_file_id = openai.files.create(file = f, purpose = "fine-tune").id
+        print(f"Validation file ID: {validation_file_id}")
+
     print(f"File uploaded successfully. Starting fine-tuning...")
     fine_tune_response = openai.fine_tuning.jobs.create(
         training_file = file_id,
-        model = model
+        model = model,
+        **({"validation_file": validation_file_id} if validation_file_id else {})
     )
     job_id = fine_tune_response.id
     print(f"Fine-tuning job created with ID: {job_id}")
@@ -108,43 +167,80 @@ def fine_tune(jsonl_file, model = MODEL):
     print(f"Fine-tuning job completed with status: {status}")
     if status == "succeeded":
         print(f"🎉 Fine-tuned model ID: {job_status.fine_tuned_model}")
+        # Read by the model router, which offers the model to agents whose route lists "fine-tuned"
+        with open(Config.FINE_TUNED_MODEL_FILE, "w") as f:
+            f.write(job_status.fine_tuned_model + "\n")
+        print(f"Saved model ID to {Config.FINE_TUNED_MODEL_FILE}")
     else:
         print("⚠️ Fine-tuning failed.")
 
-if os.path.exists(WORKDIR):
-    shutil.rmtree(WORKDIR)
-
-os.makedirs(WORKDIR, exist_ok=True)
-
-final_data = []
-
-for repo_url in GITHUB_REPOS:
-    repo_name = repo_url.split("/")[-1]
-    repo_path = os.path.join(WORKDIR, repo_name)
-    print(f"Cloning {repo_url}...")
-    Repo.clone_from(repo_url, repo_path)
-
-    for root, dirs, files in os.walk(repo_path):
-        for file in files:
-            if file.endswith(".py"):
-                full_path = os.path.join(root, file)
-                functions = extract_features(full_path)
-                for f in functions:
-                    pairs = generate_instruction_pairs(f)
-                    for pair in pairs:
-                        pair = autofill_output(pair)
-                        final_data.append(pair)
-
-with open(RAW_FILE, "w") as f:
-    for item in final_data:
-        f.write(json.dumps(item) + "\n")
-
-print(f"Saved {len(final_data)} examples to {RAW_FILE}")
-
-with open(CHAT_FILE, "w") as f:
-    for item in final_data:
-        if item.get("output"):  # only include fully-filled examples
-            chat_example = convert_to_chat_format(item)
-            f.write(json.dumps(chat_example) + "\n")
-
-fine_tune(CHAT_FILE)
\ No newline at end of file
+def unique_lines(raw_file):
+    """Line numbers of `raw_file` worth training on: one per (snippet, instruction),
+    skipping snippets that are near duplicates of an earlier one."""
+    snippet_ids, instruction_ids = {}, {}
+    lines = []  # (snippet id, instruction id) per line; None for unfilled pairs
+
+    def new_snippets():
+        for item in read_jsonl(raw_file):
+            if not item.get("output"):
+                lines.append(None)
+                continue
+            digest = hashlib.sha1(item["input"].encode("utf-8")).digest()
+            if digest not in snippet_ids:
+                snippet_ids[digest] = len(snippet_ids)
+                yield item["input"]
+            instruction = instruction_ids.setdefault(item["instruction"], len(instruction_ids))
+            lines.append((snippet_ids[digest], instruction))
+
+    representatives = MinHashDeduper().duplicates(new_snippets())
+    keep, seen = set(), set()
+    for line_number, entry in enumerate(lines):
+        if entry is None or representatives[entry[0]] != entry[0] or entry in seen:
+            continue
+        seen.add(entry)
+        keep.add(line_number)
+    return keep
+
+def write_chat_file(raw_file, chat_file):
+    """Returns (examples written, filled examples dropped as duplicates)."""
+    keep = unique_lines(raw_file) if Config.DEDUP_ENABLED else None
+    dropped = 0
+    with JsonlWriter(chat_file) as out:
+        for line_number, item in enumerate(read_jsonl(raw_file)):
+            if not item.get("output"):  # only include fully-filled examples
+                continue
+            if keep is not None and line_number not in keep:
+                dropped += 1
+                continue
+            out.write(convert_to_chat_format(item))
+    return out.count, dropped
+
+def main():
+    started = time.perf_counter()
+    # Kept between runs; only repos whose HEAD moved are fetched again
+    repo_paths = fetch_repos(GITHUB_REPOS, Config.REPO_CACHE_DIR)
+    print(f"Fetched {len(repo_paths)} of {len(GITHUB_REPOS)} repos in {time.perf_counter() - started:.1f}s")
+
+    done = load_done_keys(RAW_FILE)
+    if done:
+        print(f"Resuming: {len(done)} pairs already in {RAW_FILE}")
+    functions_by_file = extract_functions(list(python_files(repo_paths)))
+    pending = (pair for pair in iter_pairs(functions_by_file) if pair_key(pair) not in done)
+    saved, failed, seconds = asyncio.run(autofill_outputs(pending, RAW_FILE))
+    print(f"Saved {saved} new examples to {RAW_FILE} in {seconds:.1f}s ({saved / max(seconds, 1e-9):.1f} pairs/sec)")
+    if failed:
+        print(f"⚠️ {failed} pairs failed and will be retried on the next run")
+
+    count, dropped = write_chat_file(RAW_FILE, CHAT_FILE)
+    print(f"Saved {count} examples to {CHAT_FILE} ({dropped} duplicates or near duplicates dropped)")
+
+    stats = dataset_stats(CHAT_FILE, MODEL)
+    print(f"{stats['tokens']} tokens, {stats['mean_tokens']:.0f} per example (max {stats['max_tokens']}, "
+          f"{stats['over_limit']} over the {Config.DATASET_MAX_EXAMPLE_TOKENS} token limit)")
+    train_count, val_count = split_train_val(CHAT_FILE, TRAIN_FILE, VAL_FILE)
+    print(f"Split into {train_count} training and {val_count} validation examples")
+
+    fine_tune(TRAIN_FILE, validation_file = VAL_FILE if val_count else None)
+
+if __name__ == "__main__":
+    main()
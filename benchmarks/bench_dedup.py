@@ -0,0 +1,85 @@
+import sys
+import os
+import time
+import random
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from shared.dedup import MinHashDeduper
+
+# Near-duplicate filtering of synthetic function snippets. A share of the
+# snippets are copies of earlier ones with a comment added, a constant changed
+# or a line appended (like the same helper pasted into several repos); the
+# rest are distinct. Reports time, snippets dropped, and how many of the
+# planted copies were found / how many distinct snippets were wrongly dropped.
+# Run from the repo root: python -m benchmarks.bench_dedup
+
+WORDS = ["task", "queue", "path", "data", "value", "index", "result", "item", "config", "agent", "model", "file"]
+
+
+def snippet(rng, i):
+    name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}"
+    args = ", ".join(rng.sample(WORDS, rng.randint(1, 3)))
+    lines = [f"def {name}({args}):", f'    """Handle {rng.choice(WORDS)} for {rng.choice(WORDS)} {i}."""']
+    for j in range(rng.randint(4, 14)):
+        a, b, c = rng.choice(WORDS), rng.choice(WORDS), rng.choice(WORDS)
+        template = rng.choice([
+            "    {a} = {b}.get('{c}', {n})",
+            "    if {a} > {n}:\n        {b}.append({c})",
+            "    for {a} in {b}:\n        {c} += {a} * {n}",
+            "    {a}_{n} = load_{b}({c})",
+        ])
+        lines.append(template.format(a = a, b = b, c = c, n = rng.randint(0, 10000)))
+    lines.append(f"    return {rng.choice(WORDS)}")
+    return "\n".join(lines) + "\n"
+
+
+def near_copy(rng, text):
+    lines = text.splitlines()
+    edit = rng.choice(["comment", "constant", "line"])
+    if edit == "comment":
+        lines.insert(rng.randint(1, len(lines) - 1), "    # keep in sync with the other copy")
+    elif edit == "constant":
+        i = rng.randint(2, len(lines) - 2)
+        lines[i] = lines[i].rstrip("0123456789)'") + "7)" if lines[i].endswith(")") else lines[i]
+    else:
+        lines.insert(len(lines) - 1, "    print('done')")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snippets", type = int, default = 200000)
+    parser.add_argument("--duplicate-rate", type = float, default = 0.3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts, source = [], []
+    for i in range(args.snippets):
+        if texts and rng.random() < args.duplicate_rate:
+            original = rng.randrange(len(texts))
+            texts.append(near_copy(rng, texts[original]))
+            source.append(source[original])
+        else:
+            texts.append(snippet(rng, i))
+            source.append(i)
+    print(f"{len(texts)} snippets, {sum(map(len, texts)) / 1e6:.0f} MB")
+
+    deduper = MinHashDeduper()
+    start = time.perf_counter()
+    signatures = deduper.signatures(texts)
+    signed = time.perf_counter()
+    representatives = deduper.representatives(signatures)
+    done = time.perf_counter()
+
+    planted = sum(1 for i, s in enumerate(source) if s != i)
+    found = sum(1 for i, r in enumerate(representatives) if r != i and source[r] == source[i])
+    wrong = sum(1 for i, r in enumerate(representatives) if r != i and source[r] != source[i])
+    print(f"signatures {signed - start:.2f}s, lsh {done - signed:.2f}s, total {done - start:.2f}s")
+    print(f"dropped {sum(1 for i, r in enumerate(representatives) if r != i)}: "
+          f"{found}/{planted} planted copies found, {wrong} distinct snippets dropped")
+
+
+if __name__ == "__main__":
+    main()
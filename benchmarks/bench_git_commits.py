@@ -0,0 +1,95 @@
+import sys
+import os
+import time
+import tempfile
+import argparse
+import multiprocessing
+import git
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from shared.git_utils import CommitBatcher
+
+# Compares committing generated files one commit per file (the old
+# commit_generated_code) with CommitBatcher, against a throwaway repo.
+# Also checks that several worker processes batching into the same repo
+# lose no files. Run from the repo root: python -m benchmarks.bench_git_commits
+
+
+def init_repo(path):
+    repo = git.Repo.init(path)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "bench")
+        config.set_value("user", "email", "bench@example.com")
+    return repo
+
+
+def write_files(repo_path, prefix, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(repo_path, f"{prefix}_{i}.py")
+        with open(path, "w") as f:
+            f.write(f"def generated_{i}():\n    return {i}\n")
+        paths.append(path)
+    return paths
+
+
+def per_file(repo_path, paths):
+    # What commit_generated_code used to do: fresh Repo, one commit per file.
+    for i, path in enumerate(paths):
+        repo = git.Repo(repo_path)
+        repo.index.add([path])
+        repo.index.commit(f"Add generated code for task: module {i}")
+    return len(paths)
+
+
+def batched(repo_path, paths, batch_size):
+    batcher = CommitBatcher(repo_path, window = 0, max_files = batch_size)
+    for i, path in enumerate(paths):
+        batcher.add(path, f"module {i}")
+    batcher.flush()
+    return batcher.commits
+
+
+def worker(repo_path, prefix, count, batch_size):
+    paths = write_files(repo_path, prefix, count)
+    batched(repo_path, paths, batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type = int, default = 200)
+    parser.add_argument("--batch-size", type = int, default = 50)
+    parser.add_argument("--processes", type = int, default = 4)
+    args = parser.parse_args()
+
+    print(f"{'mode':<22} {'files':>6} {'commits':>8} {'seconds':>8} {'files/s':>8} {'commits/s':>10}")
+    for mode in ("per-file", "batched"):
+        with tempfile.TemporaryDirectory() as tmp:
+            init_repo(tmp)
+            paths = write_files(tmp, "module", args.files)
+            start = time.perf_counter()
+            commits = per_file(tmp, paths) if mode == "per-file" else batched(tmp, paths, args.batch_size)
+            elapsed = time.perf_counter() - start
+            print(f"{mode:<22} {args.files:>6} {commits:>8} {elapsed:>8.2f} {args.files / elapsed:>8.0f} {commits / elapsed:>10.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = init_repo(tmp)
+        per_process = args.files // args.processes
+        ctx = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        processes = [ctx.Process(target = worker, args = (tmp, f"w{n}", per_process, args.batch_size // 4 or 1)) for n in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        tracked = len(repo.git.ls_files().splitlines())
+        commits = int(repo.git.rev_list("--count", "HEAD"))
+        expected = per_process * args.processes
+        print(f"{f'batched x{args.processes} procs':<22} {tracked:>6} {commits:>8} {elapsed:>8.2f} {tracked / elapsed:>8.0f} {commits / elapsed:>10.1f}")
+        print(f"Concurrent check: {tracked}/{expected} files committed" + (" OK" if tracked == expected else " MISSING FILES"))
+
+
+if __name__ == "__main__":
+    main()
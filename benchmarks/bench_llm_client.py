@@ -0,0 +1,80 @@
+import io
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from openai import OpenAI
+from config.config import Config
+from benchmarks.stub_openai_server import start_stub_server
+
+# Compares the old per-call client against the shared pooled client.
+# Run from the repo root: python -m benchmarks.bench_llm_client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type = int, default = 50)
+    parser.add_argument("--delay", type = float, default = 0.05, help = "Simulated LLM latency in seconds")
+    args = parser.parse_args()
+
+    server = start_stub_server(delay = args.delay)
+    Config.OPENAI_BASE_URL = server.base_url
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "stub-key"
+    # Every pass must reach the server; cached replies would make the later passes look free.
+    Config.LLM_CACHE_ENABLED = False
+    # Measure the client, not the client-side rate limits (bench_rate_limit covers those).
+    Config.LLM_RPM_LIMIT = Config.LLM_TPM_LIMIT = 0
+
+    # Imported after Config is pointed at the stub so the shared client picks it up.
+    from agents.base_agent import BaseAgent
+
+    class EchoAgent(BaseAgent):
+        async def run_task_async(self, task):
+            out = io.StringIO()
+            await self._complete_into(out, task["description"], "gpt-4o-mini", 0.2, task, strip_fences = False)
+            return out.getvalue()
+
+    agent = EchoAgent(name = "Echo Agent", vector_store = None)
+
+    def make_tasks(label):
+        # Distinct prompts per pass, so no pass can be served from a cache.
+        return [{"description": f"{label} task {i}"} for i in range(args.tasks)]
+
+    def report(label, elapsed):
+        print(f"{label:<40} {args.tasks / elapsed:8.1f} tasks/sec ({elapsed:.2f}s)")
+
+    tasks = make_tasks("per-call")
+    start = time.perf_counter()
+    for task in tasks:
+        client = OpenAI(api_key = Config.OPENAI_API_KEY, base_url = Config.OPENAI_BASE_URL)
+        client.chat.completions.create(
+            model = "gpt-4o-mini",
+            messages = [{"role": "user", "content": task["description"]}],
+            temperature = 0.2,
+        )
+    report("serial, new client per task", time.perf_counter() - start)
+
+    tasks = make_tasks("serial")
+    start = time.perf_counter()
+    for task in tasks:
+        agent.run_task(task)
+    report("serial, shared pooled client (run_task)", time.perf_counter() - start)
+
+    tasks = make_tasks("async")
+
+    async def run_all():
+        await asyncio.gather(*(agent.run_task_async(task) for task in tasks))
+
+    start = time.perf_counter()
+    asyncio.run(run_all())
+    report("async, shared pooled client", time.perf_counter() - start)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
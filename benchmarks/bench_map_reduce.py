@@ -0,0 +1,91 @@
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.stub_openai_server import start_stub_server
+from config.config import Config
+
+# Wall-clock time for TestingAgent on a large module: one streamed prompt
+# versus map-reduce over top-level functions at increasing concurrency.
+# The stub server answers every request with the same latency regardless of
+# size (so the single prompt looks unrealistically cheap); the
+# map-reduce time should fall roughly as 1/concurrency.
+# Run from the repo root: python -m benchmarks.bench_map_reduce
+
+REPLY = """```python
+import pytest
+from module import compute
+
+
+@pytest.fixture
+def values():
+    return [1, 2, 3]
+
+
+def test_compute(values):
+    assert compute(values) is not None
+```"""
+
+
+def synthetic_module(functions):
+    lines = ["import math", "import os", ""]
+    for i in range(functions):
+        lines.append(f"def compute_{i}(values, scale = {i + 1}):")
+        lines.append(f'    """Scale and sum values for variant {i}."""')
+        for j in range(12):
+            lines.append(f"    values = [math.sqrt(abs(v * scale + {j})) for v in values if v is not None]")
+        lines.append("    return sum(values)")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type = int, default = 24)
+    parser.add_argument("--latency", type = float, default = 0.3, help = "Stub server latency per request (s)")
+    parser.add_argument("--concurrency", type = int, nargs = "+", default = [1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server = start_stub_server(delay = args.latency, reply = REPLY, token_delay = 0.002)
+    Config.OPENAI_BASE_URL = server.base_url
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "stub"
+    Config.LLM_CACHE_ENABLED = False
+    Config.INDEX_ON_WRITE = False
+    Config.MAP_REDUCE_CHUNK_TOKENS = 400
+
+    from agents.testing_agent import TestingAgent, PROMPT_TEMPLATE, MODEL
+    from shared.map_reduce import merge_test_files
+    agent = TestingAgent("Testing Agent", None)
+    code = synthetic_module(args.functions)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "test_module.py")
+        prompts = PROMPT_TEMPLATE.build(MODEL, chunk_field = "code_content", code_content = code, context = "")
+        start = time.perf_counter()
+        asyncio.run(agent.stream_output(prompts, model = MODEL, temperature = 0.2, file_path = out, strip_fences = True))
+        single = time.perf_counter() - start
+        print(f"\n{'mode':<24} {'requests':>8} {'seconds':>8} {'speedup':>8}")
+        print(f"{'single prompt':<24} {len(prompts):>8} {single:>8.2f} {1.0:>8.2f}")
+
+        baseline = None
+        for concurrency in args.concurrency:
+            Config.MAP_REDUCE_CONCURRENCY = concurrency
+            task = {}
+            start = time.perf_counter()
+            asyncio.run(agent.map_reduce_output(
+                PROMPT_TEMPLATE, MODEL, 0.2, out, merge_test_files, task = task, strip_fences = True,
+                code_content = code, context = "",
+            ))
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            label = f"map-reduce x{concurrency}"
+            print(f"{label:<24} {task['map_reduce']['chunks']:>8} {elapsed:>8.2f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
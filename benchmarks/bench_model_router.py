@@ -0,0 +1,96 @@
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.stub_openai_server import start_stub_server
+from config.config import Config
+
+# Request latency through the model router against three local providers:
+# "down" fails every request, "tail" is fast but 4% of its replies take
+# 1.5s, and "steady" always takes 0.3s. Compares sending everything to
+# "tail" alone with routing, and with routing plus hedged requests, which
+# should cut the p99 tail while "down" is skipped after its first failures.
+# Run from the repo root: python -m benchmarks.bench_model_router
+
+AGENT = "Testing Agent"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_requests(send, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await send([{"role": "user", "content": f"request {i}"}])
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type = int, default = 300)
+    parser.add_argument("--concurrency", type = int, default = 4)
+    parser.add_argument("--stream", action = "store_true", help = "Route streamed completions instead of buffered ones")
+    args = parser.parse_args()
+
+    servers = {
+        "down": start_stub_server(delay = 0.05, fail_rate = 1.0),
+        "tail": start_stub_server(delay = 0.1, slow_rate = 0.04, slow_delay = 1.5),
+        "steady": start_stub_server(delay = 0.3),
+    }
+    Config.LLM_PROVIDERS = {name: {"base_url": server.base_url, "api_key": "stub"} for name, server in servers.items()}
+    Config.ROUTER_HEDGE_DELAY = 0.5
+    Config.ROUTER_MIN_HEDGE_DELAY = 0.05
+
+    from shared.llm_client import chat_completion, stream_chat_completion
+    from shared.model_router import ModelRouter
+
+    async def consume(stream):
+        async for _ in stream:
+            pass
+
+    def direct(messages):
+        if args.stream:
+            return consume(stream_chat_completion("tail", model = "stub", messages = messages))
+        return chat_completion("tail", model = "stub", messages = messages)
+
+    print(f"{'mode':<22} {'ok':>5} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    scenarios = [("tail only", None, False), ("routed", ModelRouter, False), ("routed + hedging", ModelRouter, True)]
+    for label, router_class, hedging in scenarios:
+        Config.ROUTER_HEDGING = hedging
+        if router_class is None:
+            send = direct
+        else:
+            router = router_class({AGENT: ["down:stub", "tail:stub", "steady:stub"]})
+            if args.stream:
+                send = lambda messages: consume(router.stream_chat_completion(AGENT, model = "stub", messages = messages))
+            else:
+                send = lambda messages: router.chat_completion(AGENT, model = "stub", messages = messages)
+        latencies, errors = asyncio.run(run_requests(send, args.requests, args.concurrency))
+        print(
+            f"{label:<22} {len(latencies):>5} {errors:>6} {percentile(latencies, 0.5) * 1000:>8.0f} "
+            f"{percentile(latencies, 0.95) * 1000:>8.0f} {percentile(latencies, 0.99) * 1000:>8.0f} {max(latencies) * 1000:>8.0f}"
+        )
+        if router_class is not None:
+            print(router.summary() + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.stub_openai_server import start_stub_server
+from config.config import Config
+
+# LLM calls against a stub provider that allows 10 requests/s (429 with
+# Retry-After beyond that) and fails 2% of requests with a 500.
+#   no retries         - every 429/500 is lost work
+#   retries + backoff  - nothing is lost, but the client keeps hitting the limit
+#   + rpm limit        - the client paces itself under the limit, so almost no 429s
+# Run from the repo root: python -m benchmarks.bench_rate_limit
+
+
+async def run_requests(requests, concurrency):
+    from shared.llm_client import chat_completion
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = {}
+
+    async def one(i):
+        async with semaphore:
+            try:
+                await chat_completion(model = "stub", messages = [{"role": "user", "content": f"request {i}"}])
+            except Exception as e:
+                failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - start, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type = int, default = 150)
+    parser.add_argument("--concurrency", type = int, default = 16)
+    parser.add_argument("--rpm", type = int, default = 540, help = "Client-side limit for the last run (server allows 600)")
+    args = parser.parse_args()
+
+    server = start_stub_server(delay = 0.05, rps_limit = 10, retry_after = 1, fail_rate = 0.02)
+    Config.OPENAI_BASE_URL = server.base_url
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "stub"
+    Config.LLM_TPM_LIMIT = 0
+    Config.LLM_RATE_BURST_SECONDS = 1
+    Config.LLM_BACKOFF_BASE_SECONDS = 0.2
+
+    import shared.rate_limit as rate_limit
+    from shared.prompts import count_tokens
+    count_tokens("warm up the tokenizer outside the timed runs")
+    runs = [
+        ("no retries", dict(LLM_MAX_RETRIES = 0, LLM_RPM_LIMIT = 0)),
+        ("retries + backoff", dict(LLM_MAX_RETRIES = 8, LLM_RPM_LIMIT = 0)),
+        (f"+ {args.rpm} rpm limit", dict(LLM_MAX_RETRIES = 8, LLM_RPM_LIMIT = args.rpm)),
+    ]
+    results = []
+    for label, settings in runs:
+        for name, value in settings.items():
+            setattr(Config, name, value)
+        rate_limit._limiters.clear()
+        server.request_count = 0
+        seconds, failures = asyncio.run(run_requests(args.requests, args.concurrency))
+        limiter = rate_limit.get_limiter()
+        results.append((label, args.requests - sum(failures.values()), failures, limiter.throttled, server.request_count, seconds))
+        time.sleep(1)  # let the server's window clear between runs
+
+    print(f"\n{'mode':<20} {'ok':>5} {'429s':>6} {'http reqs':>9} {'seconds':>8}  lost")
+    for label, ok, failures, throttled, http_requests, seconds in results:
+        print(f"{label:<20} {ok:>5} {throttled:>6} {http_requests:>9} {seconds:>8.2f}  {failures or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import sys
+import os
+import time
+import tempfile
+import argparse
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from shared.task_store import TaskStore
+
+# Measures time-to-first-task for `python -m src.main`: process start until the
+# first task has been dispatched and finished. The task used is one that
+# returns without calling the LLM, so this is pure startup overhead.
+# Run from the repo root: python -m benchmarks.bench_startup
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def time_one_run(tmp):
+    store_path = os.path.join(tmp, f"tasks_{time.time_ns()}.db")
+    store = TaskStore(path = store_path, legacy_json = os.path.join(tmp, "missing.json"))
+    store.add({
+        "agent": "Testing Agent",
+        "description": "Startup probe (input file intentionally missing)",
+        "output_file": "test_missing.py",
+        "input_file": "__startup_probe_missing__.py",
+        "completed": False,
+    })
+    store.conn.close()
+
+    env = dict(os.environ, TASK_STORE_PATH = store_path, LLM_CACHE_ENABLED = "false")
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "src.main"],
+        cwd = REPO_ROOT, env = env, capture_output = True, text = True,
+    )
+    elapsed = time.perf_counter() - start
+    if output.returncode != 0:
+        print(output.stdout[-2000:], output.stderr[-2000:])
+        raise SystemExit("src.main failed")
+    return elapsed, "[RAG] Opening vector store" in output.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type = int, default = 5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = []
+        for _ in range(args.runs):
+            elapsed, opened_store = time_one_run(tmp)
+            timings.append(elapsed)
+    timings.sort()
+    print(f"time-to-first-task over {args.runs} runs: min {timings[0] * 1000:.0f} ms, median {timings[len(timings) // 2] * 1000:.0f} ms")
+    print(f"vector store opened during run: {opened_store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+import tempfile
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from shared.task_store import TaskStore
+
+# Shows that enqueue/dequeue cost stays flat as the queue grows, and what the
+# scheduler's claim (dependency-aware) + complete costs per task.
+# Run from the repo root: python -m benchmarks.bench_task_store
+
+
+def make_task(i):
+    return {
+        "agent": "Testing Agent",
+        "description": f"Write tests for module_{i}.py module",
+        "output_file": f"test_module_{i}.py",
+        "input_file": f"module_{i}.py",
+        "completed": False,
+    }
+
+
+def make_pipeline(count):
+    """Coding tasks interleaved with the Testing tasks that read their output, as the agents enqueue them."""
+    for i in range(count // 2):
+        yield {
+            "agent": "Coding Agent",
+            "description": f"Implement module_{i}.py",
+            "output_file": f"module_{i}.py",
+            "completed": False,
+        }
+        yield make_task(i)
+
+
+def time_claims(size, ops):
+    """Mean claim + complete time in microseconds with `size` open tasks, claiming as the scheduler does."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TaskStore(path = os.path.join(tmp, "tasks.db"), legacy_json = os.path.join(tmp, "missing.json"))
+        store.add_many(make_pipeline(size + ops))
+        start = time.perf_counter()
+        for _ in range(ops):
+            task = store.claim("bench", ready_only = True)
+            store.complete(task["id"], "bench")
+        elapsed = (time.perf_counter() - start) / ops * 1e6
+        store.conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [100, 1000, 10000, 100000])
+    parser.add_argument("--ops", type = int, default = 500, help = "Timed operations per size")
+    parser.add_argument("--claim-sizes", type = int, nargs = "+", default = [1000, 10000])
+    parser.add_argument("--claim-ops", type = int, default = 200, help = "Timed claims per size")
+    args = parser.parse_args()
+
+    print(f"{'queue size':>10} {'enqueue us/op':>14} {'dequeue us/op':>14}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TaskStore(path = os.path.join(tmp, "tasks.db"), legacy_json = os.path.join(tmp, "missing.json"))
+            store.add_many(make_task(i) for i in range(size))
+
+            start = time.perf_counter()
+            for i in range(size, size + args.ops):
+                store.add(make_task(i))
+            enqueue = (time.perf_counter() - start) / args.ops * 1e6
+
+            start = time.perf_counter()
+            for _ in range(args.ops):
+                task = store.next_pending()
+                store.mark_completed(task)
+            dequeue = (time.perf_counter() - start) / args.ops * 1e6
+
+            store.conn.close()
+        print(f"{size:>10} {enqueue:>14.1f} {dequeue:>14.1f}")
+
+    print(f"\n{'open tasks':>10} {'claim+complete us/op (ready_only)':>40}")
+    for size in args.claim_sizes:
+        print(f"{size:>10} {time_claims(size, args.claim_ops):>40.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import sys
+import os
+import time
+import tempfile
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from shared.embeddings import HashingEmbeddings
+from shared.vector_index import NumpyVectorStore
+
+# Measures the offline retrieval path (hashing embeddings + NumPy index):
+# bulk insert throughput and per-query latency at a few index sizes.
+# Run from the repo root: python -m benchmarks.bench_vector_index
+
+WORDS = "parse load save task queue agent model prompt token cache config retry worker index vector chunk".split()
+
+
+def synthetic_chunk(i):
+    picked = [WORDS[(i * 7 + j * 3) % len(WORDS)] for j in range(12)]
+    return f"def {picked[0]}_{picked[1]}_{i}(self):\n    return {' '.join(picked)}\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1000, 5000, 20000])
+    parser.add_argument("--queries", type = int, default = 200)
+    args = parser.parse_args()
+
+    embeddings = HashingEmbeddings()
+    print(f"{'chunks':>8} {'insert/s':>10} {'embed ms':>9} {'search ms':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = NumpyVectorStore(tmp, embeddings)
+            texts = [synthetic_chunk(i) for i in range(size)]
+            start = time.perf_counter()
+            for i in range(0, size, 64):
+                store.add_texts(texts[i:i + 64])
+            insert_rate = size / (time.perf_counter() - start)
+
+            queries = [f"{WORDS[i % len(WORDS)]} {WORDS[(i * 5) % len(WORDS)]} task" for i in range(args.queries)]
+            start = time.perf_counter()
+            vectors = [embeddings.embed_query(q) for q in queries]
+            embed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            start = time.perf_counter()
+            for vector in vectors:
+                store.similarity_search_by_vector(vector, k = 4)
+            search_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            print(f"{size:>8} {insert_rate:>10.0f} {embed_ms:>9.3f} {search_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import sys
+import os
+import time
+import random
+import tempfile
+import argparse
+import multiprocessing
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from shared.task_store import TaskStore
+
+# Runs many worker processes against one task store and checks that every
+# task is completed exactly once, including tasks whose worker crashed
+# mid-run and had to be reclaimed after its lease expired.
+# Run from the repo root: python -m benchmarks.stress_task_queue
+
+
+def open_store(path):
+    return TaskStore(path = path, legacy_json = path + ".missing.json")
+
+
+def worker(path, log_dir, worker_id, lease_seconds, crash_after):
+    store = open_store(path)
+    handled = 0
+    with open(os.path.join(log_dir, f"{worker_id}.log"), "w", buffering = 1) as log:
+        while True:
+            task = store.claim(worker_id, lease_seconds)
+            if task is None:
+                counts = store.counts()
+                if not counts.get("pending") and not counts.get("running"):
+                    return
+                time.sleep(0.05)
+                continue
+
+            log.write(f"start {task['id']}\n")
+            if crash_after is not None and handled == crash_after:
+                os._exit(1)  # Simulate a crash while holding the lease
+
+            time.sleep(random.uniform(0, 0.01))
+            store.heartbeat(task["id"], worker_id, lease_seconds)
+            if store.complete(task["id"], worker_id):
+                log.write(f"done {task['id']}\n")
+            handled += 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type = int, default = 2000)
+    parser.add_argument("--workers", type = int, default = 8)
+    parser.add_argument("--crashers", type = int, default = 2, help = "Workers that die holding a lease")
+    parser.add_argument("--lease", type = float, default = 1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tasks.db")
+        store = open_store(path)
+        store.add_many(
+            {"agent": "Stress Agent", "description": f"task {i}", "output_file": f"out_{i}.py"}
+            for i in range(args.tasks)
+        )
+
+        start = time.perf_counter()
+        processes = []
+        for i in range(args.workers):
+            crash_after = random.randint(0, 20) if i < args.crashers else None
+            process = multiprocessing.Process(
+                target = worker,
+                args = (path, tmp, f"worker-{i}", args.lease, crash_after),
+            )
+            process.start()
+            processes.append(process)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        starts, dones = Counter(), Counter()
+        for name in os.listdir(tmp):
+            if name.endswith(".log"):
+                with open(os.path.join(tmp, name)) as f:
+                    for line in f:
+                        event, task_id = line.split()
+                        (starts if event == "start" else dones)[int(task_id)] += 1
+
+        counts = store.counts()
+        lost = args.tasks - len(dones)
+        doubled = [task_id for task_id, n in dones.items() if n > 1]
+        reclaimed = [task_id for task_id, n in starts.items() if n > 1]
+
+        print(f"Processed {args.tasks} tasks with {args.workers} workers in {elapsed:.2f}s ({args.tasks / elapsed:.0f} tasks/sec)")
+        print(f"Final status counts: {counts}")
+        print(f"Reclaimed after crash: {len(reclaimed)}; lost: {lost}; completed twice: {len(doubled)}")
+        ok = lost == 0 and not doubled and counts.get("completed") == args.tasks
+        print("OK" if ok else "FAILED")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
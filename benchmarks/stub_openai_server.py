@@ -0,0 +1,258 @@
+import email.parser
+import email.policy
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Minimal local stand-in for the OpenAI HTTP API, used by the benchmarks so
+# they run offline and measure our client overhead rather than network noise.
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if not size:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def read_json(self):
+        body = self.read_body()
+        return json.loads(body) if body else {}
+
+    def read_multipart(self):
+        """Form fields of a multipart upload: name -> (filename, bytes)."""
+        raw = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self.read_body()
+        message = email.parser.BytesParser(policy = email.policy.HTTP).parsebytes(raw)
+        return {
+            part.get_param("name", header = "content-disposition"): (part.get_filename(), part.get_payload(decode = True))
+            for part in message.iter_parts()
+        }
+
+    def send_json(self, payload, status = 200, headers = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, request):
+        # Server-sent events, one word per chunk, with an optional per-token delay.
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chat_completion_chunks(request, self.server.reply):
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            time.sleep(self.server.token_delay)
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_bytes(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].rstrip("/").split("/")
+        if len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in self.server.batches:
+            self.send_json(self.server.batch_status(parts[-1]))
+        elif len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content" and parts[-2] in self.server.files:
+            self.send_bytes(self.server.files[parts[-2]]["content"])
+        else:
+            self.send_json({"error": {"message": f"Unknown path {self.path}"}}, status = 404)
+
+    def do_POST(self):
+        if self.path.endswith("/files"):
+            fields = self.read_multipart()
+            filename, content = fields["file"]
+            self.send_json(self.server.add_file(filename, content, fields["purpose"][1].decode()))
+            return
+        request = self.read_json()
+        if self.path.endswith("/batches"):
+            self.send_json(self.server.create_batch(request))
+        elif self.path.endswith("/chat/completions"):
+            self.server.record_request()
+            if random.random() < self.server.fail_rate:
+                self.send_json({"error": {"message": "stub provider failure", "type": "server_error"}}, status = 500)
+                return
+            if not self.server.admit():
+                self.send_json(
+                    {"error": {"message": "stub rate limit", "type": "rate_limit_exceeded"}},
+                    status = 429, headers = {"Retry-After": str(self.server.retry_after)},
+                )
+                return
+            slow = random.random() < self.server.slow_rate
+            time.sleep(self.server.slow_delay if slow else self.server.delay)
+            if request.get("stream"):
+                self.send_stream(request)
+            else:
+                self.send_json(chat_completion_payload(request, self.server.reply))
+        else:
+            self.send_json({"error": {"message": f"Unknown path {self.path}"}}, status = 404)
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay = 0.05, reply = "stub reply", port = 0, token_delay = 0.0, fail_rate = 0.0, slow_rate = 0.0, slow_delay = 1.0,
+                 rps_limit = None, retry_after = 1, batch_delay = 1.0):
+        super().__init__(("127.0.0.1", port), StubOpenAIHandler)
+        self.delay = delay
+        # Simulated provider trouble: a share of requests fail with a 500 or
+        # take `slow_delay`; over `rps_limit` requests/s get a 429 with Retry-After.
+        self.fail_rate = fail_rate
+        self.rps_limit = rps_limit
+        self.retry_after = retry_after
+        self.recent = deque()
+        self.batch_delay = batch_delay
+        self.files = {}
+        self.batches = {}
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.token_delay = token_delay
+        self.reply = reply
+        self.request_count = 0
+        self.count_lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-reply (cancelled or hedged requests) are expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    # --- Batch API (files + batches), completing each batch after `batch_delay` seconds ---
+
+    def add_file(self, filename, content, purpose):
+        file_id = f"file-stub{len(self.files) + 1}"
+        self.files[file_id] = {
+            "meta": {
+                "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": filename or "upload.jsonl", "purpose": purpose, "status": "processed",
+            },
+            "content": content,
+        }
+        return self.files[file_id]["meta"]
+
+    def create_batch(self, request):
+        batch_id = f"batch_stub{len(self.batches) + 1}"
+        total = sum(1 for line in self.files[request["input_file_id"]]["content"].splitlines() if line.strip())
+        self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": request["endpoint"], "errors": None,
+            "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+            "status": "validating", "output_file_id": None, "error_file_id": None,
+            "created_at": int(time.time()), "request_counts": {"total": total, "completed": 0, "failed": 0},
+            "metadata": request.get("metadata"), "started": time.monotonic(),
+        }
+        return self.batch_status(batch_id)
+
+    def batch_status(self, batch_id):
+        with self.count_lock:
+            batch = self.batches[batch_id]
+            if batch["status"] not in ("completed", "failed") and time.monotonic() - batch["started"] >= self.batch_delay:
+                self.run_batch(batch)
+            elif batch["status"] == "validating":
+                batch["status"] = "in_progress"
+            return {k: v for k, v in batch.items() if k != "started"}
+
+    def run_batch(self, batch):
+        outputs, errors = [], []
+        lines = self.files[batch["input_file_id"]]["content"].decode().splitlines()
+        for i, line in enumerate(l for l in lines if l.strip()):
+            request = json.loads(line)
+            self.request_count += 1
+            if random.random() < self.fail_rate:
+                errors.append({"id": f"batch_req_{i}", "custom_id": request["custom_id"], "response": {
+                    "status_code": 500, "body": {"error": {"message": "stub provider failure", "type": "server_error"}},
+                }, "error": None})
+            else:
+                outputs.append({"id": f"batch_req_{i}", "custom_id": request["custom_id"], "response": {
+                    "status_code": 200, "request_id": f"req_{i}", "body": chat_completion_payload(request["body"], self.reply),
+                }, "error": None})
+        for key, records in (("output_file_id", outputs), ("error_file_id", errors)):
+            if records:
+                content = "".join(json.dumps(record) + "\n" for record in records).encode()
+                batch[key] = self.add_file(f"{batch['id']}_{key}.jsonl", content, "batch_output")["id"]
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+
+    def admit(self):
+        if self.rps_limit is None:
+            return True
+        now = time.monotonic()
+        with self.count_lock:
+            while self.recent and now - self.recent[0] >= 1:
+                self.recent.popleft()
+            if len(self.recent) >= self.rps_limit:
+                return False
+            self.recent.append(now)
+            return True
+
+    def record_request(self):
+        with self.count_lock:
+            self.request_count += 1
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+def chat_completion_payload(request, reply):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": reply},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def chat_completion_chunks(request, reply):
+    base = {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+    }
+    words = reply.split(" ")
+    for i, word in enumerate(words):
+        text = word if i == len(words) - 1 else word + " "
+        yield dict(base, choices = [{"index": 0, "delta": {"content": text}, "finish_reason": None}])
+    yield dict(base, choices = [{"index": 0, "delta": {}, "finish_reason": "stop"}])
+    if (request.get("stream_options") or {}).get("include_usage"):
+        yield dict(base, choices = [], usage = {"prompt_tokens": 10, "completion_tokens": len(words), "total_tokens": 10 + len(words)})
+
+
+def start_stub_server(**kwargs):
+    server = StubOpenAIServer(**kwargs)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server
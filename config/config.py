@@ -1,4 +1,5 @@
 import os
+import json
 import dotenv
 
 dotenv.load_dotenv()
@@ -6,12 +7,189 @@ dotenv.load_dotenv()
 class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
     VECTOR_STORE_PATH = "vector_store"
     TASK_QUEUE_FILE = 'tasks_queue/tasks.json'
+    TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", "tasks_queue/tasks.db")
+    TASK_STORE_COMPACT_EVERY = int(os.getenv("TASK_STORE_COMPACT_EVERY", 1000))
+    TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", 300))
+    MAX_TASK_ATTEMPTS = int(os.getenv("MAX_TASK_ATTEMPTS", 3))
+    # A failed task is retried after this delay, doubling with each attempt (jittered)
+    TASK_RETRY_DELAY_SECONDS = float(os.getenv("TASK_RETRY_DELAY_SECONDS", 10))
     GENERATED_CODE_PATH = 'generated_code'
     LOG_FILE = "logs/ai_agents.log"
     TEST_CODE_PATH = "test_code"
     QA_REPORT_PATH = "qa_reports"
     README_PATH = "readme"
     REFACTOR_PATH = "refactored_code"
-    ARCHITECTURE_PATH = "ca_plan"
\ No newline at end of file
+    ARCHITECTURE_PATH = "ca_plan"
+    # Scheduler
+    MAX_WORKERS = int(os.getenv("MAX_WORKERS", 4))
+    SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", 1))
+    SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", 60))
+    WORKER_RESTART_DELAY = float(os.getenv("WORKER_RESTART_DELAY", 1))
+    DEFAULT_AGENT_CONCURRENCY = int(os.getenv("DEFAULT_AGENT_CONCURRENCY", 2))
+    AGENT_CONCURRENCY = {
+        "Code Architect Agent": 1,
+    }
+
+    # Shared LLM client connection pool
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 10))
+    LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", 30))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 120))
+    # Stream completions straight into output files (time-to-first-token, tokens/sec logged per task)
+    LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+
+    # Client-side rate limits per provider (0 disables), split between worker processes; a provider
+    # entry in LLM_PROVIDERS can override them with "rpm"/"tpm"
+    LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", 500))
+    LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", 200000))
+    # Most of a minute's allowance that may be used at once; the rest is paced evenly
+    LLM_RATE_BURST_SECONDS = float(os.getenv("LLM_RATE_BURST_SECONDS", 5))
+    # Reply size assumed when reserving tokens/min before the real usage is known
+    LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", 1000))
+    PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 1))
+    # Retries of 429/5xx/connection errors: jittered exponential backoff, or the provider's Retry-After
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 1))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 60))
+    # Circuit breaker: after this many consecutive failures a provider is not called for the reset period
+    LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", 5))
+    LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", 30))
+
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite3")
+    LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+
+    # Retrieval (RAG)
+    # "openai" or "hashing" (offline, CPU only)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+    HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", 1024))
+    # "chroma" or "numpy" (in-process, memory-mapped)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+    # Vectors from different embeddings can't share an index: each gets its own.
+    EMBEDDING_NAME = "openai" if EMBEDDING_BACKEND == "openai" else f"{EMBEDDING_BACKEND}-{HASHING_EMBEDDING_DIM}"
+    NUMPY_INDEX_PATH = os.path.join(VECTOR_STORE_PATH, "numpy_index", EMBEDDING_NAME)
+    CHROMA_COLLECTION = f"artifacts-{EMBEDDING_NAME}"
+    RAG_ENABLED = os.getenv("RAG_ENABLED", "true").lower() == "true"
+    RAG_TOP_K = int(os.getenv("RAG_TOP_K", 4))
+    RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", 1500))
+    RAG_AGENTS = [
+        "Code Architect Agent",
+        "Coding Agent",
+        "Testing Agent",
+        "Refactoring Agent",
+        "Documentation Agent",
+        "QA Agent",
+    ]
+
+    # Incremental indexing of generated artifacts
+    INDEX_ON_WRITE = os.getenv("INDEX_ON_WRITE", "true").lower() == "true"
+    INDEX_MANIFEST_PATH = os.path.join(VECTOR_STORE_PATH, f"index_manifest.{VECTOR_BACKEND}.{EMBEDDING_NAME}.json")
+    INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", 64))
+    INDEXED_DIRS = [GENERATED_CODE_PATH, TEST_CODE_PATH, REFACTOR_PATH, README_PATH, ARCHITECTURE_PATH]
+    CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", 4000))
+    # Structured logging (JSON lines via a background queue listener)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+    # Payloads (e.g. LLM output) longer than this are logged as preview + size + sha256 unless LOG_LEVEL=DEBUG
+    LOG_PAYLOAD_CHARS = int(os.getenv("LOG_PAYLOAD_CHARS", 500))
+
+    # Tracing and metrics
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    # Prometheus text endpoint at /metrics; each worker process takes the next free port. 0 disables it.
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
+    PROFILE_TRACE_PATH = os.getenv("PROFILE_TRACE_PATH")
+
+    # Git commits of generated code
+    GIT_BATCH_COMMITS = os.getenv("GIT_BATCH_COMMITS", "true").lower() == "true"
+    GIT_COMMIT_WINDOW_SECONDS = float(os.getenv("GIT_COMMIT_WINDOW_SECONDS", 30))
+    GIT_COMMIT_MAX_FILES = int(os.getenv("GIT_COMMIT_MAX_FILES", 50))
+
+    # Prompt token budgets (prompt side only; the rest of the context window is left for the reply)
+    DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv("DEFAULT_PROMPT_TOKEN_BUDGET", 8000))
+    PROMPT_TOKEN_BUDGETS = {
+        "gpt-3.5-turbo": 8000,
+        "gpt-4o-mini": 12000,
+        "gpt-4o": 12000,
+    }
+
+    # Map-reduce mode for Testing/Documentation agents on large modules
+    MAP_REDUCE_ENABLED = os.getenv("MAP_REDUCE_ENABLED", "true").lower() == "true"
+    # Modules with at least this many tokens are split by top-level function/class
+    MAP_REDUCE_MIN_TOKENS = int(os.getenv("MAP_REDUCE_MIN_TOKENS", 2000))
+    MAP_REDUCE_CHUNK_TOKENS = int(os.getenv("MAP_REDUCE_CHUNK_TOKENS", 1500))
+    MAP_REDUCE_CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", 4))
+
+    # Batch mode (python -m src.main --batch): tasks of these agents go through the Batch API
+    BATCH_AGENTS = ["Testing Agent", "Documentation Agent", "QA Agent", "Refactoring Agent"]
+    BATCH_DIR = os.getenv("BATCH_DIR", "batches")
+    BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+    BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", 30))
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 50000))
+    # Batched tasks stay leased for the whole completion window (plus a margin)
+    BATCH_LEASE_SECONDS = float(os.getenv("BATCH_LEASE_SECONDS", 26 * 3600))
+
+    # Incremental rebuilds: skip a task whose input file, prompt template version and model
+    # match the last successful run and whose output is untouched. Set a task's "force" to rerun it.
+    INCREMENTAL_BUILDS = os.getenv("INCREMENTAL_BUILDS", "true").lower() == "true"
+
+    # Model routing: each agent has an ordered list of "provider:model" backends; requests go to the
+    # fastest healthy one (see shared.model_router). "openai" uses OPENAI_API_KEY/OPENAI_BASE_URL; other
+    # providers are OpenAI-compatible endpoints. Backends whose provider has no API key are skipped.
+    MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+    LLM_PROVIDERS = json.loads(os.getenv("LLM_PROVIDERS", "null")) or {
+        "anthropic": {"base_url": "https://api.anthropic.com/v1/", "api_key": ANTHROPIC_API_KEY},
+    }
+    # "fine-tuned" in a route stands for the model from automated_model_trainer.py, if one exists
+    FINE_TUNED_MODEL = os.getenv("FINE_TUNED_MODEL")
+    FINE_TUNED_MODEL_FILE = os.getenv("FINE_TUNED_MODEL_FILE", "fine_tuned_model.txt")
+    MODEL_ROUTES = json.loads(os.getenv("MODEL_ROUTES", "null")) or {
+        "Code Architect Agent": ["openai:gpt-4o-mini", "anthropic:claude-3-5-haiku-latest"],
+        "Coding Agent": ["openai:gpt-4o-mini", "anthropic:claude-3-5-haiku-latest"],
+        "Refactoring Agent": ["openai:fine-tuned", "openai:gpt-4o-mini", "anthropic:claude-3-5-haiku-latest"],
+        "Documentation Agent": ["openai:fine-tuned", "openai:gpt-3.5-turbo", "openai:gpt-4o-mini"],
+        "Testing Agent": ["openai:gpt-3.5-turbo", "openai:gpt-4o-mini"],
+        "QA Agent": ["openai:gpt-3.5-turbo", "openai:gpt-4o-mini"],
+    }
+    # Rolling window of recent requests per backend for latency and error rate
+    ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", 50))
+    ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", 5))
+    # A backend over this error rate is skipped for ROUTER_COOLDOWN_SECONDS, then probed again
+    ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", 0.5))
+    ROUTER_COOLDOWN_SECONDS = float(os.getenv("ROUTER_COOLDOWN_SECONDS", 30))
+    # Hedged requests: if the first backend hasn't answered by its p95 latency, also ask the next one
+    ROUTER_HEDGING = os.getenv("ROUTER_HEDGING", "true").lower() == "true"
+    ROUTER_MAX_HEDGES = int(os.getenv("ROUTER_MAX_HEDGES", 1))
+    ROUTER_HEDGE_QUANTILE = float(os.getenv("ROUTER_HEDGE_QUANTILE", 0.95))
+    # Hedge delay until a backend has ROUTER_MIN_SAMPLES latencies, and the floor afterwards
+    ROUTER_HEDGE_DELAY = float(os.getenv("ROUTER_HEDGE_DELAY", 10))
+    ROUTER_MIN_HEDGE_DELAY = float(os.getenv("ROUTER_MIN_HEDGE_DELAY", 0.5))
+
+    # Instruction pairs automated_model_trainer.py generates at once (the shared LLM client's rate limits still apply)
+    GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", 8))
+    # Source repositories for automated_model_trainer.py: shallow checkouts kept between runs
+    REPO_CACHE_DIR = os.getenv("REPO_CACHE_DIR", "repos")
+    REPO_FETCH_WORKERS = int(os.getenv("REPO_FETCH_WORKERS", 8))
+    REPO_FETCH_DEPTH = int(os.getenv("REPO_FETCH_DEPTH", 1))
+    # Function extraction for automated_model_trainer.py, cached by file content
+    EXTRACT_CACHE_PATH = os.getenv("EXTRACT_CACHE_PATH", "cache/extracted_functions.sqlite3")
+    EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", os.cpu_count() or 1))
+    # Near-duplicate filtering of fine-tuning data (MinHash + LSH over character shingles)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.8))
+    DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", 64))
+    DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", 8))
+    DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", 8))
+
+    # Fine-tuning datasets (shared.dataset)
+    DATASET_BUFFER_BYTES = int(os.getenv("DATASET_BUFFER_BYTES", 1024 * 1024))
+    # Upload size cap per shard, and per-example token limit for fine-tuning
+    DATASET_SHARD_MAX_BYTES = int(os.getenv("DATASET_SHARD_MAX_BYTES", 512 * 1024 * 1024))
+    DATASET_MAX_EXAMPLE_TOKENS = int(os.getenv("DATASET_MAX_EXAMPLE_TOKENS", 16385))
+    DATASET_VAL_FRACTION = float(os.getenv("DATASET_VAL_FRACTION", 0.1))
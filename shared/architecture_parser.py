@@ -1,5 +1,7 @@
 import re
+from shared.tracing import traced
 
+@traced("plan.parse")
 def parse_architecture_plan(plan_path):
     print(f"[ArchitectureParser] Parsing architecture plan from: {plan_path}")
     
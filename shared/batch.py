@@ -0,0 +1,247 @@
+import glob
+import json
+import os
+import socket
+import time
+import uuid
+from openai import NotFoundError, OpenAI
+from config.config import Config
+from shared.incremental import is_up_to_date, record_build
+from shared.llm_cache import cache_key, get_response_cache
+from shared.streaming import strip_code_fences
+from shared.tracing import span
+
+# Batch mode (src.main --batch): pending Testing, Documentation, QA and
+# Refactoring tasks are sent as one Batch API job instead of one request at
+# a time. Each run writes batches/<name>.jsonl (the requests) and
+# batches/<name>.state.json (batch ids, task ids, worker id), so a run that
+# is interrupted while the batch is in progress resumes polling it instead
+# of submitting again.
+
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def get_batch_client():
+    return OpenAI(api_key = Config.OPENAI_API_KEY, base_url = Config.OPENAI_BASE_URL, max_retries = 3)
+
+
+def claim_batch_tasks(task_manager, worker_id):
+    """Lease every pending batch-able task whose input is ready."""
+    tasks = []
+    while True:
+        task = task_manager.claim_task(worker_id, Config.BATCH_LEASE_SECONDS, ready_only = True, agents = Config.BATCH_AGENTS)
+        if task is None:
+            return tasks
+        tasks.append(task)
+
+
+def build_requests(tasks, get_agent, task_manager, worker_id):
+    """Batch request lines for `tasks`, plus what's needed to fan the replies out again.
+
+    Tasks that are up to date are completed straight away and prompts whose
+    reply is already cached are not sent.
+    """
+    requests, entries = [], {}
+    cache = get_response_cache() if Config.LLM_CACHE_ENABLED else None
+    for task in tasks:
+        agent = get_agent(task["agent"])
+        if is_up_to_date(task, agent):
+            print(f"[Batch] {task['agent']}: inputs unchanged since the last run; skipping {task.get('description')}")
+            task_manager.complete_task(task, worker_id)
+            continue
+        built = agent.batch_prompts(task)
+        if built is None:
+            task_manager.fail_task(task, worker_id, f"Input file for {task.get('description')} does not exist")
+            continue
+        prompts, merge = built
+        keys = []
+        for part, prompt in enumerate(prompts):
+            messages = [{"role": "user", "content": str(prompt)}]
+            cache_messages = [{"role": "user", "content": getattr(prompt, "cache_text", str(prompt))}]
+            # Batches go to OpenAI with agent.model, the only backend whose replies are cached under it.
+            key = cache_key(agent.model, cache_messages, temperature = agent.temperature)
+            keys.append(key)
+            if cache is not None and not task.get("no_cache") and cache.get(key) is not None:
+                continue
+            requests.append({
+                "custom_id": f"{task['id']}-{part}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": agent.model, "messages": messages, "temperature": agent.temperature},
+            })
+        entries[str(task["id"])] = {"agent": task["agent"], "keys": keys, "merge": merge is not None}
+    return requests, entries
+
+
+def write_jsonl(path, lines):
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(json.dumps(line) + "\n")
+
+
+def submit(client, requests, name):
+    """Write the requests as JSONL files (split at `Config.BATCH_MAX_REQUESTS`) and submit each. Returns batch ids."""
+    batch_ids = []
+    for start in range(0, len(requests), Config.BATCH_MAX_REQUESTS):
+        suffix = f"-{start // Config.BATCH_MAX_REQUESTS + 1}" if len(requests) > Config.BATCH_MAX_REQUESTS else ""
+        path = os.path.join(Config.BATCH_DIR, f"{name}{suffix}.jsonl")
+        write_jsonl(path, requests[start:start + Config.BATCH_MAX_REQUESTS])
+        with span("batch.submit"), open(path, "rb") as f:
+            input_file = client.files.create(file = f, purpose = "batch")
+            batch = client.batches.create(
+                input_file_id = input_file.id,
+                endpoint = "/v1/chat/completions",
+                completion_window = Config.BATCH_COMPLETION_WINDOW,
+                metadata = {"description": f"ai_agents pipeline {name}"},
+            )
+        print(f"[Batch] Submitted {path} ({len(requests[start:start + Config.BATCH_MAX_REQUESTS])} requests) as {batch.id}")
+        batch_ids.append(batch.id)
+    return batch_ids
+
+
+def wait_for(client, batch_ids):
+    """Poll until every batch reaches a terminal status. Returns the final batch objects."""
+    batches = {}
+    with span("batch.wait"):
+        while True:
+            for batch_id in batch_ids:
+                if batch_id not in batches or batches[batch_id].status not in TERMINAL_STATUSES:
+                    batches[batch_id] = client.batches.retrieve(batch_id)
+            pending = [b for b in batches.values() if b.status not in TERMINAL_STATUSES]
+            for batch in batches.values():
+                counts = batch.request_counts
+                progress = f"{counts.completed + counts.failed}/{counts.total}" if counts else "?"
+                print(f"[Batch] {batch.id}: {batch.status} ({progress})")
+            if not pending:
+                return list(batches.values())
+            time.sleep(Config.BATCH_POLL_SECONDS)
+
+
+def read_results(client, batches):
+    """Map custom_id -> reply text, and custom_id -> error message, from the batches' output and error files."""
+    results, errors = {}, {}
+    for batch in batches:
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if record.get("error") or response.get("status_code") != 200:
+                    error = record.get("error") or (response.get("body") or {}).get("error") or {}
+                    errors[record["custom_id"]] = error.get("message") or f"status {response.get('status_code')}"
+                    continue
+                results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"] or ""
+        if batch.status != "completed":
+            print(f"[WARN] [Batch] {batch.id} ended as {batch.status}; requests without a result are re-queued")
+    return results, errors
+
+
+def fan_out(state, results, errors, get_agent, task_manager):
+    """Write each task's replies to the agent's usual output path and complete (or fail) the task."""
+    cache = get_response_cache() if Config.LLM_CACHE_ENABLED else None
+    worker_id = state["worker_id"]
+    written = 0
+    for task_id, entry in state["tasks"].items():
+        task = task_manager.store.get(int(task_id))
+        if task is None:
+            continue
+        agent = get_agent(entry["agent"])
+        replies, missing = [], None
+        for part, key in enumerate(entry["keys"]):
+            custom_id = f"{task_id}-{part}"
+            reply = results.get(custom_id)
+            if reply is None and cache is not None:
+                reply = cache.get(key)
+            elif reply is not None and cache is not None:
+                cache.put(key, reply)
+            if reply is None:
+                missing = errors.get(custom_id, "no result in batch output")
+                break
+            replies.append(strip_code_fences(reply) if agent.strip_fences else reply)
+        if missing is not None:
+            print(f"[ERROR] [Batch] {entry['agent']}: {task.get('description')}: {missing}")
+            task_manager.fail_task(task, worker_id, missing)
+            continue
+
+        started = time.time()
+        content = agent.merge(replies) if entry["merge"] else "\n\n".join(replies)
+        _, output_path = agent.artifact_paths(task)
+        agent.save_output(output_path, content)
+        record_build(task, agent, started)
+        task_manager.complete_task(task, worker_id)
+        written += 1
+    return written
+
+
+def state_path(name):
+    return os.path.join(Config.BATCH_DIR, f"{name}.state.json")
+
+
+def save_state(state):
+    path = state_path(state["name"])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent = 2)
+    os.replace(tmp_path, path)
+
+
+def unfinished_states():
+    states = []
+    for path in sorted(glob.glob(os.path.join(Config.BATCH_DIR, "*.state.json"))):
+        with open(path, "r") as f:
+            state = json.load(f)
+        if not state.get("done"):
+            states.append(state)
+    return states
+
+
+def finish(client, state, get_agent, task_manager):
+    try:
+        batches = wait_for(client, state["batch_ids"]) if state["batch_ids"] else []
+    except NotFoundError as e:
+        # E.g. submitted against a different endpoint; its tasks go back on the queue.
+        print(f"[WARN] [Batch] {state['name']}: batch no longer exists ({str(e)})")
+        batches = []
+    results, errors = read_results(client, batches)
+    written = fan_out(state, results, errors, get_agent, task_manager)
+    state["done"] = True
+    save_state(state)
+    print(f"[Batch] {state['name']}: wrote {written} of {len(state['tasks'])} task outputs")
+    return written
+
+
+def run_batch(task_manager, get_agent, prepare_fn = None):
+    """Run every pending batch-able task through the Batch API. Returns the number of outputs written.
+
+    Resumes batches left unfinished by an earlier run first. Tasks that other
+    tasks still have to produce inputs for, and tasks of interactive agents,
+    are left on the queue for a normal run.
+    """
+    os.makedirs(Config.BATCH_DIR, exist_ok = True)
+    client = get_batch_client()
+    written = 0
+    for state in unfinished_states():
+        print(f"[Batch] Resuming {state['name']} ({len(state['batch_ids'])} batches, {len(state['tasks'])} tasks)")
+        written += finish(client, state, get_agent, task_manager)
+
+    worker_id = f"batch:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    tasks = claim_batch_tasks(task_manager, worker_id)
+    if not tasks:
+        print("[Batch] No pending tasks for batch agents.")
+        return written
+    if prepare_fn is not None:
+        prepare_fn(tasks)
+
+    requests, entries = build_requests(tasks, get_agent, task_manager, worker_id)
+    if not entries:
+        return written
+    name = time.strftime("batch_%Y%m%d_%H%M%S")
+    state = {"name": name, "worker_id": worker_id, "batch_ids": [], "tasks": entries, "done": False}
+    save_state(state)  # before submitting, so the claimed tasks are never orphaned
+    state["batch_ids"] = submit(client, requests, name) if requests else []
+    save_state(state)
+    print(f"[Batch] {len(entries)} tasks, {len(requests)} requests ({sum(len(e['keys']) for e in entries.values()) - len(requests)} cached)")
+    return written + finish(client, state, get_agent, task_manager)
@@ -0,0 +1,93 @@
+import ast
+import io
+import re
+from config.config import Config
+
+
+def split_lines(text, max_chars):
+    """Split text on line boundaries into pieces of at most ~max_chars."""
+    pieces, current, size = [], [], 0
+    for line in text.splitlines(keepends = True):
+        if current and size + len(line) > max_chars:
+            pieces.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def source_lines(text):
+    """Split source into lines the way ast numbers them.
+
+    str.splitlines also breaks on form feeds, \x1c-\x1e, \x85 and U+2028/2029,
+    which would shift every slice taken by node.lineno after one of them.
+    """
+    return io.StringIO(text, newline = "").readlines()
+
+
+def python_blocks(text):
+    """Split Python source into top-level blocks using the AST.
+
+    Returns (name, source) pairs: one per top-level function/class (decorators
+    included) and one "module" block per run of other statements such as
+    imports and constants. Raises SyntaxError for unparsable source.
+    """
+    tree = ast.parse(text)
+    lines = source_lines(text)
+    blocks, loose = [], []
+
+    def flush_loose():
+        if loose:
+            blocks.append(("module", "".join(loose)))
+            loose.clear()
+
+    for node in tree.body:
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+        segment = "".join(lines[start:node.end_lineno])
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            flush_loose()
+            blocks.append((node.name, segment))
+        else:
+            loose.append(segment)
+    flush_loose()
+    return blocks
+
+
+def chunk_python(text, max_chars = None):
+    max_chars = max_chars or Config.CHUNK_MAX_CHARS
+    try:
+        blocks = python_blocks(text)
+    except SyntaxError:
+        return split_lines(text, max_chars)
+    chunks = []
+    for _, source in blocks:
+        chunks.extend(split_lines(source, max_chars) if len(source) > max_chars else [source])
+    return chunks
+
+
+def chunk_markdown(text, max_chars = None):
+    max_chars = max_chars or Config.CHUNK_MAX_CHARS
+    sections, current = [], []
+    for line in text.splitlines(keepends = True):
+        if re.match(r"#{1,6}\s", line) and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    chunks = []
+    for section in sections:
+        chunks.extend(split_lines(section, max_chars) if len(section) > max_chars else [section])
+    return chunks
+
+
+def chunk_file(path, text, max_chars = None):
+    if path.endswith(".py"):
+        chunks = chunk_python(text, max_chars)
+    elif path.endswith(".md"):
+        chunks = chunk_markdown(text, max_chars)
+    else:
+        chunks = split_lines(text, max_chars or Config.CHUNK_MAX_CHARS)
+    return [chunk for chunk in chunks if chunk.strip()]
@@ -0,0 +1,135 @@
+import ast
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from config.config import Config
+from shared.chunking import source_lines
+
+# Function extraction for automated_model_trainer.py. Every function and
+# method in a file is returned with its qualified name and its exact source
+# (decorators included, dedented), parsed with `ast`. Results are cached by
+# file content, so unchanged files from a fresh clone are never parsed again.
+
+# Bump when python_functions() changes what it returns, to invalidate the cache.
+EXTRACTOR_VERSION = "3"
+
+# Statements whose bodies may hold definitions: `if TYPE_CHECKING:`, try/except
+# import fallbacks, version-gated code.
+COMPOUND_STATEMENTS = (ast.If, ast.Try, ast.With, ast.AsyncWith) + ((ast.TryStar,) if hasattr(ast, "TryStar") else ())
+
+
+def python_functions(source):
+    """(qualified name, source) for each function and method in `source`.
+
+    Names follow `__qualname__` ("Class.method", "Outer.Inner.method").
+    Definitions inside if/try/with blocks are included, from every branch.
+    Functions nested in other functions stay part of the enclosing function's
+    source rather than being split off. Raises SyntaxError for unparsable source.
+    """
+    tree = ast.parse(source)
+    lines = source_lines(source)
+    functions = []
+
+    def visit(body, prefix):
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                visit(node.body, f"{prefix}{node.name}.")
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                start = min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1
+                segment = textwrap.dedent("".join(lines[start:node.end_lineno]))
+                functions.append((prefix + node.name, segment))
+            elif isinstance(node, COMPOUND_STATEMENTS):
+                # Blocks don't add to the qualified name.
+                visit(node.body, prefix)
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body, prefix)
+                visit(getattr(node, "orelse", []), prefix)
+                visit(getattr(node, "finalbody", []), prefix)
+
+    visit(tree.body, "")
+    return functions
+
+
+def parse_functions(source):
+    try:
+        return python_functions(source)
+    except (SyntaxError, ValueError):
+        return []  # e.g. Python 2 files, or null bytes
+
+
+def content_key(data):
+    return hashlib.sha256(EXTRACTOR_VERSION.encode() + b"\0" + data).hexdigest()
+
+
+class ExtractCache:
+    """Persistent content hash -> extracted functions."""
+
+    def __init__(self, path = None):
+        self.path = path or Config.EXTRACT_CACHE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        self.conn = sqlite3.connect(self.path, isolation_level = None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS functions (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, value FROM functions WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            found.update((key, [tuple(item) for item in json.loads(value)]) for key, value in rows)
+        return found
+
+    def put_many(self, entries):
+        self.conn.execute("BEGIN")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO functions (key, value) VALUES (?, ?)",
+            [(key, json.dumps(functions)) for key, functions in entries.items()],
+        )
+        self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+
+def extract_functions(paths, workers = None, cache = None):
+    """Map each path to its [(qualified name, source)], parsing only files not seen before.
+
+    Cache misses are parsed in a process pool of `workers` processes
+    (default `Config.EXTRACT_WORKERS`).
+    """
+    workers = workers or Config.EXTRACT_WORKERS
+    own_cache = cache is None
+    cache = cache or ExtractCache()
+    keys, sources = {}, {}
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        keys[path] = content_key(data)
+        sources[keys[path]] = data
+
+    found = cache.get_many(set(keys.values()))
+    missing = [key for key in sources if key not in found]
+    texts = [sources[key].decode("utf-8", errors = "ignore") for key in missing]
+    if len(missing) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers = min(workers, len(missing)), mp_context = multiprocessing.get_context("spawn")) as pool:
+            parsed = list(pool.map(parse_functions, texts, chunksize = max(1, len(texts) // (workers * 4))))
+    else:
+        parsed = [parse_functions(text) for text in texts]
+    new = dict(zip(missing, parsed))
+    if new:
+        cache.put_many(new)
+    found.update(new)
+    parsed_files = sum(1 for key in keys.values() if key in new)
+    print(f"[Extract] {len(keys)} files: {len(keys) - parsed_files} cached, {parsed_files} parsed")
+    if own_cache:
+        cache.close()
+    return {path: found[key] for path, key in keys.items()}
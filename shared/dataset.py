@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import zlib
+from config.config import Config
+from shared.prompts import count_tokens
+
+# Streaming helpers for JSONL datasets (training_data_raw.jsonl,
+# training_data_chat.jsonl): every function reads or writes one line at a
+# time, so memory stays flat however large the dataset is.
+
+# Fixed per-message overhead of the chat format, as counted by OpenAI.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+def read_jsonl(path):
+    """Yield one parsed object per non-empty line."""
+    with open(path, "r", encoding = "utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def repair_jsonl(path):
+    """Cut off a last line left half-written by a crash. Returns the bytes removed."""
+    if not os.path.exists(path):
+        return 0
+    size = os.path.getsize(path)
+    complete = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            complete += len(line)
+    if complete < size:
+        os.truncate(path, complete)
+    return size - complete
+
+
+class JsonlWriter:
+    """Buffered JSONL writer; lines are written in blocks of ~`buffer_bytes`.
+
+    `buffer_bytes = 0` writes (and flushes) every line at once, for files that
+    double as a checkpoint. Use as a context manager so the tail is flushed.
+    """
+
+    def __init__(self, path, append = False, buffer_bytes = None):
+        self.path = path
+        self.buffer_bytes = Config.DATASET_BUFFER_BYTES if buffer_bytes is None else buffer_bytes
+        self.file = open(path, "a" if append else "w", encoding = "utf-8")
+        self.buffer = []
+        self.buffered = 0
+        self.count = 0
+        self.bytes = 0
+
+    def write(self, item):
+        line = json.dumps(item, ensure_ascii = False) + "\n"
+        self.write_line(line)
+
+    def write_line(self, line):
+        self.buffer.append(line)
+        size = len(line.encode("utf-8"))
+        self.buffered += size
+        self.bytes += size
+        self.count += 1
+        if self.buffered >= self.buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write("".join(self.buffer))
+            self.buffer, self.buffered = [], 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def example_tokens(example, model = "gpt-3.5-turbo"):
+    """Tokens in one example: chat format ({"messages": [...]}) or a raw instruction pair."""
+    if "messages" in example:
+        return TOKENS_PER_REPLY + sum(
+            TOKENS_PER_MESSAGE + count_tokens(str(message.get("content") or ""), model)
+            for message in example["messages"]
+        )
+    text = "\n\n".join(str(example.get(field) or "") for field in ("instruction", "input", "output"))
+    return count_tokens(text, model)
+
+
+def dataset_stats(path, model = "gpt-3.5-turbo", max_tokens = None):
+    """Example count, token totals and the number of examples over `max_tokens`, in one pass."""
+    max_tokens = max_tokens or Config.DATASET_MAX_EXAMPLE_TOKENS
+    stats = {"examples": 0, "tokens": 0, "min_tokens": None, "max_tokens": 0, "over_limit": 0, "bytes": os.path.getsize(path)}
+    for example in read_jsonl(path):
+        tokens = example_tokens(example, model)
+        stats["examples"] += 1
+        stats["tokens"] += tokens
+        stats["min_tokens"] = tokens if stats["min_tokens"] is None else min(stats["min_tokens"], tokens)
+        stats["max_tokens"] = max(stats["max_tokens"], tokens)
+        stats["over_limit"] += tokens > max_tokens
+    stats["mean_tokens"] = stats["tokens"] / stats["examples"] if stats["examples"] else 0
+    return stats
+
+
+def write_shards(path, max_bytes = None):
+    """Split `path` into <name>-00001.jsonl, ... of at most `max_bytes` each (whole lines). Returns the shard paths."""
+    max_bytes = max_bytes or Config.DATASET_SHARD_MAX_BYTES
+    stem, ext = os.path.splitext(path)
+    shards, writer = [], None
+    with open(path, "r", encoding = "utf-8") as f:
+        for line in f:
+            size = len(line.encode("utf-8"))
+            if writer is None or (writer.bytes and writer.bytes + size > max_bytes):
+                if writer is not None:
+                    writer.close()
+                shards.append(f"{stem}-{len(shards) + 1:05d}{ext}")
+                writer = JsonlWriter(shards[-1])
+            writer.write_line(line)
+    if writer is not None:
+        writer.close()
+    return shards
+
+
+def split_train_val(path, train_path, val_path, val_fraction = None, seed = 0):
+    """Stream `path` into a train and a validation file. Returns (train count, validation count).
+
+    Each line goes to validation when its hash falls under `val_fraction`, so
+    the split is the same on every run and the same example never lands in
+    both files.
+    """
+    val_fraction = Config.DATASET_VAL_FRACTION if val_fraction is None else val_fraction
+    cutoff = int(val_fraction * 2 ** 32)
+    with open(path, "r", encoding = "utf-8") as f, JsonlWriter(train_path) as train, JsonlWriter(val_path) as val:
+        for line in f:
+            if not line.strip():
+                continue
+            if zlib.crc32(line.encode("utf-8"), seed) < cutoff:
+                val.write_line(line)
+            else:
+                train.write_line(line)
+    return train.count, val.count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Inspect, split or shard a JSONL dataset without loading it")
+    commands = parser.add_subparsers(dest = "command", required = True)
+    stats_parser = commands.add_parser("stats")
+    stats_parser.add_argument("path")
+    stats_parser.add_argument("--model", default = "gpt-3.5-turbo")
+    split_parser = commands.add_parser("split")
+    split_parser.add_argument("path")
+    split_parser.add_argument("--val-fraction", type = float, default = None)
+    shard_parser = commands.add_parser("shard")
+    shard_parser.add_argument("path")
+    shard_parser.add_argument("--max-mb", type = float, default = None)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(dataset_stats(args.path, args.model), indent = 2))
+    elif args.command == "split":
+        stem, ext = os.path.splitext(args.path)
+        counts = split_train_val(args.path, f"{stem}_train{ext}", f"{stem}_val{ext}", args.val_fraction)
+        print(f"[Dataset] {counts[0]} train examples in {stem}_train{ext}, {counts[1]} in {stem}_val{ext}")
+    else:
+        shards = write_shards(args.path, int(args.max_mb * 1024 * 1024) if args.max_mb else None)
+        print(f"[Dataset] Wrote {len(shards)} shards: {', '.join(shards)}")
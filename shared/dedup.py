@@ -0,0 +1,146 @@
+import re
+import numpy as np
+from config.config import Config
+
+# Near-duplicate detection for fine-tuning data: MinHash signatures over
+# character shingles, bucketed with LSH so only snippets that share a band
+# are compared. Signatures use one-permutation hashing (each shingle is
+# hashed once and lands in one of `num_perm` bins) and everything runs as
+# numpy over chunks of snippets, so cost is linear in the text size.
+
+COMMENT_PATTERN = re.compile(r"#[^\n]*")
+EMPTY = np.uint32(0xFFFFFFFF)
+CHUNK_SNIPPETS = 4096
+
+
+def fmix32(h):
+    # MurmurHash3 finaliser: spreads every input bit over the whole hash.
+    h ^= h >> np.uint32(16)
+    h *= np.uint32(0x85EBCA6B)
+    h ^= h >> np.uint32(13)
+    h *= np.uint32(0xC2B2AE35)
+    h ^= h >> np.uint32(16)
+    return h
+
+
+class MinHashDeduper:
+    """Finds snippets whose shingles overlap by at least `threshold` (Jaccard).
+
+    Shingles are `shingle_size`-character windows of the code with comments
+    and whitespace removed. With the `num_perm` signature values split into
+    `bands`, two snippets become candidates when every value of one band
+    agrees; candidates are kept only if their estimated similarity reaches
+    the threshold.
+    """
+
+    def __init__(self, threshold = None, num_perm = None, bands = None, shingle_size = None):
+        self.threshold = Config.DEDUP_THRESHOLD if threshold is None else threshold
+        self.num_perm = num_perm or Config.DEDUP_NUM_PERM
+        self.bands = bands or Config.DEDUP_BANDS
+        self.rows = self.num_perm // self.bands
+        self.shingle_size = shingle_size or Config.DEDUP_SHINGLE_SIZE
+
+    def signatures(self, texts):
+        """(n, num_perm) uint32 signatures, computed chunk by chunk from any iterable."""
+        parts, chunk = [], []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) == CHUNK_SNIPPETS:
+                parts.append(self._signature_chunk(chunk))
+                chunk = []
+        if chunk:
+            parts.append(self._signature_chunk(chunk))
+        if not parts:
+            return np.zeros((0, self.num_perm), dtype = np.uint32)
+        return np.concatenate(parts)
+
+    def _signature_chunk(self, texts):
+        k, bins = self.shingle_size, self.num_perm
+        # One byte string for the whole chunk, snippets separated by NUL.
+        text = COMMENT_PATTERN.sub("", "\0".join(texts) + "\0").encode("utf-8", errors = "ignore")
+        data = np.frombuffer(text.translate(None, b" \t\r\n"), dtype = np.uint8)
+        separators = np.flatnonzero(data == 0)
+        lengths = np.diff(separators, prepend = -1)
+        snippet_of = np.repeat(np.arange(len(texts), dtype = np.int32), lengths)
+
+        windows = len(data) - k + 1
+        signature = np.full(len(texts) * bins, EMPTY, dtype = np.uint32)
+        if windows > 0:
+            hashes = np.full(windows, 0x811C9DC5, dtype = np.uint32)
+            for offset in range(k):  # FNV-1a over each window, in place
+                np.bitwise_xor(hashes, data[offset:offset + windows], out = hashes)
+                np.multiply(hashes, np.uint32(0x01000193), out = hashes)
+            hashes = fmix32(hashes)
+            valid = np.ones(windows, dtype = bool)
+            for offset in range(k):  # drop windows that span a separator
+                crossing = separators - offset
+                valid[crossing[(crossing >= 0) & (crossing < windows)]] = False
+            hashes = hashes[valid]
+            # Bin from the top 16 bits (bins <= 65536), kept in uint32 arithmetic.
+            slot = (((hashes >> np.uint32(16)) * np.uint32(bins)) >> np.uint32(16)).astype(np.int32)
+            slot += snippet_of[:windows][valid] * np.int32(bins)
+            np.minimum.at(signature, slot, hashes)
+        return self._densify(signature.reshape(len(texts), bins))
+
+    def _densify(self, signature):
+        """Fill empty bins (short snippets) from the next filled bin to the right, plus an offset
+        for the distance, so two short snippets don't look alike just for sharing empty bins."""
+        empty = signature == EMPTY
+        rows = np.flatnonzero(empty.any(axis = 1) & ~empty.all(axis = 1))
+        if not len(rows):
+            return signature
+        bins = self.num_perm
+        filled = ~np.concatenate([empty[rows], empty[rows]], axis = 1)
+        columns = np.where(filled, np.arange(2 * bins), 2 * bins)
+        nearest = np.minimum.accumulate(columns[:, ::-1], axis = 1)[:, ::-1][:, :bins]
+        distance = (nearest - np.arange(bins)).astype(np.uint32)
+        source = signature[rows[:, None], nearest % bins]
+        signature[rows] = np.where(empty[rows], source + distance * np.uint32(0x9E3779B1), signature[rows])
+        return signature
+
+    def representatives(self, signatures):
+        """For each snippet, the index of the earliest snippet it is a near duplicate of (itself if none)."""
+        n = len(signatures)
+        parent = np.arange(n)
+        if n < 2:
+            return parent
+        pairs = []
+        for band in range(self.bands):
+            rows = signatures[:, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+            keys = np.zeros(n, dtype = np.uint64)
+            for column in rows.T:
+                keys = keys * np.uint64(0x100000001B3) + column
+            order = np.argsort(keys, kind = "stable")
+            sorted_keys = keys[order]
+            new_group = np.ones(n, dtype = bool)
+            new_group[1:] = sorted_keys[1:] != sorted_keys[:-1]
+            # Stable sort: the first of each bucket is its lowest index.
+            first = order[np.flatnonzero(new_group)[np.cumsum(new_group) - 1]]
+            members = ~new_group
+            pairs.append(first[members].astype(np.int64) * n + order[members])
+        pairs = np.unique(np.concatenate(pairs))
+        if not len(pairs):
+            return parent
+        pairs = np.stack([pairs // n, pairs % n], axis = 1)
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis = 1)
+        pairs = pairs[similarity >= self.threshold]
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for left, right in pairs.tolist():
+            left, right = find(left), find(right)
+            if left != right:
+                parent[max(left, right)] = min(left, right)
+        while True:  # point every snippet straight at its root
+            root = parent[parent]
+            if np.array_equal(root, parent):
+                return parent
+            parent = root
+
+    def duplicates(self, texts):
+        """Representative index per text (see `representatives`)."""
+        return self.representatives(self.signatures(texts))
@@ -0,0 +1,54 @@
+import re
+import zlib
+import numpy as np
+from config.config import Config
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z][a-z]+|[A-Z]+(?![a-z])|\d+")
+
+
+def tokenize(text):
+    # Splits snake_case and camelCase identifiers into their words.
+    return [token.lower() for token in TOKEN_PATTERN.findall(text)]
+
+
+class HashingEmbeddings:
+    """Offline embedding backend: signed feature hashing of words and word bigrams.
+
+    No model download, no network, deterministic across processes. Quality is
+    below a neural embedding model but good enough to find the module, test or
+    plan that shares vocabulary with a task. Implements the same
+    `embed_documents` / `embed_query` interface as langchain embeddings.
+    """
+
+    def __init__(self, dim = None):
+        self.dim = dim or Config.HASHING_EMBEDDING_DIM
+
+    def _features(self, text):
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed_matrix(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype = np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        # Sublinear term frequency, then L2 normalise so dot product = cosine.
+        np.copyto(matrix, np.sign(matrix) * np.log1p(np.abs(matrix)))
+        norms = np.linalg.norm(matrix, axis = 1, keepdims = True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts):
+        return self.embed_matrix(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.embed_matrix([text])[0].tolist()
+
+
+def get_embeddings():
+    """Embedding backend selected by `Config.EMBEDDING_BACKEND`."""
+    if Config.EMBEDDING_BACKEND == "hashing":
+        return HashingEmbeddings()
+    from langchain_community.embeddings import OpenAIEmbeddings
+    return OpenAIEmbeddings(api_key = Config.OPENAI_API_KEY)
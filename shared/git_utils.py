@@ -1,7 +1,123 @@
+import atexit
+import fcntl
+import os
+import threading
 import git
 from config.config import Config
+from shared.tracing import span
 
-def commit_generated_code(file_path, message):
-    repo = git.Repo(".")
-    repo.index.add([file_path])
-    repo.index.commit(message)
\ No newline at end of file
+
+class CommitBatcher:
+    """Groups generated files into a few commits instead of one per file.
+
+    Keeps one `git.Repo` handle for the life of the process. Written paths
+    accumulate until `Config.GIT_COMMIT_WINDOW_SECONDS` pass, `GIT_COMMIT_MAX_FILES`
+    are pending, or `flush()` is called at the end of a phase; then they go in
+    as a single commit whose message lists the contributing tasks. Threads
+    share the batcher; worker processes serialise on a lock file in the git
+    directory, so their commits never race on `index.lock`.
+    """
+
+    def __init__(self, repo_path = ".", window = None, max_files = None):
+        self.repo_path = repo_path
+        self.window = Config.GIT_COMMIT_WINDOW_SECONDS if window is None else window
+        self.max_files = max_files or Config.GIT_COMMIT_MAX_FILES
+        self.lock = threading.Lock()
+        self.pending = {}  # path -> descriptions of the tasks that wrote it
+        self.timer = None
+        self._repo = None
+        self.commits = 0
+
+    @property
+    def repo(self):
+        if self._repo is None:
+            self._repo = git.Repo(self.repo_path)
+        return self._repo
+
+    def _commit(self, paths, message):
+        # Across processes: one committer at a time. Index and HEAD are re-read
+        # from disk on every commit, so other processes' commits are respected.
+        with open(os.path.join(self.repo.git_dir, "pipeline-commit.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with span("git.commit"):
+                    index = self.repo.index
+                    index.add(paths)
+                    index.commit(message)
+                self.commits += 1
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def commit_now(self, paths, message):
+        with self.lock:
+            self._commit(list(paths), message)
+
+    def add(self, path, description):
+        with self.lock:
+            self.pending.setdefault(path, []).append(description)
+            if len(self.pending) >= self.max_files:
+                self._flush_locked()
+            elif self.timer is None and self.window > 0:
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self, phase = None):
+        """Commit everything pending. Returns the number of files committed."""
+        with self.lock:
+            return self._flush_locked(phase)
+
+    def _flush_locked(self, phase = None):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, {}
+        descriptions = list(dict.fromkeys(d for ds in pending.values() for d in ds))
+        if len(descriptions) == 1:
+            message = f"Add generated code for task: {descriptions[0]}"
+        else:
+            subject = f"Add generated code for {len(descriptions)} tasks"
+            if phase:
+                subject += f" ({phase})"
+            message = subject + "\n\n" + "\n".join(f"- {d}" for d in descriptions)
+        try:
+            self._commit(list(pending), message)
+        except Exception as e:
+            # Keep the files and their task descriptions for the next flush
+            # (add() waits on the lock, so nothing was queued meanwhile).
+            self.pending = pending
+            print(f"[WARN] Git commit of {len(pending)} files failed, will retry on the next flush: {str(e)}")
+            return 0
+        print(f"[Git] Committed {len(pending)} files for {len(descriptions)} tasks")
+        return len(pending)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_commit_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = CommitBatcher()
+            atexit.register(_batcher.flush)
+    return _batcher
+
+
+def commit_generated_code(file_path, description):
+    """Commit a generated file, batched with others unless `Config.GIT_BATCH_COMMITS` is off."""
+    batcher = get_commit_batcher()
+    if Config.GIT_BATCH_COMMITS:
+        batcher.add(file_path, description)
+    else:
+        batcher.commit_now([file_path], f"Add generated code for task: {description}")
+
+
+def flush_commits(phase = None):
+    """Commit any batched files now, e.g. at the end of a pipeline phase or run."""
+    if _batcher is not None:
+        return _batcher.flush(phase)
+    return 0
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+from config.config import Config
+from shared.task_store import get_task_store
+
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def task_fingerprint(task, agent):
+    """Fingerprint of everything that determines the task's output, or None if it can't be skipped.
+
+    Covers the input content (the `input_file` for file-based agents, the
+    description otherwise), the agent's prompt template version and its model.
+    Because the input of a downstream task is the output of its upstream
+    task, a downstream fingerprint only changes when that output changed.
+    """
+    paths = agent.artifact_paths(task)
+    if paths is None:
+        return None, None
+    input_path, output_path = paths
+    if input_path is not None:
+        input_hash = file_hash(input_path)
+        if input_hash is None:
+            return None, output_path
+    else:
+        input_hash = hashlib.sha256(task.get("description", "").encode("utf-8")).hexdigest()
+    parts = {
+        "agent": task.get("agent"),
+        "input": input_hash,
+        "template": agent.template.version,
+        "model": agent.model,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys = True).encode("utf-8")).hexdigest(), output_path
+
+
+def is_up_to_date(task, agent, store = None):
+    """True if the task last ran with the same fingerprint and its output is still what it produced."""
+    if not Config.INCREMENTAL_BUILDS or task.get("force"):
+        return False
+    fingerprint, output_path = task_fingerprint(task, agent)
+    if fingerprint is None:
+        return False
+    recorded = (store or get_task_store()).get_fingerprint(task)
+    if recorded is None:
+        return False
+    recorded_fingerprint, recorded_output, recorded_hash = recorded
+    return (
+        recorded_fingerprint == fingerprint
+        and recorded_output == output_path
+        and recorded_hash is not None
+        and file_hash(output_path) == recorded_hash
+    )
+
+
+def record_build(task, agent, started_at, store = None):
+    """Remember the fingerprint after a run that actually (re)wrote its output."""
+    fingerprint, output_path = task_fingerprint(task, agent)
+    if fingerprint is None or not os.path.exists(output_path):
+        return False
+    # Filesystem timestamps can lag time.time() slightly, hence the second of slack.
+    if os.path.getmtime(output_path) < started_at - 1:
+        return False  # the agent gave up before writing; don't vouch for the old artifact
+    (store or get_task_store()).set_fingerprint(task, fingerprint, output_path, file_hash(output_path))
+    return True
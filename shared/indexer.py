@@ -0,0 +1,169 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.config import Config
+from shared.chunking import chunk_file
+from shared.rag_utils import load_vector_store
+
+INDEXABLE_EXTENSIONS = (".py", ".md", ".txt")
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(path, chunk):
+    return hashlib.sha1(f"{path}\0{chunk}".encode("utf-8")).hexdigest()
+
+
+class IncrementalIndexer:
+    """Keeps the vector store in sync with generated artifacts.
+
+    A manifest records each file's content hash and the ids of its chunks.
+    Unchanged files are skipped outright; for changed files only chunks whose
+    content changed are embedded, and stale chunks are deleted. Writes go to
+    the store in batches of `Config.INDEX_BATCH_SIZE`.
+    """
+
+    def __init__(self, store = None, manifest_path = None):
+        self._store = store
+        self.manifest_path = manifest_path or Config.INDEX_MANIFEST_PATH
+        self.lock = threading.Lock()
+
+    @property
+    def store(self):
+        return self._store or load_vector_store()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _locked(self):
+        # Serialise manifest updates across threads and worker processes.
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        lock_file = open(f"{self.manifest_path}.lock", "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _batched(self, items):
+        size = Config.INDEX_BATCH_SIZE
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+
+    def index_paths(self, paths):
+        """Index (or re-index) the given files. Returns (changed_files, added_chunks, removed_chunks)."""
+        with self.lock:
+            lock_file = self._locked()
+            try:
+                manifest = self._load_manifest()
+                to_add, to_remove, changed = [], [], 0
+                for path in paths:
+                    path = os.path.normpath(path)
+                    entry = manifest.get(path)
+                    if not os.path.exists(path):
+                        if entry:
+                            to_remove.extend(entry["chunks"])
+                            del manifest[path]
+                            changed += 1
+                        continue
+                    with open(path, "r", errors = "ignore") as f:
+                        text = f.read()
+                    file_hash = content_hash(text)
+                    if entry and entry["hash"] == file_hash:
+                        continue
+
+                    # Chunk ids are content-addressed, so repeated chunks collapse
+                    # and unchanged chunks keep their existing embeddings.
+                    chunks = {}
+                    for chunk in chunk_file(path, text):
+                        chunks.setdefault(chunk_id(path, chunk), chunk)
+                    new_ids = list(chunks)
+                    old_ids = set(entry["chunks"]) if entry else set()
+                    to_remove.extend(old_ids - set(new_ids))
+                    to_add.extend(
+                        (new_id, chunks[new_id], {"source": path, "chunk": i})
+                        for i, new_id in enumerate(new_ids)
+                        if new_id not in old_ids
+                    )
+                    manifest[path] = {"hash": file_hash, "chunks": new_ids}
+                    changed += 1
+
+                if not changed:
+                    return 0, 0, 0
+
+                store = self.store
+                for batch in self._batched(to_remove):
+                    store.delete(ids = batch)
+                for batch in self._batched(to_add):
+                    ids, texts, metadatas = zip(*batch)
+                    store.add_texts(list(texts), metadatas = list(metadatas), ids = list(ids))
+                self._save_manifest(manifest)
+                print(f"[Indexer] {changed} files changed: +{len(to_add)} / -{len(to_remove)} chunks")
+                return changed, len(to_add), len(to_remove)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+    def index_tree(self, directories = None):
+        """Index every artifact under the output directories, dropping files that were deleted."""
+        directories = directories or Config.INDEXED_DIRS
+        paths = []
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                paths.extend(
+                    os.path.normpath(os.path.join(root, name))
+                    for name in files if name.endswith(INDEXABLE_EXTENSIONS)
+                )
+        roots = tuple(os.path.normpath(d) + os.sep for d in directories)
+        known = [path for path in self._load_manifest() if path.startswith(roots)]
+        return self.index_paths(sorted(set(paths) | set(known)))
+
+
+_indexer = None
+_executor = None
+_indexer_lock = threading.Lock()
+
+
+def get_indexer():
+    global _indexer
+    with _indexer_lock:
+        if _indexer is None:
+            _indexer = IncrementalIndexer()
+    return _indexer
+
+
+def _index_quietly(paths):
+    try:
+        get_indexer().index_paths(paths)
+    except Exception as e:
+        print(f"[WARN] [Indexer] Failed to index {paths}: {str(e)}")
+
+
+def index_in_background(*paths):
+    """Queue files for indexing on a single background thread, off the agent's hot path."""
+    global _executor
+    if not Config.INDEX_ON_WRITE:
+        return None
+    with _indexer_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "indexer")
+    return _executor.submit(_index_quietly, list(paths))
+
+
+if __name__ == "__main__":
+    changed, added, removed = get_indexer().index_tree()
+    print(f"[Indexer] Done: {changed} files changed, {added} chunks added, {removed} removed.")
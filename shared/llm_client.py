@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import httpx
+from openai import AsyncOpenAI
+from config.config import Config
+from shared.prompts import count_tokens
+from shared.rate_limit import get_limiter
+
+# One event loop thread owns the pooled HTTP connections. Agents running on
+# other threads (or their own loops) hand their requests to it, so every
+# call reuses the same keep-alive connections instead of a fresh TLS handshake.
+_loop = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_event_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target = _loop.run_forever, name = "llm-client-loop", daemon = True)
+            thread.start()
+    return _loop
+
+
+def get_async_client(provider = None):
+    """Pooled client for an OpenAI-compatible provider in `Config.LLM_PROVIDERS` (default: OpenAI)."""
+    provider = provider or "openai"
+    with _lock:
+        client = _clients.get(provider)
+        if client is None:
+            if provider == "openai":
+                # Read at first use, so OPENAI_BASE_URL can be pointed elsewhere (e.g. a local stub).
+                settings = {"api_key": Config.OPENAI_API_KEY, "base_url": Config.OPENAI_BASE_URL}
+            else:
+                settings = Config.LLM_PROVIDERS[provider]
+            http_client = httpx.AsyncClient(
+                limits = httpx.Limits(
+                    max_connections = Config.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections = Config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry = Config.LLM_KEEPALIVE_EXPIRY,
+                ),
+                timeout = Config.LLM_TIMEOUT,
+            )
+            client = _clients[provider] = AsyncOpenAI(
+                api_key = settings.get("api_key"),
+                base_url = settings.get("base_url"),
+                http_client = http_client,
+                max_retries = 0,  # retries, backoff and rate limits are handled in shared.rate_limit
+            )
+    return client
+
+
+def request_tokens(kwargs):
+    """Tokens a request will use against a tokens/min limit: the prompt plus the expected reply."""
+    prompt = sum(count_tokens(str(m.get("content") or ""), kwargs.get("model", "")) for m in kwargs.get("messages", []))
+    return prompt + (kwargs.get("max_tokens") or Config.LLM_EXPECTED_COMPLETION_TOKENS)
+
+
+async def _create_chat_completion(provider = None, **kwargs):
+    limiter = get_limiter(provider)
+    tokens = request_tokens(kwargs)
+    response = await limiter.call(lambda: get_async_client(provider).chat.completions.create(**kwargs), tokens)
+    if kwargs.get("stream"):
+        return _settle_stream(response, limiter, tokens)
+    limiter.settle(tokens, getattr(response, "usage", None))
+    return response
+
+
+async def _settle_stream(stream, limiter, tokens):
+    async for chunk in stream:
+        if getattr(chunk, "usage", None):
+            limiter.settle(tokens, chunk.usage)
+        yield chunk
+
+
+async def chat_completion(provider = None, **kwargs):
+    """Send a chat completion through the shared pooled client for `provider`.
+
+    Safe to await from any event loop; the request itself always runs on the
+    client's own loop.
+    """
+    loop = get_event_loop()
+    if asyncio.get_running_loop() is loop:
+        return await _create_chat_completion(provider, **kwargs)
+    future = asyncio.run_coroutine_threadsafe(_create_chat_completion(provider, **kwargs), loop)
+    return await asyncio.wrap_future(future)
+
+
+async def stream_chat_completion(provider = None, **kwargs):
+    """Async generator over the chunks of a streamed chat completion.
+
+    The stream is consumed on the client's loop and each chunk is handed to
+    the caller's loop as it arrives, so the caller can write it out without
+    waiting for the whole response.
+    """
+    kwargs["stream"] = True
+    loop = get_event_loop()
+    if asyncio.get_running_loop() is loop:
+        async for chunk in await _create_chat_completion(provider, **kwargs):
+            yield chunk
+        return
+
+    consumer = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def hand_over(kind, item):
+        try:
+            consumer.call_soon_threadsafe(queue.put_nowait, (kind, item))
+        except RuntimeError:
+            pass  # caller's loop already closed after abandoning the stream
+
+    async def produce():
+        try:
+            async for chunk in await _create_chat_completion(provider, **kwargs):
+                hand_over("chunk", chunk)
+        except BaseException as e:
+            hand_over("error", e)
+            raise
+        hand_over("done", None)
+
+    future = asyncio.run_coroutine_threadsafe(produce(), loop)
+    try:
+        while True:
+            kind, item = await queue.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise item
+            yield item
+    finally:
+        if not future.done():
+            future.cancel()
@@ -0,0 +1,158 @@
+import atexit
+import contextlib
+import contextvars
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config.config import Config
+
+LOGGER_NAME = "ai_agents"
+# Present on every record (null when not known) so log lines can be filtered uniformly.
+LOG_FIELDS = ("task_id", "agent", "model", "latency_ms", "tokens")
+# Attributes every LogRecord has; anything else on a record came in through `extra`.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "payload"}
+
+_context = contextvars.ContextVar("log_context", default = {})
+_lock = threading.Lock()
+_queue = None
+_file_handler = None
+_listeners = []
+
+
+def summarize_payload(text, max_chars = None):
+    """Keep small payloads as-is; replace large ones with a preview, their size and a hash."""
+    max_chars = max_chars or Config.LOG_PAYLOAD_CHARS
+    text = str(text)
+    if len(text) <= max_chars:
+        return text
+    return {
+        "preview": text[:max_chars],
+        "chars": len(text),
+        "sha256": hashlib.sha256(text.encode("utf-8", errors = "replace")).hexdigest(),
+    }
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line. Payloads are summarised unless running at DEBUG level."""
+
+    def __init__(self, full_payloads = False):
+        super().__init__()
+        self.full_payloads = full_payloads
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec = "milliseconds"),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for field in LOG_FIELDS:
+            entry[field] = getattr(record, field, None)
+        for field, value in vars(record).items():
+            if field not in _RECORD_ATTRS and field not in entry:
+                entry[field] = value
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            entry["payload"] = payload if self.full_payloads else summarize_payload(payload)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default = str)
+
+
+class ContextFilter(logging.Filter):
+    """Copies fields bound with `log_context` onto records, in the thread that logged them."""
+
+    def filter(self, record):
+        for field, value in _context.get().items():
+            if getattr(record, field, None) is None:
+                setattr(record, field, value)
+        return True
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Bind fields (e.g. task_id, agent) to every record logged inside the block."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_context():
+    return _context.get()
+
+
+def get_file_handler():
+    global _file_handler
+    with _lock:
+        if _file_handler is None:
+            directory = os.path.dirname(Config.LOG_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok = True)
+            _file_handler = RotatingFileHandler(
+                Config.LOG_FILE,
+                maxBytes = Config.LOG_MAX_BYTES,
+                backupCount = Config.LOG_BACKUP_COUNT,
+            )
+            _file_handler.setFormatter(JsonLinesFormatter(full_payloads = Config.LOG_LEVEL.upper() == "DEBUG"))
+    return _file_handler
+
+
+def listen(log_queue):
+    """Start a listener thread writing records from `log_queue` to the rotating log file."""
+    listener = QueueListener(log_queue, get_file_handler())
+    listener.start()
+    with _lock:
+        _listeners.append(listener)
+    return listener
+
+
+def setup_logging(log_queue = None):
+    """Route the pipeline logger through a queue so callers never block on disk.
+
+    In a standalone process a listener thread in this process drains the
+    queue. Worker processes pass the pool's multiprocessing queue instead,
+    and the supervisor's listener is the only writer of the log file, which
+    keeps size-based rotation safe.
+    """
+    global _queue
+    with _lock:
+        if _queue is not None:
+            return
+        _queue = log_queue if log_queue is not None else queue.SimpleQueue()
+    if log_queue is None:
+        listen(_queue)
+    handler = QueueHandler(_queue)
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(Config.LOG_LEVEL.upper())
+    logger.addHandler(handler)
+    logger.propagate = False
+    atexit.register(shutdown_logging)
+
+
+def get_logger():
+    setup_logging()
+    return logging.getLogger(LOGGER_NAME)
+
+
+def shutdown_logging():
+    """Flush queued records. Call before os._exit, which skips atexit handlers."""
+    with _lock:
+        listeners = list(_listeners)
+        _listeners.clear()
+    for listener in listeners:
+        listener.stop()
+    if hasattr(_queue, "join_thread"):
+        # Worker side of a multiprocessing queue: wait until records reach the pipe.
+        _queue.close()
+        _queue.join_thread()
+    if _file_handler is not None:
+        _file_handler.flush()
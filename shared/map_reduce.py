@@ -0,0 +1,147 @@
+import ast
+import re
+from shared.chunking import source_lines
+from shared.prompts import split_source
+
+# Merging of per-chunk agent outputs for map-reduce mode: tests generated
+# for each part of a module become one test file, READMEs one README.
+
+# Opening/closing line of a Markdown code fence; a fence is closed by a run of
+# the same character at least as long, with nothing after it.
+FENCE = re.compile(r" {0,3}(`{3,}|~{3,})(.*)")
+
+
+def module_chunks(source, max_tokens, model):
+    """Split a module into top-level function/class groups of at most ~max_tokens.
+
+    Each chunk starts with the module's imports so it can be read on its own.
+    """
+    chunks = split_source(source, max_tokens, model)
+    return [
+        f"# Part {i} of {len(chunks)} of the module; handle only the code in this part.\n{chunk}"
+        for i, chunk in enumerate(chunks, start = 1)
+    ]
+
+
+def _node_source(lines, node):
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+    return "".join(lines[start:node.end_lineno]).rstrip() + "\n"
+
+
+def _is_fixture(node):
+    return isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and any(
+        "fixture" in ast.unparse(decorator) for decorator in node.decorator_list
+    )
+
+
+def _format_imports(plain, from_imports):
+    lines = [f"import {name}" + (f" as {alias}" if alias else "") for name, alias in plain]
+    for (module, level), names in from_imports.items():
+        aliases = ", ".join(name + (f" as {alias}" if alias else "") for name, alias in names)
+        lines.append(f"from {'.' * level}{module or ''} import {aliases}")
+    future = [line for line in lines if line.startswith("from __future__")]
+    return future + [line for line in lines if not line.startswith("from __future__")]
+
+
+def merge_test_files(parts):
+    """Merge several generated pytest files into one.
+
+    Imports are de-duplicated per imported name, fixtures by name (first one
+    wins), identical statements are dropped, and tests that reuse a name with
+    a different body are renamed with a numeric suffix so none are shadowed.
+    Parts that do not parse are kept verbatim rather than dropped.
+    """
+    plain, from_imports, seen_imports = [], {}, set()
+    fixtures, fixture_names = [], set()
+    body, body_sources, names = [], set(), {}
+
+    for part in parts:
+        try:
+            tree = ast.parse(part)
+        except SyntaxError:
+            print("[WARN] [MapReduce] Generated test part does not parse; keeping it verbatim.")
+            body.append(part.rstrip() + "\n")
+            continue
+        lines = source_lines(part)
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    key = ("import", alias.name, alias.asname)
+                    if key not in seen_imports:
+                        seen_imports.add(key)
+                        plain.append((alias.name, alias.asname))
+                continue
+            if isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    key = ("from", node.module, node.level, alias.name, alias.asname)
+                    if key not in seen_imports:
+                        seen_imports.add(key)
+                        from_imports.setdefault((node.module, node.level), []).append((alias.name, alias.asname))
+                continue
+
+            source = _node_source(lines, node)
+            if _is_fixture(node):
+                if node.name not in fixture_names:
+                    fixture_names.add(node.name)
+                    fixtures.append(source)
+                continue
+            if source in body_sources:
+                continue
+            body_sources.add(source)
+
+            name = getattr(node, "name", None)
+            if name is not None:
+                count = names.get(name, 0) + 1
+                names[name] = count
+                if count > 1:
+                    source = re.sub(rf"\b(def|class)\s+{re.escape(name)}\b", rf"\1 {name}_{count}", source, count = 1)
+            body.append(source)
+
+    sections = ["\n".join(_format_imports(plain, from_imports))] + fixtures + body
+    return "\n\n\n".join(section.rstrip("\n") for section in sections if section.strip()) + "\n"
+
+
+def merge_markdown(parts):
+    """Merge several generated READMEs, combining sections that share a `##` heading.
+
+    The first document's `#` title is kept; sections appear in first-seen
+    order with the content from each part appended under one heading.
+    Lines inside ``` / ~~~ code fences are never taken as headings.
+    """
+    title = None
+    preamble = []
+    sections = {}
+    for part in parts:
+        current, fence = None, None
+        for line in part.strip().splitlines():
+            marker = FENCE.match(line)
+            if fence:
+                if marker and marker.group(1).startswith(fence) and not marker.group(2).strip():
+                    fence = None
+            elif marker:
+                fence = marker.group(1)
+            elif re.match(r"#\s", line):
+                title = title or line.strip()
+                current = None
+                continue
+            elif re.match(r"##\s", line):
+                current = line.strip()
+                sections.setdefault(current, []).append([])
+                continue
+            if current is None:
+                preamble.append(line)
+            else:
+                sections[current][-1].append(line)
+
+    out = [title] if title else []
+    intro = "\n".join(preamble).strip()
+    if intro:
+        out.append(intro)
+    for heading, bodies in sections.items():
+        texts = []
+        for lines in bodies:
+            text = "\n".join(lines).strip()
+            if text and text not in texts:
+                texts.append(text)
+        out.append(heading + ("\n" + "\n\n".join(texts) if texts else ""))
+    return "\n\n".join(out) + "\n"
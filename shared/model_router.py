@@ -0,0 +1,308 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from config.config import Config
+from shared.llm_client import chat_completion, stream_chat_completion
+from shared.log_utils import get_logger
+from shared.tracing import span
+
+# Per-agent model routing. Each agent has an ordered list of backends
+# ("provider:model", see Config.MODEL_ROUTES); every request goes to the
+# fastest healthy one, fails over down the list on errors, and is hedged
+# to the next backend when the first is slower than its usual tail latency.
+
+
+class Backend:
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+        self.name = f"{provider}:{model}"
+
+    def __repr__(self):
+        return f"Backend({self.name})"
+
+
+def default_backend(model):
+    """Where a request for `model` goes without routing: OpenAI itself."""
+    return Backend("openai", model)
+
+
+def fine_tuned_model():
+    """ID of the model produced by automated_model_trainer.py, or None if there isn't one yet."""
+    if Config.FINE_TUNED_MODEL:
+        return Config.FINE_TUNED_MODEL
+    try:
+        with open(Config.FINE_TUNED_MODEL_FILE, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def provider_available(provider):
+    if provider == "openai":
+        return bool(Config.OPENAI_API_KEY)
+    return bool(Config.LLM_PROVIDERS.get(provider, {}).get("api_key"))
+
+
+def parse_backend(spec):
+    """Backend for a "provider:model" route entry, or None if it can't be used here."""
+    provider, _, model = spec.partition(":")
+    if model == "fine-tuned":
+        model = fine_tuned_model()
+    if not model or not provider_available(provider):
+        return None
+    return Backend(provider, model)
+
+
+class BackendStats:
+    """Rolling latency and error rate over a backend's last `Config.ROUTER_WINDOW` requests.
+
+    Latency is time to the first streamed chunk, or to the full response for
+    buffered calls. A backend that fails three times in a row, or whose error
+    rate is over `Config.ROUTER_MAX_ERROR_RATE`, is marked down for
+    `Config.ROUTER_COOLDOWN_SECONDS` and then gets traffic again as a probe.
+    """
+
+    def __init__(self):
+        self.samples = deque(maxlen = Config.ROUTER_WINDOW)  # (ok, seconds); ok None = cancelled after losing a race
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.hedges_won = 0
+
+    def record(self, ok, seconds):
+        self.samples.append((ok, seconds))
+        self.requests += 1
+        if ok is None:
+            return
+        if ok:
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= 3 or (
+            len(self.samples) >= Config.ROUTER_MIN_SAMPLES and self.error_rate() > Config.ROUTER_MAX_ERROR_RATE
+        ):
+            self.down_until = time.monotonic() + Config.ROUTER_COOLDOWN_SECONDS
+
+    def healthy(self):
+        return time.monotonic() >= self.down_until
+
+    def error_rate(self):
+        outcomes = [ok for ok, _ in self.samples if ok is not None]
+        if not outcomes:
+            return 0.0
+        return outcomes.count(False) / len(outcomes)
+
+    def latencies(self):
+        return sorted(seconds for ok, seconds in self.samples if ok is not False)
+
+    def latency(self, q = 0.5):
+        latencies = self.latencies()
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def hedge_delay(self):
+        if len(self.latencies()) < Config.ROUTER_MIN_SAMPLES:
+            return Config.ROUTER_HEDGE_DELAY
+        return max(self.latency(Config.ROUTER_HEDGE_QUANTILE), Config.ROUTER_MIN_HEDGE_DELAY)
+
+
+class ModelRouter:
+    def __init__(self, routes = None):
+        self.routes = Config.MODEL_ROUTES if routes is None else routes
+        self.lock = threading.Lock()
+        self.stats = {}  # backend name -> BackendStats, shared by all agents using that backend
+
+    def backends(self, agent):
+        """Usable backends for `agent` in configured order (empty when it isn't routed)."""
+        if not Config.MODEL_ROUTING_ENABLED:
+            return []
+        backends = [parse_backend(spec) for spec in self.routes.get(agent, [])]
+        return [backend for backend in backends if backend is not None]
+
+    def _stats(self, backend):
+        stats = self.stats.get(backend.name)
+        if stats is None:
+            stats = self.stats[backend.name] = BackendStats()
+        return stats
+
+    def ranked(self, agent):
+        """Healthy backends fastest first, then the ones cooling down.
+
+        Backends without measurements sort as if instant, so each gets tried;
+        ties keep the configured order.
+        """
+        backends = self.backends(agent)
+        with self.lock:
+            healthy, down = [], []
+            for position, backend in enumerate(backends):
+                stats = self._stats(backend)
+                if stats.healthy():
+                    healthy.append((stats.latency() or 0.0, position, backend))
+                else:
+                    down.append((stats.down_until, position, backend))
+        return [backend for *_, backend in sorted(healthy)] + [backend for *_, backend in sorted(down)]
+
+    def record(self, backend, ok, seconds, hedge_won = False):
+        with self.lock:
+            stats = self._stats(backend)
+            stats.record(ok, seconds)
+            if hedge_won:
+                stats.hedges_won += 1
+
+    def hedge_delay(self, backend):
+        with self.lock:
+            return self._stats(backend).hedge_delay()
+
+    async def _race(self, agent, backends, attempt, discard = None):
+        """Run `attempt(backend)` on the first backend, hedging and failing over down the list.
+
+        Returns (backend, result) for the first attempt to succeed; the others
+        are cancelled (or passed to `discard` if they also finished). Raises
+        the last error if every backend failed.
+        """
+        in_flight = {}  # task -> (backend, started)
+        launched = 0
+        hedges = 0
+        hedged = set()
+        last_error = None
+        winner = None
+
+        def launch():
+            nonlocal launched
+            backend = backends[launched]
+            launched += 1
+            in_flight[asyncio.ensure_future(attempt(backend))] = (backend, time.perf_counter())
+            return backend
+
+        try:
+            newest = launch()
+            newest_started = time.perf_counter()
+            while in_flight:
+                timeout = None
+                if Config.ROUTER_HEDGING and hedges < Config.ROUTER_MAX_HEDGES and launched < len(backends):
+                    timeout = max(0.0, newest_started + self.hedge_delay(newest) - time.perf_counter())
+                done, _ = await asyncio.wait(in_flight, timeout = timeout, return_when = asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedges += 1
+                    slow = newest
+                    newest, newest_started = launch(), time.perf_counter()
+                    hedged.add(newest.name)
+                    print(f"[Router] {agent}: no reply from {slow.name} after {self.hedge_delay(slow):.2f}s; hedging with {newest.name}")
+                    get_logger().info("Hedged request", extra = {"agent": agent, "backend": slow.name, "hedge": newest.name})
+                    continue
+                for task in done:
+                    backend, started = in_flight.pop(task)
+                    seconds = time.perf_counter() - started
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        self.record(backend, False, seconds)
+                        print(f"[WARN] [Router] {agent}: {backend.name} failed ({type(last_error).__name__}: {last_error})")
+                    elif winner is None:
+                        winner = (backend, task.result())
+                        self.record(backend, True, seconds, hedge_won = backend.name in hedged)
+                    elif discard is not None:
+                        await discard(task.result())
+                if winner is not None:
+                    return winner
+                if not in_flight and launched < len(backends):
+                    newest, newest_started = launch(), time.perf_counter()
+                    print(f"[Router] {agent}: failing over to {newest.name}")
+            raise last_error
+        finally:
+            for task, (backend, started) in in_flight.items():
+                task.cancel()
+                if winner is not None:
+                    # Lost the race: its latency is at least this long, outcome unknown.
+                    self.record(backend, None, time.perf_counter() - started)
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions = True)
+
+    async def chat_completion(self, agent, on_backend = None, **kwargs):
+        """Buffered chat completion for `agent`, routed across its backends.
+
+        Agents without a route (or with routing disabled) go straight to
+        OpenAI with the requested model. `on_backend`, if given, is called
+        with the Backend that served the reply.
+        """
+        backends = self.ranked(agent)
+        if not backends:
+            response = await chat_completion(**kwargs)
+            if on_backend is not None:
+                on_backend(default_backend(kwargs.get("model")))
+            return response
+
+        async def attempt(backend):
+            with span("llm.backend", backend = backend.name):
+                return await chat_completion(backend.provider, **dict(kwargs, model = backend.model))
+
+        backend, response = await self._race(agent, backends, attempt)
+        if on_backend is not None:
+            on_backend(backend)
+        return response
+
+    async def stream_chat_completion(self, agent, on_backend = None, **kwargs):
+        """Streamed chat completion for `agent`; hedging and fail-over apply until the first chunk.
+
+        Once a backend has started streaming, the reply stays with it; it is
+        passed to `on_backend` (if given) before the first chunk is yielded.
+        """
+        backends = self.ranked(agent)
+        if not backends:
+            if on_backend is not None:
+                on_backend(default_backend(kwargs.get("model")))
+            async for chunk in stream_chat_completion(**kwargs):
+                yield chunk
+            return
+
+        async def attempt(backend):
+            with span("llm.backend", backend = backend.name):
+                stream = stream_chat_completion(backend.provider, **dict(kwargs, model = backend.model))
+                try:
+                    first = await stream.__anext__()
+                except StopAsyncIteration:
+                    first = None
+                return stream, first
+
+        async def discard(result):
+            await result[0].aclose()
+
+        backend, (stream, first) = await self._race(agent, backends, attempt, discard)
+        if on_backend is not None:
+            on_backend(backend)
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    def summary(self):
+        """Per-backend table of traffic, error rate and latency."""
+        with self.lock:
+            rows = sorted(self.stats.items())
+            lines = [f"{'backend':<40} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'hedges won':>10} {'state':>6}"]
+            for name, stats in rows:
+                p50, p95 = stats.latency(0.5), stats.latency(0.95)
+                lines.append(
+                    f"{name[:40]:<40} {stats.requests:>8} {stats.error_rate():>7.0%} "
+                    f"{(p50 or 0) * 1000:>9.1f} {(p95 or 0) * 1000:>9.1f} {stats.hedges_won:>10} "
+                    f"{'up' if stats.healthy() else 'down':>6}"
+                )
+        return "\n".join(lines)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+    return _router
@@ -0,0 +1,172 @@
+import functools
+import hashlib
+import re
+from config.config import Config
+from shared.chunking import python_blocks, split_lines
+
+FIELD_PATTERN = re.compile(r"\{(\w+)\}")
+
+# Fields left out of a prompt's `cache_text`: retrieved context changes as the
+# knowledge base grows, so replies are cached on the prompt without it.
+UNCACHED_FIELDS = ("context",)
+
+
+@functools.lru_cache(maxsize = None)
+def _encoding(model):
+    """tiktoken encoding for `model`, or None when tiktoken or its data is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as e:
+        print(f"[WARN] [Prompts] tiktoken unavailable ({type(e).__name__}); estimating token counts.")
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"[WARN] [Prompts] tiktoken unavailable ({type(e).__name__}); estimating token counts.")
+        return None
+
+
+def count_tokens(text, model = "gpt-4o-mini"):
+    encoding = _encoding(model)
+    if encoding is None:
+        # ~4 characters per token for English and code.
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special = ()))
+
+
+def prompt_budget(model):
+    """Maximum prompt tokens for `model`, leaving the rest of its context for the reply."""
+    return Config.PROMPT_TOKEN_BUDGETS.get(model, Config.DEFAULT_PROMPT_TOKEN_BUDGET)
+
+
+class PromptTooLarge(ValueError):
+    pass
+
+
+class Prompt(str):
+    """Rendered prompt text that carries its token count, and the text its reply is cached under."""
+
+    def __new__(cls, text, tokens, part = 1, parts = 1, cache_text = None):
+        prompt = super().__new__(cls, text)
+        prompt.tokens = tokens
+        prompt.part = part
+        prompt.parts = parts
+        prompt.cache_text = text if cache_text is None else cache_text
+        return prompt
+
+
+class PromptTemplate:
+    """An agent prompt compiled once at import time.
+
+    `{name}` placeholders are located when the template is created, so
+    rendering is a single join. `version` is a hash of the template text,
+    which changes whenever the wording does.
+    """
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        self.literals = []
+        self.fields = []
+        position = 0
+        for match in FIELD_PATTERN.finditer(text):
+            self.literals.append(text[position:match.start()])
+            self.fields.append(match.group(1))
+            position = match.end()
+        self.literals.append(text[position:])
+
+    def render(self, **values):
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(str(values[field]))
+            parts.append(literal)
+        return "".join(parts)
+
+    def build(self, model, chunk_field = None, **values):
+        """Render within the model's prompt budget. Returns a list of `Prompt`s.
+
+        If the full prompt fits, the list has one entry. Otherwise the text in
+        `chunk_field` (normally the input module) is split along top-level
+        functions and classes into as many prompts as needed, each repeating
+        the module's imports. Nothing is dropped: if the template alone
+        exceeds the budget, PromptTooLarge is raised.
+        """
+        budget = prompt_budget(model)
+        text = self.render(**values)
+        tokens = count_tokens(text, model)
+        uncached = {field: "" for field in UNCACHED_FIELDS if values.get(field)}
+        if tokens <= budget or chunk_field is None:
+            if tokens > budget:
+                raise PromptTooLarge(f"{self.name} prompt is {tokens} tokens, over the {budget} token budget for {model}")
+            return [Prompt(text, tokens, cache_text = self.render(**{**values, **uncached}) if uncached else text)]
+
+        overhead = count_tokens(self.render(**{**values, chunk_field: ""}), model)
+        room = budget - overhead - 32  # part header
+        if room <= 0:
+            raise PromptTooLarge(f"{self.name} prompt template alone ({overhead} tokens) exceeds the {budget} token budget for {model}")
+        pieces = split_source(values[chunk_field], room, model)
+        prompts = []
+        for i, piece in enumerate(pieces, start = 1):
+            header = f"# Part {i} of {len(pieces)} of the module; handle only the code in this part.\n"
+            part_values = {**values, chunk_field: header + piece}
+            text = self.render(**part_values)
+            cache_text = self.render(**{**part_values, **uncached}) if uncached else text
+            prompts.append(Prompt(text, count_tokens(text, model), i, len(pieces), cache_text))
+        print(f"[Prompts] {self.name}: input is {tokens} tokens, over the {budget} token budget for {model}; split into {len(prompts)} parts")
+        return prompts
+
+
+def split_source(source, max_tokens, model):
+    """Split source into pieces of at most ~max_tokens, along top-level AST blocks when possible.
+
+    A leading block of imports/constants is repeated at the top of every piece
+    so each one stands on its own. Blocks too large on their own are split on
+    line boundaries.
+    """
+    try:
+        named_blocks = python_blocks(source)
+    except SyntaxError:
+        named_blocks = [(None, source)]
+    blocks = [block for _, block in named_blocks]
+
+    header = ""
+    if len(blocks) > 1 and named_blocks[0][0] == "module" and count_tokens(blocks[0], model) <= max_tokens // 4:
+        header = blocks[0].rstrip("\n") + "\n\n"
+        blocks = blocks[1:]
+    room = max_tokens - count_tokens(header, model) if header else max_tokens
+
+    pieces, current, current_tokens = [], [], 0
+    for block in blocks:
+        block_tokens = count_tokens(block, model)
+        if block_tokens > room:
+            if current:
+                pieces.append("".join(current))
+                current, current_tokens = [], 0
+            pieces.extend(_split_lines_to_budget(block, room, model))
+            continue
+        if current and current_tokens + block_tokens > room:
+            pieces.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += block_tokens
+    if current:
+        pieces.append("".join(current))
+    return [header + piece for piece in pieces]
+
+
+def _split_lines_to_budget(text, max_tokens, model):
+    max_chars = max(200, max_tokens * 4)
+    pieces = []
+    for piece in split_lines(text, max_chars):
+        if count_tokens(piece, model) > max_tokens and max_chars > 200 and piece.count("\n") > 1:
+            pieces.extend(_split_lines_to_budget(piece, max_tokens // 2, model))
+        else:
+            pieces.append(piece)
+    return pieces
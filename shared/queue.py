@@ -1,10 +1,10 @@
-import json
-from config.config import Config
+from shared.task_store import get_task_store
+
+# Kept for callers that still think in terms of the whole task list; the data
+# now lives in the indexed task store rather than tasks.json.
 
 def load_tasks():
-    with open(Config.TASK_QUEUE_FILE, 'r') as file:
-        return json.load(file)
-    
+    return get_task_store().all()
+
 def save_tasks(tasks):
-    with open(Config.TASK_QUEUE_FILE, 'w') as file:
-        json.dump(tasks, file, indent = 2)
+    get_task_store().replace_all(tasks)
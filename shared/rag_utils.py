@@ -1,9 +1,54 @@
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
+import threading
 from config.config import Config
 
-def get_vector_store():
+_vector_store = None
+_lock = threading.Lock()
+
+
+def _build_vector_store():
+    from shared.embeddings import get_embeddings
+
+    embeddings = get_embeddings()
+    if Config.VECTOR_BACKEND == "numpy":
+        from shared.vector_index import NumpyVectorStore
+
+        print(f"[RAG] Opening NumPy index at {Config.NUMPY_INDEX_PATH} ({Config.EMBEDDING_BACKEND} embeddings)")
+        return NumpyVectorStore(Config.NUMPY_INDEX_PATH, embeddings)
+
+    # Imported here so processes that never touch the store don't pay for langchain.
+    from langchain_community.vectorstores import Chroma
+
+    print(f"[RAG] Opening vector store at {Config.VECTOR_STORE_PATH} ({Config.EMBEDDING_BACKEND} embeddings)")
     return Chroma(
+        collection_name = Config.CHROMA_COLLECTION,
         persist_directory = Config.VECTOR_STORE_PATH,
-        embedding_function = OpenAIEmbeddings(api_key = Config.OPENAI_API_KEY)
+        embedding_function = embeddings
     )
+
+
+def load_vector_store():
+    """Return the process-wide vector store, constructing it on first use."""
+    global _vector_store
+    if _vector_store is None:
+        with _lock:
+            if _vector_store is None:
+                _vector_store = _build_vector_store()
+    return _vector_store
+
+
+class LazyVectorStore:
+    """Cheap handle that forwards to the shared store, building it on first real use."""
+
+    def __getattr__(self, name):
+        return getattr(load_vector_store(), name)
+
+    @property
+    def loaded(self):
+        return _vector_store is not None
+
+
+_handle = LazyVectorStore()
+
+
+def get_vector_store():
+    return _handle
@@ -0,0 +1,245 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+import openai
+from config.config import Config
+from shared.tracing import observe
+
+# Client-side limits for LLM calls, one set per provider: token buckets for
+# requests/min and tokens/min, retries with jittered exponential backoff
+# (honouring Retry-After), and a circuit breaker that fails fast while a
+# provider keeps erroring.
+
+
+class TokenBucket:
+    """Reservation-style token bucket refilled continuously at `per_minute / 60` per second.
+
+    `reserve(n)` always takes the tokens, letting the balance go negative,
+    and returns how long the caller must wait before using them. Callers
+    therefore queue up in arrival order instead of all retrying at once.
+    Bursts are capped at `Config.LLM_RATE_BURST_SECONDS` worth of tokens.
+    A `per_minute` of 0 disables the limit.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * Config.LLM_RATE_BURST_SECONDS) if per_minute else 0
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount = 1):
+        now = time.monotonic()
+        with self.lock:
+            wait = max(0.0, self.paused_until - now)
+            if not self.capacity:
+                return wait
+            self._refill(now)
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def adjust(self, amount):
+        """Give back (negative) or take (positive) tokens once the real cost is known."""
+        if not self.capacity:
+            return
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def pause(self, seconds):
+        """Hold every caller for `seconds`, e.g. after the provider answered 429."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Closed until `failures` consecutive errors; then open (calls fail at once)
+    for `reset_seconds`, after which a single trial call is let through."""
+
+    def __init__(self, name, failures = None, reset_seconds = None):
+        self.name = name
+        self.failure_threshold = failures or Config.LLM_CIRCUIT_FAILURES
+        self.reset_seconds = Config.LLM_CIRCUIT_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half-open"
+
+    def before_call(self):
+        with self.lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self.trial_in_flight):
+                raise CircuitOpenError(f"Circuit open for {self.name} after {self.failures} consecutive failures")
+            if state == "half-open":
+                self.trial_in_flight = True
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def cancelled(self):
+        # A call abandoned by its caller (e.g. a lost hedge) says nothing about the provider.
+        with self.lock:
+            self.trial_in_flight = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_in_flight:
+                    print(f"[WARN] [RateLimit] {self.name}: {self.failures} consecutive failures; circuit open for {self.reset_seconds}s")
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error):
+    """Delay requested by the provider's Retry-After(-ms) header, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after = None):
+    """Exponential backoff with full jitter; at least the provider's Retry-After when given."""
+    delay = random.uniform(0, min(Config.LLM_BACKOFF_MAX_SECONDS, Config.LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, Config.LLM_BACKOFF_BASE_SECONDS)
+    return delay
+
+
+class ProviderLimiter:
+    """Rate limits, retries and circuit breaker for one provider.
+
+    Limits come from the provider's "rpm"/"tpm" entries in
+    `Config.LLM_PROVIDERS`, else `Config.LLM_RPM_LIMIT`/`LLM_TPM_LIMIT`, and
+    are split evenly between `Config.PIPELINE_WORKERS` worker processes.
+    """
+
+    def __init__(self, provider):
+        settings = Config.LLM_PROVIDERS.get(provider, {})
+        workers = max(1, Config.PIPELINE_WORKERS)
+        self.provider = provider
+        self.requests = TokenBucket(settings.get("rpm", Config.LLM_RPM_LIMIT) / workers)
+        self.tokens = TokenBucket(settings.get("tpm", Config.LLM_TPM_LIMIT) / workers)
+        self.breaker = CircuitBreaker(provider)
+        self.retries = 0
+        self.throttled = 0
+
+    async def acquire(self, tokens):
+        wait = self.requests.reserve(1)
+        if tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            observe("llm.rate_limit_wait", wait)
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated, usage):
+        """Correct the tokens/min bucket with the real usage reported by the provider."""
+        if usage is not None and getattr(usage, "total_tokens", None):
+            self.tokens.adjust(usage.total_tokens - estimated)
+
+    async def call(self, make_request, tokens):
+        """Await `make_request()` under the limits, retrying transient errors.
+
+        Non-retryable errors (bad request, auth) are raised at once; an open
+        circuit raises CircuitOpenError without contacting the provider.
+        `tokens` are reserved once for the whole call (`settle` corrects them
+        with the real usage) and handed back if it fails; every attempt takes
+        a request.
+        """
+        try:
+            return await self._call_with_retries(make_request, tokens)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.tokens.adjust(-tokens)  # no reply was generated
+            raise
+
+    async def _call_with_retries(self, make_request, tokens):
+        for attempt in range(Config.LLM_MAX_RETRIES + 1):
+            await self.acquire(tokens if attempt == 0 else 0)
+            self.breaker.before_call()
+            try:
+                response = await make_request()
+            except asyncio.CancelledError:
+                self.breaker.cancelled()
+                raise
+            except Exception as e:
+                retry_after = retry_after_seconds(e)
+                if isinstance(e, openai.RateLimitError):
+                    # The provider is up but we are over its limit: everyone waiting
+                    # on it backs off together, and the circuit stays closed.
+                    self.breaker.success()
+                    self.throttled += 1
+                    self.requests.pause(retry_after if retry_after is not None else backoff_delay(attempt))
+                elif is_retryable(e):
+                    self.breaker.failure()
+                else:
+                    self.breaker.success()  # the provider answered; the request itself is wrong
+                    raise
+                if attempt == Config.LLM_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, retry_after)
+                self.retries += 1
+                print(f"[WARN] [RateLimit] {self.provider}: {type(e).__name__}; retry {attempt + 1}/{Config.LLM_MAX_RETRIES} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.success()
+            return response
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider = None):
+    provider = provider or "openai"
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = ProviderLimiter(provider)
+    return limiter
@@ -0,0 +1,105 @@
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import git
+from config.config import Config
+
+# Persistent checkouts of source repositories (the trainer's GITHUB_REPOS).
+# Each repo is cloned shallow once; later runs ask the remote for its HEAD
+# and, only if it moved, fetch the new tip shallowly and reset to it.
+# Sources can be URLs, local paths or bare repositories.
+
+
+def source_url(source):
+    """URL git should fetch from. Local paths become file:// URLs, since git
+    ignores --depth for plain-path clones and would copy the whole history."""
+    if "://" in source or source.startswith("git@"):
+        return source
+    return "file://" + os.path.abspath(os.path.expanduser(source))
+
+
+def repo_name(source):
+    name = source.rstrip("/").split("/")[-1]
+    return name[:-4] if name.endswith(".git") else name
+
+
+def remote_head(url):
+    output = git.cmd.Git().ls_remote(url, "HEAD")
+    return output.split()[0] if output else None
+
+
+def open_cached(path, url):
+    """The cached checkout at `path` if it is usable for `url`, else None."""
+    try:
+        repo = git.Repo(path)
+        if repo.remotes.origin.url != url:
+            return None
+        repo.head.commit  # raises ValueError on a broken or empty checkout
+        return repo
+    except (git.NoSuchPathError, git.InvalidGitRepositoryError, ValueError, AttributeError):
+        return None
+
+
+def fetch_repo(source, cache_dir = None, depth = None):
+    """Bring the cached checkout of `source` up to date. Returns (path, "cloned" | "updated" | "unchanged")."""
+    cache_dir = cache_dir or Config.REPO_CACHE_DIR
+    depth = depth or Config.REPO_FETCH_DEPTH
+    url = source_url(source)
+    path = os.path.join(cache_dir, repo_name(source))
+    repo = open_cached(path, url)
+    if repo is not None:
+        if remote_head(url) == repo.head.commit.hexsha:
+            return path, "unchanged"
+        repo.git.fetch("--depth", str(depth), "--no-tags", "origin", "HEAD")
+        repo.git.reset("--hard", "FETCH_HEAD")
+        repo.git.clean("-ffdx")
+        return path, "updated"
+
+    # Clone next to the target and rename, so an interrupted clone never looks cached.
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    try:
+        git.Repo.clone_from(url, tmp_path, depth = depth, single_branch = True, no_tags = True)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors = True)
+    return path, "cloned"
+
+
+def error_summary(error):
+    # GitCommandError's message spans the whole command line and stderr; keep git's own complaint.
+    lines = [line.strip(" '") for line in (getattr(error, "stderr", None) or str(error)).splitlines() if line.strip(" '")]
+    fatal = [line for line in lines if line.startswith(("fatal:", "error:"))]
+    return (fatal or lines or [type(error).__name__])[0]
+
+
+def fetch_repos(sources, cache_dir = None, workers = None):
+    """Fetch all `sources` concurrently into `cache_dir` (default `Config.REPO_CACHE_DIR`). Returns the checkout paths, in order.
+
+    A source that can't be fetched is skipped, unless an older checkout of it
+    is cached, in which case that is used.
+    """
+    cache_dir = cache_dir or Config.REPO_CACHE_DIR
+    workers = workers or Config.REPO_FETCH_WORKERS
+    os.makedirs(cache_dir, exist_ok = True)
+
+    def fetch(source):
+        started = time.perf_counter()
+        try:
+            path, status = fetch_repo(source, cache_dir)
+        except Exception as e:
+            path = os.path.join(cache_dir, repo_name(source))
+            if open_cached(path, source_url(source)) is None:
+                print(f"[ERROR] [RepoCache] {source}: {error_summary(e)}")
+                return None
+            print(f"[WARN] [RepoCache] {source}: fetch failed ({error_summary(e)}); using the cached checkout")
+            return path
+        print(f"[RepoCache] {repo_name(source)}: {status} ({time.perf_counter() - started:.1f}s)")
+        return path
+
+    with ThreadPoolExecutor(max_workers = max(1, min(workers, len(sources)))) as pool:
+        paths = list(pool.map(fetch, sources))
+    return [path for path in paths if path is not None]
@@ -0,0 +1,82 @@
+import os
+import time
+from config.config import Config
+from shared.rag_utils import load_vector_store
+from shared.tracing import span
+from shared.prompts import count_tokens
+
+# The task's own files are dropped after the search, so ask for extra candidates.
+OVERFETCH = 4
+
+
+def retrieval_query(task):
+    parts = [task.get("description", "")]
+    if task.get("input_file"):
+        parts.append(task["input_file"])
+    return "\n".join(part for part in parts if part)
+
+
+def own_files(task, agent):
+    """Absolute paths of the task's input and output artifacts, which must not come back as its own context."""
+    paths = agent.artifact_paths(task) if agent is not None else None
+    if paths is None:
+        paths = (os.path.join(Config.GENERATED_CODE_PATH, task["input_file"]) if task.get("input_file") else None, None)
+    return {os.path.abspath(path) for path in paths if path}
+
+
+def format_context(docs, token_budget, model = "gpt-4o-mini"):
+    """Join retrieved chunks, most relevant first, skipping any that would exceed the token budget (in `model` tokens)."""
+    chunks, used = [], 0
+    for doc in docs:
+        source = doc.metadata.get("source", "knowledge base") if doc.metadata else "knowledge base"
+        chunk = f"# Source: {source}\n{doc.page_content.strip()}"
+        cost = count_tokens(chunk, model)
+        if used + cost > token_budget:
+            continue
+        chunks.append(chunk)
+        used += cost
+    return "\n\n".join(chunks)
+
+
+def attach_context(tasks, k = None, token_budget = None, get_agent = None):
+    """Retrieve top-k knowledge base chunks for a batch of tasks.
+
+    All task queries are embedded in a single batched call, then each task
+    gets `retrieved_context` (a prompt-ready string within `token_budget`) and
+    `retrieval_ms`, the time attributed to it. Chunks of the task's own input
+    and output files (see `own_files`; output paths come from
+    `get_agent(name).artifact_paths`) are left out. Retrieval problems are
+    logged and leave the tasks without context rather than failing them.
+    """
+    tasks = [task for task in tasks if task.get("agent") in Config.RAG_AGENTS]
+    if not Config.RAG_ENABLED or not tasks:
+        return
+    k = k or Config.RAG_TOP_K
+    token_budget = token_budget or Config.RAG_CONTEXT_TOKENS
+
+    try:
+        store = load_vector_store()
+        start = time.perf_counter()
+        with span("rag.embed"):
+            vectors = store.embeddings.embed_documents([retrieval_query(task) for task in tasks])
+        embed_ms = (time.perf_counter() - start) * 1000 / len(tasks)
+    except Exception as e:
+        print(f"[WARN] [RAG] Retrieval unavailable, continuing without context: {str(e)}")
+        return
+
+    for task, vector in zip(tasks, vectors):
+        start = time.perf_counter()
+        excluded = own_files(task, get_agent(task["agent"]) if get_agent is not None else None)
+        try:
+            with span("rag.search", agent = task.get("agent")):
+                docs = store.similarity_search_by_vector(vector, k = k * OVERFETCH)
+            docs = [
+                doc for doc in docs
+                if os.path.abspath((doc.metadata or {}).get("source", "")) not in excluded
+            ][:k]
+        except Exception as e:
+            print(f"[WARN] [RAG] Search failed for task {task.get('description')}: {str(e)}")
+            docs = []
+        task["retrieved_context"] = format_context(docs, token_budget)
+        task["retrieval_ms"] = round(embed_ms + (time.perf_counter() - start) * 1000, 2)
+        print(f"[RAG] {len(docs)} chunks for '{task.get('description')}' in {task['retrieval_ms']} ms")
@@ -0,0 +1,156 @@
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config.config import Config
+
+
+class DAGScheduler:
+    """Runs queued tasks concurrently, respecting the task dependency graph.
+
+    Tasks are leased from the shared task store with `claim`, so several
+    schedulers (threads or processes) can drain the same queue without running
+    a task twice. `run_fn(task)` runs the agent and enqueues follow-up tasks,
+    like one iteration of the old serial loop; the scheduler then completes
+    the lease, or fails it back onto the queue if `run_fn` raises.
+
+    `prepare_fn(tasks)`, if given, sees every batch claimed in one tick before
+    dispatch, so per-task setup such as retrieval can be batched.
+    """
+
+    def __init__(self, task_manager, run_fn, max_workers = None, agent_concurrency = None, worker_id = None, stop_event = None, prepare_fn = None):
+        self.task_manager = task_manager
+        self.run_fn = run_fn
+        self.prepare_fn = prepare_fn
+        self.max_workers = max_workers or Config.MAX_WORKERS
+        self.agent_concurrency = dict(Config.AGENT_CONCURRENCY)
+        if agent_concurrency:
+            self.agent_concurrency.update(agent_concurrency)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = Config.TASK_LEASE_SECONDS
+        self.stop_event = stop_event
+
+    def agent_limit(self, agent_name):
+        return self.agent_concurrency.get(agent_name, Config.DEFAULT_AGENT_CONCURRENCY)
+
+    def saturated_agents(self, running_tasks):
+        """Agents already running as many tasks as they are allowed to."""
+        running_per_agent = {}
+        for task in running_tasks:
+            running_per_agent[task["agent"]] = running_per_agent.get(task["agent"], 0) + 1
+        return [agent_name for agent_name, count in running_per_agent.items() if count >= self.agent_limit(agent_name)]
+
+    def claim_ready_tasks(self, in_flight):
+        claimed = []
+        while len(in_flight) + len(claimed) < self.max_workers:
+            running = list(in_flight.values()) + claimed
+            task = self.task_manager.claim_task(
+                self.worker_id, self.lease_seconds, ready_only = True, exclude_agents = self.saturated_agents(running)
+            )
+            if task is None:
+                break
+            claimed.append(task)
+        if claimed and self.prepare_fn is not None:
+            try:
+                self.prepare_fn(claimed)
+            except Exception as e:
+                print(f"[WARN] Task preparation failed: {str(e)}")
+        return claimed
+
+    def heartbeat(self, in_flight, last_heartbeat):
+        now = time.time()
+        if now - last_heartbeat < self.lease_seconds / 3:
+            return last_heartbeat
+        for task in in_flight.values():
+            if not self.task_manager.heartbeat(task, self.worker_id):
+                print(f"[WARN] Lost lease on task: {task.get('description')}")
+        return now
+
+    def finish(self, future, task):
+        error = future.exception()
+        if error is None:
+            if not self.task_manager.complete_task(task, self.worker_id):
+                print(f"[WARN] Lease expired before completion: {task.get('description')}")
+        else:
+            requeued = task.get("attempts", 0) < Config.MAX_TASK_ATTEMPTS
+            print(
+                f"[ERROR] Scheduler task failed for {task['agent']} (attempt {task.get('attempts', 0)} of "
+                f"{Config.MAX_TASK_ATTEMPTS}{', re-queued' if requeued else ''}): {str(error)}"
+            )
+            self.task_manager.fail_task(task, self.worker_id, error)
+
+    def stop_requested(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def sleep(self, seconds):
+        """Wait `seconds`, returning early if a stop is requested."""
+        if self.stop_event is not None:
+            self.stop_event.wait(max(0.0, seconds))
+        else:
+            time.sleep(max(0.0, seconds))
+
+    def hand_back(self, in_flight):
+        for task in in_flight.values():
+            print(f"[Scheduler] Handing back unfinished task: {task.get('description')}")
+            self.task_manager.release_task(task, self.worker_id)
+        in_flight.clear()
+
+    def run(self):
+        """Drain the queue. Returns False if in-flight work had to be handed back on shutdown."""
+        print(f"[Scheduler] Worker {self.worker_id} starting with {self.max_workers} threads")
+        in_flight = {}
+        last_heartbeat = time.time()
+        stop_deadline = None
+        finished_cleanly = True
+        pool = ThreadPoolExecutor(max_workers = self.max_workers)
+        try:
+            while True:
+                if self.stop_requested():
+                    if not in_flight:
+                        break
+                    if stop_deadline is None:
+                        print(f"[Scheduler] Stop requested, waiting up to {Config.SHUTDOWN_GRACE_SECONDS}s for {len(in_flight)} tasks")
+                        stop_deadline = time.time() + Config.SHUTDOWN_GRACE_SECONDS
+                    elif time.time() > stop_deadline:
+                        self.hand_back(in_flight)
+                        finished_cleanly = False
+                        break
+                else:
+                    for task in self.claim_ready_tasks(in_flight):
+                        print(f"[Scheduler] Dispatching {task['agent']}: {task.get('description')}")
+                        in_flight[pool.submit(self.run_fn, task)] = task
+
+                if not in_flight:
+                    if self.stop_requested():
+                        break
+                    counts = self.task_manager.get_status_counts()
+                    if not counts.get("pending") and not counts.get("running"):
+                        break
+                    retry_at = None if counts.get("running") else self.task_manager.get_next_retry_time()
+                    if retry_at is not None:
+                        # Failed tasks waiting out their retry backoff are still in
+                        # flight: whatever depends on them has to wait as well.
+                        self.sleep(retry_at - time.time())
+                        continue
+                    if not counts.get("running"):
+                        # Nothing is runnable and nobody is working: a dependency
+                        # cycle. Fall back to queue order like the serial loop did.
+                        task = self.task_manager.claim_task(self.worker_id, self.lease_seconds)
+                        if task is not None:
+                            print(f"[WARN] Dependency cycle detected, forcing task: {task.get('description')}")
+                            in_flight[pool.submit(self.run_fn, task)] = task
+                    if not in_flight:
+                        # Other workers hold the remaining tasks; wait for them.
+                        self.sleep(Config.SCHEDULER_POLL_SECONDS)
+                        continue
+
+                done, _ = wait(in_flight, timeout = Config.SCHEDULER_POLL_SECONDS, return_when = FIRST_COMPLETED)
+                for future in done:
+                    self.finish(future, in_flight.pop(future))
+                last_heartbeat = self.heartbeat(in_flight, last_heartbeat)
+        finally:
+            # Handed-back tasks may still be running; don't block on them.
+            pool.shutdown(wait = finished_cleanly, cancel_futures = True)
+        print(f"[Scheduler] Worker {self.worker_id}: {'all tasks finished' if finished_cleanly else 'stopped'}.")
+        return finished_cleanly
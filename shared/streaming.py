@@ -0,0 +1,49 @@
+class FenceStripper:
+    """Removes a markdown code fence around streamed model output, chunk by chunk.
+
+    Leading blank lines and an opening ```lang line are dropped. Blank and
+    fence lines later on are held back until more content follows, so a
+    closing fence (and trailing whitespace) at the very end never reaches the
+    file. Text is emitted one complete line at a time.
+    """
+
+    def __init__(self, enabled = True):
+        self.enabled = enabled
+        self.partial = ""
+        self.held = ""
+        self.started = False
+
+    def _line(self, line):
+        stripped = line.strip()
+        skippable = not stripped or stripped.startswith("```")
+        if not self.started:
+            if skippable:
+                return ""
+            self.started = True
+            return line
+        if skippable:
+            self.held += "\n" + line
+            return ""
+        out = self.held + "\n" + line
+        self.held = ""
+        return out
+
+    def feed(self, text):
+        if not self.enabled:
+            return text
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        return "".join(self._line(line) for line in lines)
+
+    def finish(self):
+        if not self.enabled:
+            return ""
+        out = self._line(self.partial) if self.partial else ""
+        self.partial = ""
+        self.held = ""
+        return out
+
+
+def strip_code_fences(text):
+    stripper = FenceStripper()
+    return stripper.feed(text) + stripper.finish()
@@ -1,56 +1,65 @@
-import json
-
-TASKS_FILE = "tasks_queue/tasks.json"
+from shared.task_store import get_task_store
+from shared.tracing import span
 
 class TaskManager:
-    def __init__(self):
-        self.tasks = self.load_tasks()
+    def __init__(self, store = None):
+        # All TaskManagers in a process share one indexed store instead of each
+        # holding its own copy of tasks.json.
+        self.store = store or get_task_store()
+
+    @property
+    def tasks(self):
+        return self.store.all()
 
     def load_tasks(self):
-        try:
-            with open(TASKS_FILE, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
-        except json.JSONDecodeError:
-            return []
-
-    def save_tasks(self):
-        try:
-            with open(TASKS_FILE, "w") as f:
-                json.dump(self.tasks, f, indent=4)
-            print(">>> Saved updated tasks.")
-        except Exception as e:
-            print(f"[ERROR] Failed to save tasks: {str(e)}")
+        return self.store.all()
 
     def add_task(self, task):
-        for existing_task in self.tasks:
-            if (
-                existing_task.get("agent") == task.get("agent")
-                and existing_task.get("description") == task.get("description")
-                and existing_task.get("output_file") == task.get("output_file")
-            ):
-                print(f"[TaskManager] Skipping duplicate task: {task}")
-                return  # Do not add duplicate
-
-        self.tasks.append(task)
+        with span("queue.add", agent = task.get("agent")):
+            task_id = self.store.add(task)
+        if task_id is None:
+            print(f"[TaskManager] Skipping duplicate task: {task}")
+            return  # Do not add duplicate
         print(f"[TaskManager] Added new task: {task}")
-        self.save_tasks()
 
     def get_next_task(self):
-        for task in self.tasks:
-            if not task.get("completed", False):
-                return task
-        return None
+        return self.store.next_pending()
+
+    def get_pending_tasks(self):
+        return self.store.pending()
 
     def mark_task_completed(self, task_to_mark):
-        for task in self.tasks:
-            if (
-                task.get("agent") == task_to_mark.get("agent")
-                and task.get("description") == task_to_mark.get("description")
-                and task.get("output_file") == task_to_mark.get("output_file")
-            ):
-                task["completed"] = True
-                print(f"[TaskManager] Marked task as completed: {task}")
-                self.save_tasks()
-                break
\ No newline at end of file
+        if self.store.mark_completed(task_to_mark):
+            print(f"[TaskManager] Marked task as completed: {task_to_mark}")
+
+    # --- Leases (multi-worker) ---
+
+    def claim_task(self, worker_id, lease_seconds = None, ready_only = False, agents = None, exclude_agents = ()):
+        with span("queue.claim"):
+            return self.store.claim(worker_id, lease_seconds, ready_only, agents, exclude_agents)
+
+    def heartbeat(self, task, worker_id):
+        with span("queue.heartbeat", agent = task.get("agent")):
+            return self.store.heartbeat(task["id"], worker_id)
+
+    def complete_task(self, task, worker_id):
+        with span("queue.complete", agent = task.get("agent")):
+            completed = self.store.complete(task["id"], worker_id)
+        if completed:
+            print(f"[TaskManager] Marked task as completed: {task}")
+            return True
+        return False
+
+    def fail_task(self, task, worker_id, error = None):
+        with span("queue.fail", agent = task.get("agent")):
+            return self.store.fail(task["id"], worker_id, error)
+
+    def release_task(self, task, worker_id):
+        with span("queue.release", agent = task.get("agent")):
+            return self.store.release(task["id"], worker_id)
+
+    def get_status_counts(self):
+        return self.store.counts()
+
+    def get_next_retry_time(self):
+        return self.store.next_retry_at()
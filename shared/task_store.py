@@ -0,0 +1,420 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config.config import Config
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+ARCHITECT_AGENT = "Code Architect Agent"
+CODING_AGENT = "Coding Agent"
+
+# A task is blocked while the work it depends on is still open: Coding tasks
+# wait for every architecture plan, and a task that reads an `input_file`
+# waits for the Coding task producing that file. Both lookups use the
+# tasks_open_outputs index, so readiness costs no scan of the open set.
+# Parameters: CODING_AGENT, ARCHITECT_AGENT, CODING_AGENT.
+BLOCKED_SQL = (
+    "(tasks.agent = ? AND EXISTS (SELECT 1 FROM tasks AS plan WHERE plan.agent = ? "
+    "AND plan.status IN ('pending', 'running') AND plan.id != tasks.id)) "
+    "OR (tasks.input_file IS NOT NULL AND EXISTS (SELECT 1 FROM tasks AS producer WHERE producer.agent = ? "
+    "AND producer.output_file = tasks.input_file AND producer.status IN ('pending', 'running') AND producer.id != tasks.id))"
+)
+
+
+def task_key(task):
+    """Identity of a task: the same (agent, description, output_file) triple TaskManager dedups on."""
+    identity = json.dumps([task.get("agent"), task.get("description"), task.get("output_file")])
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+
+def retry_delay(attempts):
+    """Backoff before a task that has failed `attempts` times is run again."""
+    return Config.TASK_RETRY_DELAY_SECONDS * 2 ** max(attempts - 1, 0) * random.uniform(0.5, 1.5)
+
+
+class TaskStore:
+    """SQLite (WAL) backed task queue, safe to share between processes.
+
+    Tasks are indexed by identity key (unique) and by a partial index over
+    open rows, so dedup, dequeue and completion no longer scan or rewrite
+    the whole queue. Existing `tasks.json` content is imported on first use.
+
+    Workers take tasks with `claim()`, which hands out a time-limited lease.
+    `heartbeat()` extends it, `complete()`/`fail()` release it, and a task
+    whose lease runs out (e.g. its worker crashed) becomes claimable again.
+    """
+
+    def __init__(self, path = None, legacy_json = None):
+        self.path = path or Config.TASK_STORE_PATH
+        self.legacy_json = legacy_json or Config.TASK_QUEUE_FILE
+        self.lock = threading.RLock()
+        self.mutations = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        self.conn = sqlite3.connect(self.path, check_same_thread = False, isolation_level = None, timeout = 30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "task_key TEXT NOT NULL UNIQUE, "
+            "agent TEXT, "
+            "status TEXT NOT NULL DEFAULT 'pending', "
+            "worker_id TEXT, "
+            "lease_expires REAL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "last_error TEXT, "
+            "input_file TEXT, "
+            "output_file TEXT, "
+            "data TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_open ON tasks (id) WHERE status IN ('pending', 'running')")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS tasks_open_outputs ON tasks (agent, output_file) WHERE status IN ('pending', 'running')"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            "task_key TEXT PRIMARY KEY, "
+            "fingerprint TEXT NOT NULL, "
+            "output_path TEXT, "
+            "output_hash TEXT, "
+            "updated REAL)"
+        )
+        self.migrate_from_json()
+
+    # --- Migration ---
+
+    def migrate_from_json(self):
+        """Import the legacy tasks.json queue once, preserving order and completion state."""
+        tasks = []
+        if os.path.exists(self.legacy_json):
+            try:
+                with open(self.legacy_json, "r") as f:
+                    tasks = json.load(f)
+            except json.JSONDecodeError:
+                print(f"[TaskStore] Could not parse {self.legacy_json}, skipping migration.")
+
+        with self.transaction():
+            done = self.conn.execute("SELECT value FROM meta WHERE name = 'migrated_from_json'").fetchone()
+            if done:
+                return
+            self._insert_many(tasks)
+            self.conn.execute("INSERT INTO meta (name, value) VALUES ('migrated_from_json', ?)", (self.legacy_json,))
+        if tasks:
+            print(f"[TaskStore] Migrated {len(tasks)} tasks from {self.legacy_json}")
+
+    # --- Helpers ---
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so read-then-update
+        # sequences (claiming, dedup) are atomic across processes.
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            self._mutated()
+
+    def _row_to_task(self, row):
+        task_id, status, attempts, data = row
+        task = json.loads(data)
+        task["id"] = task_id
+        task["completed"] = status == COMPLETED
+        task["status"] = status
+        task["attempts"] = attempts
+        return task
+
+    def _serialise(self, task):
+        # Queue bookkeeping lives in its own columns.
+        return json.dumps({k: v for k, v in task.items() if k not in ("id", "completed", "status", "attempts")})
+
+    def _row_values(self, task):
+        return (
+            task_key(task), task.get("agent"), COMPLETED if task.get("completed") else PENDING,
+            task.get("input_file"), task.get("output_file"), self._serialise(task),
+        )
+
+    def _insert_many(self, tasks):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tasks (task_key, agent, status, input_file, output_file, data) VALUES (?, ?, ?, ?, ?, ?)",
+            [self._row_values(task) for task in tasks],
+        )
+
+    def _select(self, where, params = ()):
+        return self.conn.execute(f"SELECT id, status, attempts, data FROM tasks WHERE {where} ORDER BY id", params).fetchall()
+
+    def _mutated(self):
+        self.mutations += 1
+        if self.mutations % Config.TASK_STORE_COMPACT_EVERY == 0:
+            self.compact()
+
+    def compact(self):
+        # Fold the WAL back into the main database file so it doesn't grow unbounded.
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # --- Queue API ---
+
+    def add(self, task):
+        """Insert a task unless one with the same identity exists. Returns the new id or None."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO tasks (task_key, agent, status, input_file, output_file, data) VALUES (?, ?, ?, ?, ?, ?)",
+                self._row_values(task),
+            )
+            if cursor.rowcount == 0:
+                return None
+            self._mutated()
+            return cursor.lastrowid
+
+    def add_many(self, tasks):
+        with self.transaction():
+            self._insert_many(tasks)
+
+    def exists(self, task):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM tasks WHERE task_key = ?", (task_key(task),)).fetchone()
+        return row is not None
+
+    def get(self, task_id):
+        with self.lock:
+            rows = self._select("id = ?", (task_id,))
+        return self._row_to_task(rows[0]) if rows else None
+
+    def next_pending(self):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, status, attempts, data FROM tasks WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def pending(self):
+        """Tasks not finished yet, including ones currently leased to a worker."""
+        with self.lock:
+            rows = self._select("status IN ('pending', 'running')")
+        return [self._row_to_task(row) for row in rows]
+
+    def all(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT id, status, attempts, data FROM tasks ORDER BY id").fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def counts(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def next_retry_at(self):
+        """When the first task waiting out a retry backoff becomes claimable again, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(lease_expires) FROM tasks WHERE status = 'pending' AND lease_expires > ?", (time.time(),)
+            ).fetchone()
+        return row[0]
+
+    def claim(self, worker_id, lease_seconds = None, ready_only = False, agents = None, exclude_agents = ()):
+        """Atomically lease the first runnable task to `worker_id`.
+
+        Pending tasks and running tasks whose lease has expired are both
+        claimable. With `ready_only`, tasks whose dependencies are still open
+        are skipped (see BLOCKED_SQL); `agents` / `exclude_agents` restrict
+        which agents' tasks may be handed out. All of it is filtered in SQL,
+        so a claim costs the same with ten open tasks as with ten thousand.
+        Returns None if nothing can be claimed right now.
+        """
+        lease_seconds = lease_seconds or Config.TASK_LEASE_SECONDS
+        now = time.time()
+        # A pending task's lease_expires, when set, is when its retry backoff ends.
+        where = ["status IN ('pending', 'running')", "((status = 'pending' AND (lease_expires IS NULL OR lease_expires <= ?)) OR (status = 'running' AND lease_expires < ?))"]
+        params = [now, now]
+        if ready_only:
+            where.append(f"NOT ({BLOCKED_SQL})")
+            params += [CODING_AGENT, ARCHITECT_AGENT, CODING_AGENT]
+        if agents is not None:
+            agents = list(agents)
+            where.append(f"agent IN ({', '.join('?' * len(agents))})")
+            params += agents
+        if exclude_agents:
+            exclude_agents = list(exclude_agents)
+            where.append(f"agent NOT IN ({', '.join('?' * len(exclude_agents))})")
+            params += exclude_agents
+        query = f"SELECT id, status, attempts, data FROM tasks WHERE {' AND '.join(where)} ORDER BY id LIMIT 1"
+        with self.transaction():
+            while True:
+                row = self.conn.execute(query, params).fetchone()
+                if row is None:
+                    return None
+                task = self._row_to_task(row)
+                if task["attempts"] < Config.MAX_TASK_ATTEMPTS:
+                    break
+                # Out of attempts (its last lease expired): give up on it and look again.
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'failed', worker_id = NULL, lease_expires = NULL, "
+                    "last_error = COALESCE(last_error, 'lease expired') WHERE id = ?",
+                    (task["id"],),
+                )
+            self.conn.execute(
+                "UPDATE tasks SET status = 'running', worker_id = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker_id, now + lease_seconds, task["id"]),
+            )
+        task["status"] = RUNNING
+        task["attempts"] += 1
+        return task
+
+    def heartbeat(self, task_id, worker_id, lease_seconds = None):
+        """Extend a lease. Returns False if the worker no longer owns the task."""
+        lease_seconds = lease_seconds or Config.TASK_LEASE_SECONDS
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (time.time() + lease_seconds, task_id, worker_id),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, task_id, worker_id):
+        """Mark a leased task done. Returns False if the lease was lost to another worker."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'completed', worker_id = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (task_id, worker_id),
+            )
+            self._mutated()
+        return cursor.rowcount > 0
+
+    def fail(self, task_id, worker_id, error = None, retry = True):
+        """Release a leased task after an error, re-queueing it while attempts remain.
+
+        A re-queued task can't be claimed again until its backoff
+        (`Config.TASK_RETRY_DELAY_SECONDS`, doubling per attempt) has passed.
+        """
+        with self.transaction():
+            row = self.conn.execute(
+                "SELECT attempts FROM tasks WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (task_id, worker_id),
+            ).fetchone()
+            if row is None:
+                return False
+            retrying = retry and row[0] < Config.MAX_TASK_ATTEMPTS
+            retry_at = time.time() + retry_delay(row[0]) if retrying else None
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, worker_id = NULL, lease_expires = ?, last_error = ? WHERE id = ?",
+                (PENDING if retrying else FAILED, retry_at, str(error) if error is not None else None, task_id),
+            )
+        return True
+
+    def release(self, task_id, worker_id):
+        """Hand a leased task back untouched (e.g. on shutdown) without using up an attempt."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'pending', worker_id = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0) WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (task_id, worker_id),
+            )
+            self._mutated()
+        return cursor.rowcount > 0
+
+    def requeue_worker(self, worker_id):
+        """Put every task leased to `worker_id` back on the queue, e.g. after it crashed."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'pending', worker_id = NULL, lease_expires = NULL "
+                "WHERE worker_id = ? AND status = 'running'",
+                (worker_id,),
+            )
+            self._mutated()
+        return cursor.rowcount
+
+    def mark_completed(self, task):
+        """Mark the task with the same identity as completed. Returns True if a row changed."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'completed', worker_id = NULL, lease_expires = NULL "
+                "WHERE task_key = ? AND status != 'completed'",
+                (task_key(task),),
+            )
+            self._mutated()
+            return cursor.rowcount > 0
+
+    def mark_all_incomplete(self):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE tasks SET status = 'pending', worker_id = NULL, lease_expires = NULL, attempts = 0, last_error = NULL"
+            )
+            self._mutated()
+
+    def delete(self, task_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self._mutated()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM tasks")
+            self._mutated()
+
+    def replace_all(self, tasks):
+        with self.transaction():
+            self.conn.execute("DELETE FROM tasks")
+            self._insert_many(tasks)
+
+    # --- Fingerprints (incremental rebuilds) ---
+
+    def get_fingerprint(self, task):
+        """(fingerprint, output_path, output_hash) recorded for the task's last successful run, or None."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT fingerprint, output_path, output_hash FROM fingerprints WHERE task_key = ?",
+                (task_key(task),),
+            ).fetchone()
+
+    def set_fingerprint(self, task, fingerprint, output_path, output_hash):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (task_key, fingerprint, output_path, output_hash, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (task_key(task), fingerprint, output_path, output_hash, time.time()),
+            )
+            self._mutated()
+
+    def export_json(self, path):
+        """Write a tasks.json-style snapshot, e.g. for inspection or backups."""
+        tasks = [
+            {k: v for k, v in task.items() if k not in ("id", "status", "attempts")}
+            for task in self.all()
+        ]
+        with open(path, "w") as f:
+            json.dump(tasks, f, indent = 4)
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_task_store():
+    """Process-wide store handle so every TaskManager shares one connection.
+
+    A forked worker gets its own connection rather than inheriting the parent's.
+    """
+    global _store, _store_pid
+    with _store_lock:
+        if _store is None or _store_pid != os.getpid():
+            _store = TaskStore()
+            _store_pid = os.getpid()
+    return _store
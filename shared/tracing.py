@@ -0,0 +1,249 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from config.config import Config
+from shared.log_utils import current_context
+
+# Histogram bucket upper bounds in seconds: 0.5 ms doubling every two buckets to ~12 min.
+BUCKETS = [0.0005 * 2 ** (i / 2) for i in range(42)]
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current_span = contextvars.ContextVar("current_span", default = None)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; recording is a bisect and two adds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class Tracer:
+    """Collects span timings into per-(stage, agent) histograms.
+
+    When profiling is on, every span is also kept as a Chrome trace event
+    ("X" complete events), which chrome://tracing, Perfetto and speedscope
+    render as a flame graph.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.events = None
+        # Wall-clock anchor so traces from several worker processes line up.
+        self.origin = time.perf_counter()
+        self.origin_wall = time.time()
+
+    def observe(self, stage, seconds, agent = None):
+        agent = agent or current_context().get("agent") or ""
+        with self.lock:
+            histogram = self.histograms.get((stage, agent))
+            if histogram is None:
+                histogram = self.histograms[(stage, agent)] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def record_event(self, name, start, seconds, attrs):
+        self.events.append({
+            "name": name,
+            "cat": attrs.get("agent") or "pipeline",
+            "ph": "X",
+            "ts": round((self.origin_wall + start - self.origin) * 1e6, 1),
+            "dur": round(seconds * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": attrs,
+        })
+
+    def start_profile(self):
+        self.events = []
+
+    def write_trace(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": list(self.events or []), "displayTimeUnit": "ms"}, f)
+
+    def snapshot(self):
+        with self.lock:
+            return {key: histogram for key, histogram in self.histograms.items()}
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP pipeline_stage_latency_seconds Latency of pipeline stages per agent.",
+            "# TYPE pipeline_stage_latency_seconds summary",
+        ]
+        for (stage, agent), histogram in sorted(self.snapshot().items()):
+            labels = f'stage="{stage}",agent="{agent}"'
+            for q in QUANTILES:
+                lines.append(f'pipeline_stage_latency_seconds{{{labels},quantile="{q}"}} {histogram.quantile(q):.6f}')
+            lines.append(f"pipeline_stage_latency_seconds_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"pipeline_stage_latency_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Human-readable p50/p95/p99 table, slowest stages first."""
+        rows = sorted(self.snapshot().items(), key = lambda item: -item[1].total)
+        lines = [f"{'stage':<20} {'agent':<22} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>8}"]
+        for (stage, agent), h in rows:
+            lines.append(
+                f"{stage:<20} {agent[:22]:<22} {h.count:>6} {h.quantile(0.5) * 1000:>9.1f} "
+                f"{h.quantile(0.95) * 1000:>9.1f} {h.quantile(0.99) * 1000:>9.1f} {h.total:>8.2f}"
+            )
+        return "\n".join(lines)
+
+
+tracer = Tracer()
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = None
+        self.token = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        _current_span.reset(self.token)
+        if not Config.TRACING_ENABLED:
+            return False
+        agent = self.attrs.get("agent") or current_context().get("agent")
+        tracer.observe(self.name, seconds, agent)
+        if tracer.events is not None:
+            attrs = dict(self.attrs, agent = agent)
+            if exc_type is not None:
+                attrs["error"] = exc_type.__name__
+            tracer.record_event(self.name, self.start, seconds, attrs)
+        return False
+
+
+def span(name, **attrs):
+    """Time a block as pipeline stage `name`: `with span("llm.request", model = model): ...`"""
+    return Span(name, attrs)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def observe(stage, seconds, agent = None):
+    """Record a duration measured elsewhere (e.g. time-to-first-token)."""
+    if Config.TRACING_ENABLED:
+        tracer.observe(stage, seconds, agent)
+
+
+def traced(name = None):
+    """Decorator form of `span`, for plain and async functions."""
+    def decorator(fn):
+        stage = name or fn.__qualname__
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Export ---
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("/metrics", ""):
+            self.send_error(404)
+            return
+        body = tracer.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port = None, attempts = 16):
+    """Serve /metrics in Prometheus text format on a daemon thread.
+
+    Worker processes each take the next free port after `port`. Returns the
+    server, or None when disabled (port 0) or no port was free.
+    """
+    port = Config.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    for candidate in range(port, port + attempts):
+        try:
+            server = ThreadingHTTPServer((Config.METRICS_HOST, candidate), MetricsHandler)
+        except OSError:
+            continue
+        server.daemon_threads = True
+        threading.Thread(target = server.serve_forever, name = "metrics-server", daemon = True).start()
+        print(f"[Metrics] Serving Prometheus metrics on http://{Config.METRICS_HOST}:{candidate}/metrics")
+        return server
+    print(f"[WARN] [Metrics] No free port in {port}-{port + attempts - 1}; metrics endpoint disabled.")
+    return None
+
+
+def merge_traces(path, part_paths):
+    """Combine per-worker trace files into one, removing the parts."""
+    events = []
+    for part in part_paths:
+        with open(part, "r") as f:
+            events.extend(json.load(f)["traceEvents"])
+        os.remove(part)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+def worker_trace_parts(path):
+    stem, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{stem}.worker-*{ext}"))
+
+
+def worker_trace_path(path):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.worker-{os.getpid()}{ext}"
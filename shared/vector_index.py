@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import numpy as np
+
+
+class Document:
+    """Search result with the same attributes as a langchain Document."""
+
+    def __init__(self, page_content, metadata = None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"Document(metadata={self.metadata!r})"
+
+
+class NumpyVectorStore:
+    """In-process brute-force vector index backed by a memory-mapped float32 array.
+
+    Vectors live in `vectors.f32` (one row per chunk, L2-normalised) and ids,
+    texts and metadata in `index.json` under `path`. Queries are a single
+    matrix-vector product, which is sub-millisecond for the few thousand chunks
+    a pipeline run produces. Deleted rows are masked and dropped on compaction.
+    Another process's writes are picked up on the next query.
+
+    Supports the subset of the langchain VectorStore API the pipeline uses:
+    `add_texts`, `delete`, `similarity_search`, `similarity_search_by_vector`
+    and the `embeddings` attribute.
+    """
+
+    def __init__(self, path, embedding_function):
+        self.path = path
+        self.embeddings = embedding_function
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.meta_path = os.path.join(path, "index.json")
+        self.lock = threading.RLock()
+        os.makedirs(path, exist_ok = True)
+        self._meta_mtime = None
+        self._load()
+
+    # --- Persistence ---
+
+    def _load(self):
+        try:
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+            self._meta_mtime = os.path.getmtime(self.meta_path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            meta = {"dim": None, "ids": [], "texts": [], "metadatas": [], "deleted": []}
+        self.dim = meta["dim"]
+        self.ids = meta["ids"]
+        self.texts = meta["texts"]
+        self.metadatas = meta["metadatas"]
+        self.alive = np.ones(len(self.ids), dtype = bool)
+        self.alive[meta["deleted"]] = False
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids) if self.alive[row]}
+        self._open_vectors()
+
+    def _open_vectors(self):
+        if self.dim and self.ids and os.path.exists(self.vectors_path):
+            self.vectors = np.memmap(self.vectors_path, dtype = np.float32, mode = "r", shape = (len(self.ids), self.dim))
+        else:
+            self.vectors = np.zeros((0, self.dim or 0), dtype = np.float32)
+
+    def _save_meta(self):
+        meta = {
+            "dim": self.dim,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "deleted": np.flatnonzero(~self.alive).tolist(),
+        }
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+        self._meta_mtime = os.path.getmtime(self.meta_path)
+
+    def _refresh(self):
+        try:
+            mtime = os.path.getmtime(self.meta_path)
+        except FileNotFoundError:
+            return
+        if mtime != self._meta_mtime:
+            self._load()
+
+    def _embed(self, texts):
+        if hasattr(self.embeddings, "embed_matrix"):
+            matrix = self.embeddings.embed_matrix(texts)
+        else:
+            matrix = np.asarray(self.embeddings.embed_documents(texts), dtype = np.float32)
+        norms = np.linalg.norm(matrix, axis = 1, keepdims = True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
+
+    # --- VectorStore API ---
+
+    def add_texts(self, texts, metadatas = None, ids = None):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [os.urandom(16).hex() for _ in texts]
+        matrix = self._embed(texts)
+        with self.lock:
+            self._refresh()
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+            if matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match index dimension {self.dim}")
+            self.delete(ids)  # upsert: replace existing rows with the same id
+            with open(self.vectors_path, "ab") as f:
+                # Drop rows left behind by a write that never reached the metadata.
+                f.truncate(len(self.ids) * self.dim * 4)
+                f.write(matrix.tobytes())
+            for doc_id in ids:
+                self.row_of[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+            self.texts.extend(texts)
+            self.metadatas.extend(metadatas)
+            self.alive = np.concatenate([self.alive, np.ones(len(texts), dtype = bool)])
+            if (~self.alive).sum() > len(self.alive) // 2:
+                self.compact()
+            else:
+                self._save_meta()
+                self._open_vectors()
+        return ids
+
+    def delete(self, ids = None):
+        with self.lock:
+            self._refresh()
+            removed = False
+            for doc_id in ids or []:
+                row = self.row_of.pop(doc_id, None)
+                if row is not None:
+                    self.alive[row] = False
+                    removed = True
+            if removed:
+                self._save_meta()
+
+    def compact(self):
+        """Rewrite the index without deleted rows."""
+        with self.lock:
+            keep = np.flatnonzero(self.alive)
+            vectors = np.array(self.vectors[keep]) if len(keep) else np.zeros((0, self.dim or 0), dtype = np.float32)
+            tmp_path = f"{self.vectors_path}.{os.getpid()}.tmp"
+            vectors.astype(np.float32).tofile(tmp_path)
+            os.replace(tmp_path, self.vectors_path)
+            self.ids = [self.ids[row] for row in keep]
+            self.texts = [self.texts[row] for row in keep]
+            self.metadatas = [self.metadatas[row] for row in keep]
+            self.alive = np.ones(len(self.ids), dtype = bool)
+            self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            self._save_meta()
+            self._open_vectors()
+
+    def similarity_search_by_vector(self, embedding, k = 4):
+        with self.lock:
+            self._refresh()
+            if not self.row_of:
+                return []
+            query = np.asarray(embedding, dtype = np.float32)
+            scores = self.vectors @ query
+            scores[~self.alive] = -np.inf
+            k = min(k, len(self.row_of))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [Document(self.texts[row], dict(self.metadatas[row], score = float(scores[row]))) for row in top]
+
+    def similarity_search(self, query, k = 4):
+        return self.similarity_search_by_vector(self._embed([query])[0], k = k)
+
+    def __len__(self):
+        return len(self.row_of)
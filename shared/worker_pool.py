@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from config.config import Config
+from shared.task_store import get_task_store
+from shared.log_utils import listen, setup_logging
+
+
+class WorkerPool:
+    """Supervises N pipeline worker processes sharing the task store.
+
+    `target(worker_id, stop_event, log_queue)` runs one worker until the
+    queue is drained; its log records are written by a listener in this
+    process. Workers that die are restarted and their leased tasks are put
+    back on the queue straight away instead of waiting for the lease to run
+    out. On SIGTERM/SIGINT the pool sets `stop_event`, which tells workers to
+    stop claiming, finish (or hand back) in-flight tasks and exit.
+    """
+
+    def __init__(self, target, num_workers, restart_delay = None):
+        # spawn gives each worker fresh clients, sockets and SQLite connections.
+        self.ctx = multiprocessing.get_context("spawn")
+        self.target = target
+        self.num_workers = num_workers
+        self.restart_delay = restart_delay if restart_delay is not None else Config.WORKER_RESTART_DELAY
+        self.stop_event = self.ctx.Event()
+        self.log_queue = self.ctx.Queue()
+        self.workers = {}  # slot -> (process, worker_id)
+        self.restarts = 0
+
+    def spawn(self, slot):
+        worker_id = f"{socket.gethostname()}:pool{os.getpid()}:w{slot}:{self.restarts}"
+        process = self.ctx.Process(
+            target = self.target,
+            args = (worker_id, self.stop_event, self.log_queue),
+            name = f"pipeline-worker-{slot}",
+        )
+        process.start()
+        self.workers[slot] = (process, worker_id)
+        print(f"[WorkerPool] Started worker {worker_id} (pid {process.pid})")
+
+    def request_stop(self, signum, frame):
+        if not self.stop_event.is_set():
+            print(f"[WorkerPool] Received signal {signum}, finishing in-flight tasks...")
+            self.stop_event.set()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        setup_logging()
+        listen(self.log_queue)
+
+        for slot in range(self.num_workers):
+            self.spawn(slot)
+
+        stop_deadline = None
+        while self.workers:
+            for slot, (process, worker_id) in list(self.workers.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del self.workers[slot]
+                if process.exitcode == 0:
+                    print(f"[WorkerPool] Worker {worker_id} finished.")
+                    continue
+
+                requeued = get_task_store().requeue_worker(worker_id)
+                print(f"[WorkerPool] Worker {worker_id} died (exit code {process.exitcode}); requeued {requeued} tasks.")
+                if not self.stop_event.is_set():
+                    self.restarts += 1
+                    time.sleep(self.restart_delay)
+                    self.spawn(slot)
+
+            if self.stop_event.is_set():
+                if stop_deadline is None:
+                    stop_deadline = time.time() + Config.SHUTDOWN_GRACE_SECONDS + 5
+                elif time.time() > stop_deadline:
+                    for process, worker_id in self.workers.values():
+                        print(f"[WorkerPool] Worker {worker_id} did not exit in time, terminating.")
+                        process.kill()
+                        process.join()
+                        get_task_store().requeue_worker(worker_id)
+                    self.workers.clear()
+
+            time.sleep(0.2)
+
+        print(f"[WorkerPool] All workers exited ({self.restarts} restarts).")
@@ -1,6 +1,10 @@
 import sys
 import os
+import signal
+import argparse
+import threading
 import time
+from functools import partial
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -13,53 +17,75 @@ from agents.documentation_agent import DocumentationAgent
 from agents.refactor_agent import RefactorAgent
 from agents.code_architect_agent import CodeArchitectAgent
 from shared.task_manager import TaskManager
+from config.config import Config
 from shared.architecture_parser import parse_architecture_plan
+from shared.scheduler import DAGScheduler
+from shared.llm_cache import get_response_cache
+from shared.worker_pool import WorkerPool
+from shared.retrieval import attach_context
+from shared.log_utils import setup_logging, shutdown_logging
+from shared.git_utils import flush_commits
+from shared.incremental import is_up_to_date, record_build
+from shared.model_router import get_router
+from shared.batch import run_batch
+from shared.tracing import tracer, start_metrics_server, merge_traces, worker_trace_parts, worker_trace_path
 
 task_manager = TaskManager()
 
-agents = {
-    "Coding Agent": CodingAgent(name = "Coding Agent", vector_store = get_vector_store()),
-    "Refactoring Agent": RefactorAgent(name = "Refactoring Agent", vector_store = get_vector_store()),
-    "Documentation Agent": DocumentationAgent(name = "Documentation Agent", vector_store = get_vector_store()),
-    "Code Architect Agent": CodeArchitectAgent(name = "Code Architect Agent", vector_store = get_vector_store()),
-    "Testing Agent": TestingAgent(name = "Testing Agent", vector_store = get_vector_store()),
-    "QA Agent": QAAgent(name = "QA Agent", vector_store = get_vector_store()),
+AGENT_CLASSES = {
+    "Coding Agent": CodingAgent,
+    "Refactoring Agent": RefactorAgent,
+    "Documentation Agent": DocumentationAgent,
+    "Code Architect Agent": CodeArchitectAgent,
+    "Testing Agent": TestingAgent,
+    "QA Agent": QAAgent,
 }
 
-print("[Main] Starting Phase 6 loop...\n")
+# Agents are built on first use; they all share one lazily opened vector store.
+agents = {}
+agents_lock = threading.Lock()
 
-while True:
-    task = task_manager.get_next_task()
 
-    if task is None:
-        print("[Main] No pending tasks remaining. Done.")
-        break
+def get_agent(agent_name):
+    with agents_lock:
+        if agent_name not in agents and agent_name in AGENT_CLASSES:
+            agents[agent_name] = AGENT_CLASSES[agent_name](name = agent_name, vector_store = get_vector_store())
+        return agents.get(agent_name)
 
+
+def process_task(task):
     agent_name = task["agent"]
-    agent = agents.get(agent_name)
+    agent = get_agent(agent_name)
 
     print(f"\n[Main] Processing task for agent: {agent_name} — Completed? {task.get('completed', False)}")
 
     if agent is None:
         print(f"[ERROR] Unknown agent: {agent_name}. Skipping task.")
-        task_manager.mark_task_completed(task)  # Optional: mark unknown tasks to avoid loop
-        continue
+        return  # The scheduler still completes it, to avoid a loop
 
     try:
         if agent_name == "Code Architect Agent":
             architecture_plan_path = agent.run_task(task)
             if architecture_plan_path:
-                task_manager.mark_task_completed(task)
                 print("[Main] Parsing architecture plan...")
                 new_tasks = parse_architecture_plan(str(architecture_plan_path[0]))
                 for new_task in new_tasks:
                     task_manager.add_task(new_task)
+        elif is_up_to_date(task, agent):
+            print(f"[Main] {agent_name}: inputs unchanged since the last run; skipping {task.get('description')}")
         else:
             print(f">>> Calling {agent_name}.run_task()...")
+            started = time.time()
             agent.run_task(task)
+            record_build(task, agent, started)
             print(f">>> run_task() completed.")
-        
+
         if agent_name == "Coding Agent":
+            open_coding = [t for t in task_manager.get_pending_tasks() if t["agent"] == agent_name and t.get("id") != task.get("id")]
+            if not open_coding:
+                # Last module of the coding phase: commit the phase's files together.
+                flush_commits("coding phase")
+
             print("[Main] Adding Refactoring and Documentation tasks...")
             output_file = task.get("output_file")
             description_base = task.get("description")
@@ -84,14 +110,78 @@ while True:
             }
             task_manager.add_task(documentation_task)
 
-            task_manager.mark_task_completed(task)
-        else:
-            task_manager.mark_task_completed(task)
-
     except Exception as e:
         print(f"[ERROR] Exception while calling {agent_name} run_task(): {str(e)}")
-        task_manager.mark_task_completed(task)
-
-    time.sleep(1)
-        
-        
\ No newline at end of file
+        raise  # the scheduler puts the task back on the queue with its attempt count
+
+
+def run_worker(worker_id = None, stop_event = None, log_queue = None):
+    setup_logging(log_queue)
+    start_metrics_server()
+    if Config.PROFILE_TRACE_PATH:
+        tracer.start_profile()
+    stop_event = stop_event or threading.Event()
+    # SIGTERM/Ctrl-C stop claiming new work; in-flight tasks get a grace period.
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+
+    scheduler = DAGScheduler(
+        task_manager,
+        process_task,
+        worker_id = worker_id,
+        stop_event = stop_event,
+        prepare_fn = partial(attach_context, get_agent = get_agent),
+    )
+    finished_cleanly = scheduler.run()
+    flush_commits()
+    if Config.LLM_CACHE_ENABLED:
+        print(f"[Main] LLM cache stats: {get_response_cache().stats()}")
+    print(f"[Main] Stage latencies:\n{tracer.summary()}")
+    if get_router().stats:
+        print(f"[Main] Model backends:\n{get_router().summary()}")
+    if Config.PROFILE_TRACE_PATH:
+        # Pool workers write their own part; the supervisor merges them.
+        trace_path = Config.PROFILE_TRACE_PATH if log_queue is None else worker_trace_path(Config.PROFILE_TRACE_PATH)
+        tracer.write_trace(trace_path)
+    if not finished_cleanly:
+        # Unfinished tasks were handed back; don't wait on their threads.
+        sys.stdout.flush()
+        shutdown_logging()
+        os._exit(0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Run the AI agent pipeline.")
+    parser.add_argument("--workers", type = int, default = 1, help = "Number of worker processes sharing the task queue")
+    parser.add_argument(
+        "--profile", nargs = "?", const = "logs/profile_trace.json", default = None, metavar = "TRACE_FILE",
+        help = "Write a Chrome trace of every span (open in chrome://tracing, Perfetto or speedscope)",
+    )
+    parser.add_argument(
+        "--batch", action = "store_true",
+        help = "Send pending Testing/Documentation/QA/Refactoring tasks through the Batch API and wait for the results",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        # Set in the environment too so spawned workers pick it up.
+        os.environ["PROFILE_TRACE_PATH"] = Config.PROFILE_TRACE_PATH = args.profile
+
+    if args.batch:
+        setup_logging()
+        written = run_batch(task_manager, get_agent, prepare_fn = partial(attach_context, get_agent = get_agent))
+        print(f"[Main] Batch mode wrote {written} task outputs. Status: {task_manager.get_status_counts()}")
+        sys.exit(0)
+
+    print("[Main] Starting Phase 6 loop...\n")
+    if args.workers > 1:
+        # Workers split the LLM rate limits between them.
+        os.environ["PIPELINE_WORKERS"] = str(args.workers)
+        WorkerPool(run_worker, args.workers).run()
+        if args.profile:
+            merged = merge_traces(args.profile, worker_trace_parts(args.profile))
+            print(f"[Main] Wrote {merged} trace events to {args.profile}")
+    else:
+        run_worker()
+        if args.profile:
+            print(f"[Main] Wrote trace to {args.profile}")
+    print("[Main] No pending tasks remaining. Done.")
@@ -1,27 +1,18 @@
 # task_uploader.py
 
 import streamlit as st
-import json
-import os
 import subprocess
 from datetime import datetime
 from streamlit_autorefresh import st_autorefresh
+from shared.task_store import get_task_store
 
-TASKS_FILE = "tasks_queue/tasks.json"
+store = get_task_store()
 
 
 # --- Functions ---
 
 def load_tasks():
-    if os.path.exists(TASKS_FILE):
-        with open(TASKS_FILE, "r") as f:
-            return json.load(f)
-    else:
-        return []
-
-def save_tasks(tasks):
-    with open(TASKS_FILE, "w") as f:
-        json.dump(tasks, f, indent=4)
+    return store.all()
 
 def is_duplicate_task(tasks, new_task):
     for task in tasks:
@@ -35,16 +26,13 @@ def is_duplicate_task(tasks, new_task):
     return False
 
 def mark_all_incomplete(tasks):
-    for task in tasks:
-        task["completed"] = False
-    save_tasks(tasks)
+    store.mark_all_incomplete()
 
 def clear_all_tasks():
-    save_tasks([])
+    store.clear()
 
 def delete_task(tasks, index):
-    tasks.pop(index)
-    save_tasks(tasks)
+    store.delete(tasks[index]["id"])
 
 # --- UI ---
 
@@ -69,7 +57,7 @@ if tasks:
                 delete_task(tasks, idx)
                 st.experimental_rerun()
 else:
-    st.info("No tasks found in tasks.json.")
+    st.info("No tasks found in the task store.")
 
 # --- Add New Task ---
 st.header("➕ Add New Task")
@@ -80,6 +68,7 @@ with st.form("add_task_form"):
     output_file = st.text_input("Output file (optional)")
     input_file = st.text_input("Input file (optional)")
     completed = st.checkbox("Completed", value=False)
+    no_cache = st.checkbox("Bypass LLM response cache", value=False)
 
     prevent_duplicates = st.checkbox("Prevent duplicate tasks", value=True)
 
@@ -95,12 +84,14 @@ with st.form("add_task_form"):
             new_task["output_file"] = output_file
         if input_file:
             new_task["input_file"] = input_file
+        if no_cache:
+            new_task["no_cache"] = True
 
         if prevent_duplicates and is_duplicate_task(tasks, new_task):
             st.warning("⚠️ Duplicate task detected. Task was not added.")
+        elif store.add(new_task) is None:
+            st.warning("⚠️ A task with the same agent, description and output file is already queued.")
         else:
-            tasks.append(new_task)
-            save_tasks(tasks)
             st.success("✅ Task added successfully!")
 
 # --- Pipeline Controls ---
@@ -109,9 +100,10 @@ st.header("🚀 Pipeline Control")
 col1, col2, col3 = st.columns(3)
 
 with col1:
+    num_workers = st.number_input("Worker processes", min_value = 1, max_value = 32, value = 1)
     if st.button("▶️ Run Pipeline"):
         st.info("Running pipeline... (check terminal output)")
-        subprocess.Popen(["python", "-m", "src.main"])
+        subprocess.Popen(["python", "-m", "src.main", "--workers", str(int(num_workers))])
         st.success(f"Pipeline started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 with col2:
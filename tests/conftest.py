@@ -0,0 +1,24 @@
+import sys
+import os
+import logging
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.config import Config
+from shared import log_utils
+
+
+@pytest.fixture(autouse = True)
+def log_file(tmp_path, monkeypatch):
+    """Send the pipeline log to a per-test file instead of the tracked logs/ai_agents.log."""
+    path = tmp_path / "ai_agents.log"
+    monkeypatch.setattr(Config, "LOG_FILE", str(path))
+    monkeypatch.setattr(log_utils, "_queue", None)
+    monkeypatch.setattr(log_utils, "_file_handler", None)
+    monkeypatch.setattr(log_utils, "_listeners", [])
+    monkeypatch.setattr(logging.getLogger(log_utils.LOGGER_NAME), "handlers", [])
+    yield path
+    log_utils.shutdown_logging()
+    if log_utils._file_handler is not None:
+        log_utils._file_handler.close()
@@ -0,0 +1,101 @@
+import json
+import os
+import pytest
+from benchmarks.stub_openai_server import start_stub_server
+from config.config import Config
+from shared import batch
+from shared.task_manager import TaskManager
+from shared.task_store import TaskStore
+
+
+class StubAgent:
+    """Just enough of an agent for batch mode: prompts in, output file out."""
+
+    model = "gpt-4o-mini"
+    temperature = 0.2
+    strip_fences = True
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+
+    def batch_prompts(self, task):
+        if task.get("parts"):
+            return [f"{task['description']} (part {part})" for part in range(task["parts"])], self.merge
+        return [task["description"]], None
+
+    def merge(self, replies):
+        return "merged:" + "|".join(replies)
+
+    def artifact_paths(self, task):
+        return None, os.path.join(self.output_dir, f"task_{task['id']}.txt")
+
+    def save_output(self, file_path, content):
+        with open(file_path, "w") as f:
+            f.write(content)
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    def start(**server_options):
+        server = start_stub_server(reply = "```python\nreply\n```", batch_delay = 0.1, **server_options)
+        monkeypatch.setattr(Config, "OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setattr(Config, "OPENAI_API_KEY", "stub-key")
+        monkeypatch.setattr(Config, "BATCH_DIR", str(tmp_path / "batches"))
+        monkeypatch.setattr(Config, "BATCH_POLL_SECONDS", 0.05)
+        monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+        monkeypatch.setattr(Config, "INCREMENTAL_BUILDS", False)
+        monkeypatch.setattr(batch, "record_build", lambda *args, **kwargs: True)
+
+        store = TaskStore(path = str(tmp_path / "tasks.db"), legacy_json = str(tmp_path / "missing.json"))
+        task_manager = TaskManager(store = store)
+        task_manager.add_task({"agent": "Testing Agent", "description": "Test csv_reader.py"})
+        task_manager.add_task({"agent": "Documentation Agent", "description": "Document db_loader.py", "parts": 2})
+        # Not batch-able, and a task still waiting for it: both stay on the queue.
+        task_manager.add_task({"agent": "Coding Agent", "description": "Implement parser.py", "output_file": "parser.py"})
+        task_manager.add_task({"agent": "Testing Agent", "description": "Test parser.py", "input_file": "parser.py"})
+
+        output_dir = tmp_path / "outputs"
+        output_dir.mkdir()
+        agent = StubAgent(str(output_dir))
+        written = batch.run_batch(task_manager, lambda agent_name: agent)
+        return server, store, output_dir, written
+
+    return start
+
+
+def test_batch_submits_polls_and_writes_each_tasks_output(pipeline):
+    server, store, output_dir, written = pipeline()
+
+    assert written == 2
+    assert len(server.batches) == 1
+    (submitted,) = server.batches.values()
+    assert submitted["status"] == "completed"
+    assert submitted["request_counts"] == {"total": 3, "completed": 3, "failed": 0}
+    lines = server.files[submitted["input_file_id"]]["content"].decode().splitlines()
+    assert sorted(json.loads(line)["custom_id"] for line in lines) == ["1-0", "2-0", "2-1"]
+
+    # Replies land in the right task's file; the map-reduced task's parts are merged in order.
+    assert (output_dir / "task_1.txt").read_text() == "reply"
+    assert (output_dir / "task_2.txt").read_text() == "merged:reply|reply"
+    statuses = {task["description"]: task["status"] for task in store.all()}
+    assert statuses == {
+        "Test csv_reader.py": "completed",
+        "Document db_loader.py": "completed",
+        "Implement parser.py": "pending",
+        "Test parser.py": "pending",
+    }
+    (state_file,) = [name for name in os.listdir(Config.BATCH_DIR) if name.endswith(".state.json")]
+    with open(os.path.join(Config.BATCH_DIR, state_file)) as f:
+        assert json.load(f)["done"]
+
+
+def test_failed_batch_items_go_back_on_the_queue(pipeline):
+    server, store, output_dir, written = pipeline(fail_rate = 1.0)
+
+    assert written == 0
+    assert not list(output_dir.iterdir())
+    failed = [task for task in store.all() if task["description"] in ("Test csv_reader.py", "Document db_loader.py")]
+    assert [task["status"] for task in failed] == ["pending", "pending"]
+    assert all(task["attempts"] == 1 for task in failed)
+    errors = store.conn.execute("SELECT last_error FROM tasks WHERE id IN (1, 2)").fetchall()
+    assert errors == [("stub provider failure",), ("stub provider failure",)]
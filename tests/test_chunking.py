@@ -0,0 +1,13 @@
+from shared.chunking import python_blocks
+
+# A form feed between definitions and a U+2028 inside a string: str.splitlines
+# breaks on both, ast line numbers do not.
+SOURCE = 'import os\n\x0c\ndef first():\n    return "a\u2028b"\n\ndef second():\n    return 2\n'
+
+
+def test_blocks_line_up_with_ast_line_numbers():
+    assert python_blocks(SOURCE) == [
+        ("module", "import os\n"),
+        ("first", 'def first():\n    return "a\u2028b"\n'),
+        ("second", "def second():\n    return 2\n"),
+    ]
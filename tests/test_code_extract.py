@@ -0,0 +1,83 @@
+import textwrap
+from shared.code_extract import ExtractCache, extract_functions, python_functions
+
+SOURCE = textwrap.dedent('''
+    import sys
+    from typing import TYPE_CHECKING
+
+    if TYPE_CHECKING:
+        def typed_helper(x: int) -> int: ...
+
+    try:
+        from fast import speedup
+    except ImportError:
+        def speedup(data):
+            return data
+    else:
+        def using_fast():
+            return True
+    finally:
+        def cleanup():
+            pass
+
+    if sys.version_info >= (3, 11):
+        def parse(text):
+            return "new"
+    else:
+        def parse(text):
+            return "old"
+
+    with open(__file__) as f:
+        def reader():
+            return f
+
+    class Store:
+        if sys.platform == "win32":
+            def lock(self):
+                pass
+
+        @staticmethod
+        def get(key):
+            def inner():
+                return key
+            return inner
+''')
+
+
+def test_definitions_inside_if_try_and_with_blocks_are_extracted():
+    names = [name for name, _ in python_functions(SOURCE)]
+
+    assert names == [
+        "typed_helper", "speedup", "using_fast", "cleanup", "parse", "parse", "reader", "Store.lock", "Store.get",
+    ]
+
+
+def test_each_branch_keeps_its_own_source():
+    functions = python_functions(SOURCE)
+    parse_sources = [source for name, source in functions if name == "parse"]
+
+    assert parse_sources == ['def parse(text):\n    return "new"\n', 'def parse(text):\n    return "old"\n']
+    assert dict(functions)["Store.get"].startswith("@staticmethod\ndef get(key):\n    def inner():")
+
+
+def test_form_feeds_and_unicode_line_breaks_do_not_shift_sources():
+    source = 'def first():\n    return "a\u2028b"\n\x0c\ndef second():\n    return 2\n'
+
+    assert python_functions(source) == [
+        ("first", 'def first():\n    return "a\u2028b"\n'),
+        ("second", "def second():\n    return 2\n"),
+    ]
+
+
+def test_extract_functions_uses_the_cache(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text(SOURCE)
+    cache = ExtractCache(str(tmp_path / "cache.sqlite3"))
+
+    first = extract_functions([str(path)], workers = 1, cache = cache)
+    cache.conn.execute("UPDATE functions SET value = '[]'")
+    second = extract_functions([str(path)], workers = 1, cache = cache)
+
+    assert len(first[str(path)]) == 9
+    assert second == {str(path): []}  # served from the cache, not parsed again
+    cache.close()
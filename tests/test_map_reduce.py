@@ -0,0 +1,91 @@
+import textwrap
+from shared.map_reduce import merge_markdown, merge_test_files
+
+
+def dedent(text):
+    return textwrap.dedent(text).lstrip()
+
+
+def test_merge_test_files_dedupes_imports_and_fixtures_and_keeps_every_test():
+    first = dedent('''
+        import pytest
+        from csv_reader import read_csv
+
+
+        @pytest.fixture
+        def rows():
+            return [1, 2]
+
+
+        def test_read(rows):
+            assert read_csv(rows)
+    ''')
+    second = dedent('''
+        import pytest
+        from csv_reader import read_csv, write_csv
+
+
+        @pytest.fixture
+        def rows():
+            return [3]
+
+
+        def test_read(rows):
+            assert read_csv(rows) is not None
+
+
+        def test_write():
+            assert write_csv([])
+    ''')
+
+    merged = merge_test_files([first, second])
+
+    assert merged == dedent('''
+        import pytest
+        from csv_reader import read_csv, write_csv
+
+
+        @pytest.fixture
+        def rows():
+            return [1, 2]
+
+
+        def test_read(rows):
+            assert read_csv(rows)
+
+
+        def test_read_2(rows):
+            assert read_csv(rows) is not None
+
+
+        def test_write():
+            assert write_csv([])
+    ''')
+
+
+def test_merge_test_files_keeps_an_unparsable_part_verbatim():
+    merged = merge_test_files(["def test_ok():\n    pass\n", "def test_broken(:\n"])
+
+    assert merged == "def test_ok():\n    pass\n\n\ndef test_broken(:\n"
+
+
+def test_merge_markdown_combines_sections_under_one_heading():
+    first = "# csv_reader\n\nReads CSV files.\n\n## Usage\n\nCall read_csv.\n\n## API\n\nread_csv(path)\n"
+    second = "# csv_reader (part 2)\n\n## Usage\n\nCall write_csv.\n\n## API\n\nread_csv(path)\n"
+
+    assert merge_markdown([first, second]) == (
+        "# csv_reader\n\nReads CSV files.\n\n"
+        "## Usage\nCall read_csv.\n\nCall write_csv.\n\n"
+        "## API\nread_csv(path)\n"
+    )
+
+
+def test_merge_markdown_ignores_headings_inside_code_fences():
+    first = "Intro.\n\n```python\n# not the title\nrows = read_csv(path)\n```\n\n# csv_reader\n\n## Usage\n\n~~~\n## not a section\n~~~\n"
+    second = "## Usage\n\n````markdown\n```\n# still inside\n````\n"
+
+    assert merge_markdown([first, second]) == (
+        "# csv_reader\n\n"
+        "Intro.\n\n```python\n# not the title\nrows = read_csv(path)\n```\n\n"
+        "## Usage\n~~~\n## not a section\n~~~\n\n````markdown\n```\n# still inside\n````\n"
+    )
@@ -0,0 +1,142 @@
+import asyncio
+import io
+import time
+import openai
+import pytest
+from agents.base_agent import BaseAgent
+from benchmarks.stub_openai_server import start_stub_server
+from config.config import Config
+from shared import llm_cache, llm_client, log_utils, model_router, rate_limit
+from shared.llm_cache import ResponseCache, cache_key
+from shared.model_router import ModelRouter
+
+AGENT = "Testing Agent"
+MESSAGES = [{"role": "user", "content": "Write tests for csv_reader.py"}]
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Start one local stub server per provider; routes go first -> second.
+
+    Requests go through the real pooled client, rate limiter and circuit
+    breaker; only retries are off, so a failing provider fails at once.
+    """
+    servers = {}
+
+    def start(**options):
+        for name, server_options in options.items():
+            servers[name] = start_stub_server(reply = f"reply from {name}", **server_options)
+        monkeypatch.setattr(Config, "LLM_PROVIDERS", {
+            name: {"base_url": server.base_url, "api_key": "stub", "rpm": 0, "tpm": 0} for name, server in servers.items()
+        })
+        return servers
+
+    monkeypatch.setattr(Config, "MODEL_ROUTING_ENABLED", True)
+    monkeypatch.setattr(Config, "ROUTER_HEDGING", True)
+    monkeypatch.setattr(Config, "ROUTER_MAX_HEDGES", 1)
+    monkeypatch.setattr(Config, "ROUTER_HEDGE_DELAY", 0.2)
+    monkeypatch.setattr(Config, "LLM_MAX_RETRIES", 0)
+    monkeypatch.setattr(llm_client, "_clients", {})
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    yield start
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(routes = {AGENT: ["first:model", "second:model"]})
+
+
+def complete(router):
+    response = asyncio.run(router.chat_completion(AGENT, model = "model", messages = MESSAGES))
+    return response.choices[0].message.content
+
+
+def test_hedge_fires_after_delay_and_the_faster_backend_wins(providers, router, log_file):
+    servers = providers(first = {"delay": 3.0}, second = {"delay": 0.01})
+
+    start = time.perf_counter()
+    reply = complete(router)
+    elapsed = time.perf_counter() - start
+
+    assert reply == "reply from second"
+    assert Config.ROUTER_HEDGE_DELAY <= elapsed < 1.5
+    assert servers["first"].request_count == servers["second"].request_count == 1
+    assert router.stats["second:model"].hedges_won == 1
+    assert router.stats["first:model"].samples[-1][0] is None  # lost the race: neither success nor failure
+
+    log_utils.shutdown_logging()
+    assert "Hedged request" in log_file.read_text()
+
+
+def test_streamed_reply_is_hedged_before_the_first_chunk(providers, router):
+    providers(first = {"delay": 3.0}, second = {"delay": 0.01})
+
+    async def stream():
+        return "".join([
+            chunk.choices[0].delta.content or ""
+            async for chunk in router.stream_chat_completion(AGENT, model = "model", messages = MESSAGES)
+            if chunk.choices
+        ])
+
+    start = time.perf_counter()
+    assert asyncio.run(stream()) == "reply from second"
+    assert time.perf_counter() - start < 1.5
+
+
+def test_no_hedge_when_the_first_backend_answers_in_time(providers, router):
+    servers = providers(first = {"delay": 0.01}, second = {"delay": 0.01})
+
+    assert complete(router) == "reply from first"
+    assert servers["second"].request_count == 0
+
+
+def test_fails_over_when_a_backend_errors(providers, router):
+    servers = providers(first = {"delay": 0, "fail_rate": 1.0}, second = {"delay": 0.01})
+
+    assert complete(router) == "reply from second"
+    assert servers["first"].request_count == 1
+    assert router.stats["first:model"].error_rate() == 1.0
+
+
+def test_backend_that_keeps_failing_is_ranked_last(providers, router):
+    providers(first = {"delay": 0, "fail_rate": 1.0}, second = {"delay": 0.01})
+
+    for _ in range(3):
+        assert complete(router) == "reply from second"
+
+    assert [backend.name for backend in router.ranked(AGENT)] == ["second:model", "first:model"]
+
+
+def test_error_surfaces_when_every_backend_fails(providers, router):
+    providers(first = {"delay": 0, "fail_rate": 1.0}, second = {"delay": 0, "fail_rate": 1.0})
+
+    with pytest.raises(openai.InternalServerError, match = "stub provider failure"):
+        complete(router)
+
+
+class EchoAgent(BaseAgent):
+    async def run_task_async(self, task):
+        pass
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("route, cached", [("openai:model", True), ("tuned:model", False)])
+def test_only_replies_from_the_requested_model_are_cached(providers, monkeypatch, tmp_path, streaming, route, cached):
+    servers = providers(tuned = {"delay": 0.01}, openai = {"delay": 0.01})
+    monkeypatch.setattr(Config, "OPENAI_BASE_URL", servers["openai"].base_url)
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "stub")
+    monkeypatch.setattr(Config, "LLM_STREAMING", streaming)
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "_cache", ResponseCache(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(model_router, "_router", ModelRouter(routes = {AGENT: [route]}))
+    out = io.StringIO()
+
+    asyncio.run(EchoAgent(AGENT, None)._complete_into(out, "prompt", "model", 0.2, None, False))
+
+    provider = route.split(":")[0]
+    assert out.getvalue() == f"reply from {provider}"
+    key = cache_key("model", [{"role": "user", "content": "prompt"}], temperature = 0.2)
+    assert llm_cache.get_response_cache().get(key) == (f"reply from {provider}" if cached else None)
@@ -0,0 +1,53 @@
+import asyncio
+import httpx
+import openai
+import pytest
+from config.config import Config
+from shared.rate_limit import ProviderLimiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    # 6000 tokens/min with a 5s burst: 500 tokens of capacity, refilling at 100/s.
+    monkeypatch.setattr(Config, "LLM_PROVIDERS", {"stub": {"rpm": 6000, "tpm": 6000}})
+    monkeypatch.setattr(Config, "PIPELINE_WORKERS", 1)
+    monkeypatch.setattr(Config, "LLM_RATE_BURST_SECONDS", 5)
+    monkeypatch.setattr(Config, "LLM_MAX_RETRIES", 3)
+    monkeypatch.setattr(Config, "LLM_BACKOFF_BASE_SECONDS", 0.001)
+    return ProviderLimiter("stub")
+
+
+def failing_request(failures, error):
+    calls = []
+
+    async def make_request():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return "response"
+
+    return make_request, calls
+
+
+def connection_error():
+    return openai.APIConnectionError(request = httpx.Request("POST", "http://stub/v1/chat/completions"))
+
+
+def test_retries_reserve_tokens_once(limiter):
+    make_request, calls = failing_request(2, connection_error())
+
+    assert asyncio.run(limiter.call(make_request, 300)) == "response"
+
+    assert len(calls) == 3
+    # Only one 300-token reservation was taken out of the 500 (plus a little refill).
+    assert 200 <= limiter.tokens.tokens < 300
+
+
+def test_failed_call_hands_its_tokens_back(limiter):
+    make_request, calls = failing_request(10, connection_error())
+
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(limiter.call(make_request, 300))
+
+    assert len(calls) == Config.LLM_MAX_RETRIES + 1
+    assert limiter.tokens.tokens == pytest.approx(limiter.tokens.capacity)
@@ -0,0 +1,42 @@
+import git
+import pytest
+from shared.repo_cache import fetch_repo
+
+AUTHOR = git.Actor("Test", "test@example.com")
+
+
+def commit(repo, name, text):
+    path = f"{repo.working_tree_dir}/{name}"
+    with open(path, "w") as f:
+        f.write(text)
+    repo.index.add([path])
+    return repo.index.commit(f"Add {name}", author = AUTHOR, committer = AUTHOR)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """A bare repository to fetch from, plus a working clone to push new commits with."""
+    work = git.Repo.init(tmp_path / "work")
+    commit(work, "module.py", "def first():\n    return 1\n")
+    bare = work.clone(str(tmp_path / "project.git"), bare = True)
+    work.create_remote("upstream", bare.git_dir)
+    return bare, work
+
+
+def test_fetch_repo_clones_then_only_updates_when_the_remote_moves(remote, tmp_path):
+    bare, work = remote
+    cache_dir = str(tmp_path / "repos")
+
+    path, status = fetch_repo(bare.git_dir, cache_dir)
+    assert status == "cloned"
+    assert git.Repo(path).head.commit.hexsha == bare.head.commit.hexsha
+
+    assert fetch_repo(bare.git_dir, cache_dir) == (path, "unchanged")
+
+    new_commit = commit(work, "helpers.py", "def second():\n    return 2\n")
+    work.remotes.upstream.push(work.active_branch.name)
+
+    assert fetch_repo(bare.git_dir, cache_dir) == (path, "updated")
+    checkout = git.Repo(path)
+    assert checkout.head.commit.hexsha == new_commit.hexsha
+    assert (tmp_path / "repos" / "project" / "helpers.py").read_text() == "def second():\n    return 2\n"
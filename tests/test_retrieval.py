@@ -0,0 +1,69 @@
+import os
+import pytest
+from config.config import Config
+from shared import retrieval
+from shared.prompts import PromptTemplate
+
+
+class Doc:
+    def __init__(self, source, text):
+        self.metadata = {"source": source}
+        self.page_content = text
+
+
+class StubStore:
+    class embeddings:
+        @staticmethod
+        def embed_documents(texts):
+            return [[0.0] for _ in texts]
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def similarity_search_by_vector(self, vector, k = 4):
+        return self.docs[:k]
+
+
+class StubTestingAgent:
+    def artifact_paths(self, task):
+        return os.path.join(Config.GENERATED_CODE_PATH, task["input_file"]), os.path.join(Config.TEST_CODE_PATH, f"test_{task['input_file']}")
+
+
+@pytest.fixture
+def store(monkeypatch):
+    docs = [
+        Doc(os.path.join(Config.GENERATED_CODE_PATH, "csv_reader.py"), "def read_csv(): ..."),
+        Doc(os.path.join(Config.TEST_CODE_PATH, "test_csv_reader.py"), "def test_read_csv(): ..."),
+        Doc(os.path.join(Config.GENERATED_CODE_PATH, "db_loader.py"), "def load(): ..."),
+        Doc("knowledge_base/style.md", "Use type hints."),
+    ]
+    monkeypatch.setattr(Config, "RAG_ENABLED", True)
+    monkeypatch.setattr(retrieval, "load_vector_store", lambda: StubStore(docs))
+
+
+def test_a_task_never_gets_its_own_input_or_output_as_context(store):
+    task = {"agent": "Testing Agent", "description": "Write tests for csv_reader.py", "input_file": "csv_reader.py"}
+
+    retrieval.attach_context([task], k = 2, token_budget = 1000, get_agent = lambda name: StubTestingAgent())
+
+    assert "csv_reader.py" not in task["retrieved_context"]
+    assert "db_loader.py" in task["retrieved_context"]
+    assert "knowledge_base/style.md" in task["retrieved_context"]
+
+
+def test_input_file_is_excluded_without_an_agent(store):
+    task = {"agent": "Documentation Agent", "description": "Document csv_reader.py", "input_file": "csv_reader.py"}
+
+    retrieval.attach_context([task], k = 4, token_budget = 1000)
+
+    assert f"# Source: {os.path.join(Config.GENERATED_CODE_PATH, 'csv_reader.py')}" not in task["retrieved_context"]
+
+
+def test_prompt_cache_text_leaves_out_retrieved_context():
+    template = PromptTemplate("test", "Test this:\n{code_content}\n{context}")
+
+    first = template.build("gpt-4o-mini", chunk_field = "code_content", code_content = "x = 1", context = "chunk A")[0]
+    rerun = template.build("gpt-4o-mini", chunk_field = "code_content", code_content = "x = 1", context = "chunk B")[0]
+
+    assert first != rerun
+    assert first.cache_text == rerun.cache_text == "Test this:\nx = 1\n"
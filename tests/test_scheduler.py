@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+import pytest
+from config.config import Config
+from shared.scheduler import DAGScheduler
+from shared.task_manager import TaskManager
+from shared.task_store import TaskStore
+
+
+@pytest.fixture
+def task_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TASK_RETRY_DELAY_SECONDS", 0.3)
+    monkeypatch.setattr(Config, "SCHEDULER_POLL_SECONDS", 0.05)
+    store = TaskStore(path = os.path.join(tmp_path, "tasks.db"), legacy_json = os.path.join(tmp_path, "missing.json"))
+    yield TaskManager(store = store)
+    store.conn.close()
+
+
+def test_downstream_task_waits_for_a_failed_producer_to_retry(task_manager):
+    task_manager.add_task({"agent": "Coding Agent", "description": "Implement module.py", "output_file": "module.py"})
+    task_manager.add_task({"agent": "Testing Agent", "description": "Test module.py", "input_file": "module.py"})
+    events = []
+    lock = threading.Lock()
+
+    def run(task):
+        with lock:
+            events.append((task["agent"], "start", time.perf_counter()))
+        if task["agent"] == "Coding Agent" and task["attempts"] == 1:
+            raise RuntimeError("provider error")
+        with lock:
+            events.append((task["agent"], "done", time.perf_counter()))
+
+    assert DAGScheduler(task_manager, run, max_workers = 4, worker_id = "test").run()
+
+    assert [(agent, event) for agent, event, _ in events] == [
+        ("Coding Agent", "start"),
+        ("Coding Agent", "start"),
+        ("Coding Agent", "done"),
+        ("Testing Agent", "start"),
+        ("Testing Agent", "done"),
+    ]
+    # The retry honoured its backoff (at least half the configured delay, see retry_delay).
+    assert events[1][2] - events[0][2] >= 0.15
+    assert task_manager.get_status_counts() == {"completed": 2}
+
+
+def test_next_retry_time_is_the_earliest_backoff(task_manager):
+    task_manager.add_task({"agent": "Coding Agent", "description": "Implement module.py", "output_file": "module.py"})
+    assert task_manager.get_next_retry_time() is None
+
+    task = task_manager.claim_task("test")
+    task_manager.fail_task(task, "test", RuntimeError("provider error"))
+
+    retry_at = task_manager.get_next_retry_time()
+    assert retry_at is not None and time.time() < retry_at <= time.time() + 1.5 * Config.TASK_RETRY_DELAY_SECONDS
+    assert task_manager.claim_task("test") is None